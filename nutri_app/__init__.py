@@ -75,12 +75,27 @@ def register_blueprints(app):
     from nutri_app.routes.menus import bp as menus_bp
     from nutri_app.routes.account import bp as profile_bp
     from nutri_app.routes.id_recipe import bp as id_recipe_bp
+    from nutri_app.routes.admin import bp as admin_bp
+    from nutri_app.routes.media import bp as media_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(recipes_bp)
     app.register_blueprint(menus_bp)
     app.register_blueprint(profile_bp)
     app.register_blueprint(id_recipe_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(media_bp)
+
+
+def register_commands(app):
+    """
+    Register the CLI commands for the Flask application.
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    from nutri_app.cli import nutricat_cli
+
+    app.cli.add_command(nutricat_cli)
 
 
 def create_app():
@@ -110,4 +125,19 @@ def create_app():
     configure_logging(app)
     register_blueprints(app)
 
+    from nutri_app.utils import (
+        init_deletion_worker,
+        init_image_pipeline,
+        init_query_counter,
+        init_render_cache,
+        init_storage,
+    )
+
+    init_query_counter(app)
+    init_render_cache(app)
+    init_storage(app)
+    init_image_pipeline(app)
+    init_deletion_worker(app)
+    register_commands(app)
+
     return app
@@ -0,0 +1,256 @@
+"""Flask CLI commands for maintaining the recipe catalog."""
+
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from nutri_app import db
+from nutri_app.models import MenuShoppingInfo, Recipe
+from nutri_app.utils import (
+    SHOPPING_INFO_FIELDS,
+    backfill_quantity_columns,
+    collect_orphans,
+    get_storage,
+    import_batch,
+    invalidate_rendered_pages,
+    iter_catalog,
+    iter_ndjson,
+    parse_shopping_info,
+    parse_since,
+    process_storage_deletions,
+    read_bundle,
+    refresh_menu_snapshots,
+    refresh_recipe_cards,
+    refresh_search_documents,
+    validate_record,
+)
+
+# Invalid records reported individually before only being counted
+MAX_REPORTED_ERRORS = 20
+
+nutricat_cli = AppGroup("nutricat", help="Maintain the NutriCat recipe catalog.")
+
+
+@nutricat_cli.command("reindex-search")
+@click.option("--batch-size", default=1000, show_default=True, help="Recipes per UPDATE.")
+def reindex_search(batch_size):
+    """Rebuild the full-text search document of every recipe."""
+    recipe_ids = [recipe_id for recipe_id, in db.session.query(Recipe.id).order_by(Recipe.id)]
+
+    for start in range(0, len(recipe_ids), batch_size):
+        refresh_search_documents(recipe_ids[start : start + batch_size])
+        db.session.commit()
+
+    click.echo(f"Search documents rebuilt for {len(recipe_ids)} recipes.")
+
+
+@nutricat_cli.command("refresh-cards")
+@click.option("--batch-size", default=1000, show_default=True, help="Recipes per upsert.")
+def refresh_cards(batch_size):
+    """Rebuild the listing card of every recipe."""
+    recipe_ids = [recipe_id for recipe_id, in db.session.query(Recipe.id).order_by(Recipe.id)]
+
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start : start + batch_size]
+        refresh_recipe_cards(batch)
+        db.session.commit()
+        invalidate_rendered_pages(batch)
+
+    click.echo(f"Recipe cards rebuilt for {len(recipe_ids)} recipes.")
+
+
+@nutricat_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["jsonl", "csv"]),
+    help="Bundle format, guessed from the file extension by default.",
+)
+@click.option("--batch-size", default=1000, show_default=True, help="Records per COPY and commit.")
+@click.option("--jobs", default=1, show_default=True, help="Batches imported in parallel.")
+@click.option("--dry-run", is_flag=True, help="Only validate the bundle.")
+def import_bundle(path, fmt, batch_size, jobs, dry_run):
+    """Import recipes and menu shopping info from a JSONL or CSV bundle.
+
+    Records are streamed and imported in batches, each in its own transaction, so an
+    interrupted import can simply be run again.
+    """
+    app = current_app._get_current_object()
+    totals = Counter()
+    invalid = 0
+    pending = set()
+
+    def run(batch):
+        # Every job gets its own application context, hence its own session and connection
+        with app.app_context():
+            try:
+                result = import_batch(batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            return result
+
+    def collect(done):
+        for future in done:
+            recipe_ids, counts = future.result()
+            totals.update(counts)
+            invalidate_rendered_pages(recipe_ids)
+            click.echo(f"Imported {totals['import_recipes']} recipes so far.")
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        batch = []
+        for line_no, record in read_bundle(path, fmt):
+            errors = validate_record(record)
+            if errors:
+                invalid += 1
+                if invalid <= MAX_REPORTED_ERRORS:
+                    click.echo(f"Line {line_no}: {'; '.join(errors)}", err=True)
+                continue
+
+            totals["valid"] += 1
+            if dry_run:
+                continue
+
+            batch.append(record)
+            if len(batch) >= batch_size:
+                pending.add(executor.submit(run, batch))
+                batch = []
+                # Bound the batches held in memory
+                if len(pending) >= 2 * jobs:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+        if batch:
+            pending.add(executor.submit(run, batch))
+        collect(wait(pending).done)
+
+    if dry_run:
+        click.echo(f"{totals['valid']} valid and {invalid} invalid records.")
+        if invalid:
+            raise click.exceptions.Exit(1)
+        return
+
+    # Serve the imported menus without a rebuild on their first request
+    refresh_menu_snapshots()
+    db.session.commit()
+
+    click.echo(
+        f"Imported {totals['import_recipes']} recipes with "
+        f"{totals['import_ingredients']} ingredients, "
+        f"{totals['import_instructions']} instructions and {totals['import_tags']} tags, "
+        f"and {totals['import_shopping']} menu shopping infos; "
+        f"{invalid} invalid records skipped."
+    )
+
+
+@nutricat_cli.command("export")
+@click.option(
+    "--output", type=click.File("wb"), default="-", help="Output file, stdout by default."
+)
+@click.option("--since", help="Only export rows updated after this ISO 8601 time.")
+@click.option("--gzip", "compress", is_flag=True, help="Gzip the output.")
+@click.option("--batch-size", default=500, show_default=True, help="Recipes per fetch.")
+def export_catalog(output, since, compress, batch_size):
+    """Stream the catalog as NDJSON, in the format read by the import command."""
+    try:
+        since = parse_since(since)
+    except ValueError:
+        raise click.BadParameter("must be an ISO 8601 timestamp", param_hint="--since")
+
+    for chunk in iter_ndjson(iter_catalog(since, batch_size), compress=compress):
+        output.write(chunk)
+
+
+@nutricat_cli.command("process-deletions")
+@click.option("--batch-size", default=1000, show_default=True, help="Files per batch.")
+def process_deletions(batch_size):
+    """Delete the stored files queued for deletion that are due, e.g. from cron."""
+    deleted = failed = 0
+    while True:
+        batch_deleted, batch_failed = process_storage_deletions(batch_size)
+        deleted += batch_deleted
+        failed += batch_failed
+        if batch_deleted + batch_failed < batch_size:
+            break
+
+    click.echo(f"Deleted {deleted} stored files, {failed} failed and will be retried.")
+
+
+@nutricat_cli.command("collect-orphans")
+@click.option(
+    "--prefix",
+    help="Key prefix to reconcile, the recipe image folder by default.",
+)
+@click.option(
+    "--grace-hours",
+    default=24,
+    show_default=True,
+    help="Only delete files older than this, to spare uploads still being saved.",
+)
+@click.option("--dry-run", is_flag=True, help="Only report the orphans.")
+@click.option(
+    "--report", type=click.File("w"), help="Write a CSV row per orphan or missing file."
+)
+def collect_orphaned_images(prefix, grace_hours, dry_run, report):
+    """Delete the stored images that no recipe references anymore."""
+    if prefix is None:
+        prefix = f"{current_app.config.get('STORAGE_IMAGE_FOLDER', 'recipe_images')}/"
+
+    totals = collect_orphans(
+        get_storage(),
+        prefix,
+        timedelta(hours=grace_hours),
+        dry_run=dry_run,
+        report=report,
+    )
+
+    verb = "would be deleted" if dry_run else "deleted"
+    deleted = totals["orphan"] - totals["recent"] if dry_run else totals["deleted"]
+    click.echo(
+        f"{totals['orphan']} orphaned files under '{prefix}': {deleted} {verb}, "
+        f"{totals['recent']} kept within the grace period, {totals['failed']} failed. "
+        f"{totals['missing']} referenced files are missing."
+    )
+
+
+@nutricat_cli.command("rebuild-menu-snapshots")
+def rebuild_menu_snapshots():
+    """Rebuild the pre-serialized responses of every weekly menu."""
+    built = refresh_menu_snapshots()
+    db.session.commit()
+    click.echo(f"Menu snapshots rebuilt for {built} menus.")
+
+
+@nutricat_cli.command("parse-shopping-info")
+@click.option("--all", "parse_all", is_flag=True, help="Parse every menu again.")
+def parse_shopping_info_command(parse_all):
+    """Store the parsed shopping info of the menus written before it was parsed."""
+    query = MenuShoppingInfo.query.order_by(MenuShoppingInfo.id)
+    if not parse_all:
+        query = query.filter(MenuShoppingInfo.parsed_info.is_(None))
+
+    menu_tag_ids = []
+    for info in query:
+        info.parsed_info = parse_shopping_info(
+            {field: getattr(info, field) for field in SHOPPING_INFO_FIELDS}
+        )
+        menu_tag_ids.append(info.menu_tag_id)
+    refresh_menu_snapshots(menu_tag_ids)
+    db.session.commit()
+
+    click.echo(f"Shopping info parsed for {len(menu_tag_ids)} menus.")
+
+
+@nutricat_cli.command("parse-quantities")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows per UPDATE and commit.")
+def parse_quantities(batch_size):
+    """Parse the quantity and unit of every recipe ingredient into numeric columns."""
+    total = backfill_quantity_columns(batch_size)
+    click.echo(f"Quantities parsed for {total} recipe ingredients.")
+
@@ -21,6 +21,37 @@ class Config:
     # 10MB limit for all uploads
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024
 
+    # Serve title autocomplete from an in-memory prefix index when warm
+    AUTOCOMPLETE_PREFIX_INDEX = True
+
+    # Rendered pages served to anonymous visitors, optionally shared by all workers
+    RENDER_CACHE = True
+    RENDER_CACHE_SIZE = 500
+    RENDER_CACHE_TTL = 600
+    RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR")
+
+    # Store of the uploaded images, "s3" or "local" (served by the media route)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+    STORAGE_IMAGE_FOLDER = os.getenv("AWS_S3_FOLDER", "recipe_images")
+    S3_BUCKET_NAME = os.getenv("AWS_S3_BUCKET_NAME")
+    S3_REGION = os.getenv("AWS_REGION")
+    S3_PUBLIC_URL = os.getenv("AWS_S3_BUCKET_LINK")
+    S3_MAX_POOL_CONNECTIONS = 10
+    LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR")
+
+    # Background deletion of the files queued in the storage_deletions outbox
+    STORAGE_DELETION_WORKER = True
+    STORAGE_DELETION_POLL_INTERVAL = 60
+    STORAGE_DELETION_BATCH_SIZE = 1000
+
+    # Threads rendering and uploading the variants of uploaded images
+    IMAGE_PIPELINE_WORKERS = 2
+
+    # Comma-separated e-mails of the users allowed on the admin routes
+    ADMIN_EMAILS = {
+        email.strip() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()
+    }
+
 
 class DevelopmentConfig(Config):
     FLASK_DEBUG = True
@@ -33,10 +64,20 @@ class DevelopmentConfig(Config):
     MAIL_USERNAME = ""
     MAIL_PASSWORD = ""
     MAIL_DEFAULT_SENDER = "noreply@nutricat.local"
+    # Report the number of SQL statements of each request in X-Query-Count, and the
+    # render cache counters in X-Render-Cache-Stats
+    QUERY_COUNT_HEADER = True
+    # Always render templates while developing them
+    RENDER_CACHE = False
+    # Keep uploads on the local disk unless S3 is asked for
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
 
 
 class TestConfig(DevelopmentConfig):
     SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL")
+    STORAGE_BACKEND = "local"
+    # Tests drain the outbox themselves
+    STORAGE_DELETION_WORKER = False
 
 
 class ProductionConfig(Config):
@@ -1,6 +1,7 @@
 from .models import (
     User,
     Recipe,
+    RecipeCard,
     Ingredient,
     RecipeIngredient,
     Instruction,
@@ -9,11 +10,16 @@ from .models import (
     Favorite,
     UserRecipeNote,
     MenuShoppingInfo,
+    MenuSnapshot,
+    ContentVersion,
+    StorageDeletion,
+    StoredImage,
 )
 
 __all__ = [
     "User",
     "Recipe",
+    "RecipeCard",
     "Ingredient",
     "RecipeIngredient",
     "Instruction",
@@ -22,4 +28,8 @@ __all__ = [
     "Favorite",
     "UserRecipeNote",
     "MenuShoppingInfo",
+    "MenuSnapshot",
+    "ContentVersion",
+    "StorageDeletion",
+    "StoredImage",
 ]
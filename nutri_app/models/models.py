@@ -3,8 +3,8 @@
 import random
 import string
 
-from sqlalchemy import Index, event
-from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy import DDL, Index, event, inspect
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.orm import validates
 from sqlalchemy.sql import func
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -52,6 +52,10 @@ class Recipe(db.Model):
     local_image_path = db.Column(db.String(255), nullable=True)
     quality_img_URL = db.Column(db.String(255), nullable=True)
     compressed_img_URL = db.Column(db.String(255), nullable=True)
+    # Resized WebP/JPEG copies of the uploaded image by format, see image_utils
+    image_variants = db.Column(JSONB, nullable=True)
+    # SHA-256 of the uploaded image, the key of its StoredImage
+    image_digest = db.Column(db.String(64), nullable=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(
         db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -73,6 +77,8 @@ class Recipe(db.Model):
         cascade="all, delete-orphan",
     )
     title_search = db.Column(TSVECTOR)
+    # Weighted title (A), ingredient (B) and instruction (C) lexemes, see search_utils
+    search_document = db.Column(TSVECTOR)
 
     @validates("title")
     def validate_title(self, key, value):
@@ -83,10 +89,33 @@ class Recipe(db.Model):
 @event.listens_for(Recipe, "before_insert")
 @event.listens_for(Recipe, "before_update")
 def update_title_search(mapper, connection, target):
-    if target.title:
+    # Recompute the vector only when the title itself changed
+    if target.title and inspect(target).attrs.title.history.has_changes():
         target.title_search = func.to_tsvector("english", target.title)
 
 
+# RecipeCard model: denormalized read model of the recipe listings, see card_utils
+class RecipeCard(db.Model):
+    __tablename__ = "recipe_cards"
+
+    id = db.Column(
+        db.Integer, db.ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True
+    )
+    title = db.Column(db.String(255), nullable=False)
+    # First of compressed_img_URL, quality_img_URL and local_image_path
+    image_url = db.Column(db.String(255), nullable=True)
+    total_time = db.Column(db.Integer, nullable=False, default=0)
+    tag_names = db.Column(ARRAY(db.String(255)), nullable=False, default=list)
+    tag_types = db.Column(ARRAY(db.String(50)), nullable=False, default=list)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_recipe_cards_title_id", "title", "id"),
+        Index("ix_recipe_cards_tag_names", "tag_names", postgresql_using="gin"),
+        Index("ix_recipe_cards_tag_types", "tag_types", postgresql_using="gin"),
+    )
+
+
 # RecipeTranslation model for storing translations of recipes // TODO: add support for multiple languages
 class RecipeTranslation(db.Model):
     __tablename__ = "recipe_translations"
@@ -142,6 +171,12 @@ class RecipeIngredient(db.Model):
     unit = db.Column(db.String(50), nullable=True)
     quantity_notes = db.Column(db.String(50), nullable=True)
     ingredient_notes = db.Column(db.String(255), nullable=True)
+    # Quantity and unit parsed on write, see quantity_utils. The range is in the
+    # written unit, unit_factor converts it into canonical_unit.
+    quantity_min = db.Column(db.Float, nullable=True)
+    quantity_max = db.Column(db.Float, nullable=True)
+    canonical_unit = db.Column(db.String(50), nullable=True)
+    unit_factor = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(
         db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -238,6 +273,8 @@ class Favorite(db.Model):
     # Ensures a user cannot favorite the same recipe multiple times
     __table_args__ = (
         db.UniqueConstraint("user_id", "recipe_id", name="uq_user_recipe"),
+        # Serves the favorites filter and the "recently favorited" sort order
+        Index("ix_favorites_user_id_added_at", "user_id", "added_at", "id"),
     )
 
 
@@ -283,12 +320,83 @@ class MenuShoppingInfo(db.Model):
     meat_marinades_text = db.Column(db.Text, nullable=True)
     dressings_text = db.Column(db.Text, nullable=True)
     rules_and_tips_text = db.Column(db.Text, nullable=True)
+    # The texts parsed into lists and categories on write, see menus_utils
+    parsed_info = db.Column(JSONB, nullable=True)
+    updated_at = db.Column(
+        db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
 
     menu_tag = db.relationship("Tag")
 
 
+# MenuSnapshot model: pre-serialized weekly menu responses, see menu_snapshot_utils
+class MenuSnapshot(db.Model):
+    __tablename__ = "menu_snapshots"
+
+    menu_tag_id = db.Column(
+        db.Integer, db.ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Version of the recipes and shopping info the payload was built from
+    version = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    built_at = db.Column(
+        db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+# ContentVersion model: counters of derived content, see version_utils
+class ContentVersion(db.Model):
+    __tablename__ = "content_versions"
+
+    name = db.Column(db.String(100), primary_key=True)
+    # Incremented by every transaction that changes the content
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# StoredImage model: content-addressed image variants shared by the recipes
+class StoredImage(db.Model):
+    __tablename__ = "stored_images"
+
+    digest = db.Column(db.String(64), primary_key=True)
+    variants = db.Column(JSONB, nullable=False)
+    # Number of recipes whose image_digest is this digest
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+
+# StorageDeletion model: outbox of stored files to delete, see deletion_utils
+class StorageDeletion(db.Model):
+    __tablename__ = "storage_deletions"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    key = db.Column(db.String(512), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(
+        db.DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Serves the worker's scan for due deletions
+        Index("ix_storage_deletions_next_attempt_at", "next_attempt_at"),
+    )
+
+
+# Trigram operator classes used by the autocomplete index
+event.listen(
+    db.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+)
+
 # Adding indexing for search
 Index("ix_recipes_title_search", Recipe.title_search, postgresql_using="gin")
+Index("ix_recipes_search_document", Recipe.search_document, postgresql_using="gin")
+Index(
+    "ix_recipes_title_trgm",
+    Recipe.title,
+    postgresql_using="gin",
+    postgresql_ops={"title": "gin_trgm_ops"},
+)
 Index("ix_ingredients_name_search", Ingredient.name_search, postgresql_using="gin")
 Index(
     "ix_instructions_instruction_search",
@@ -0,0 +1,31 @@
+"""Administration routes."""
+
+import logging
+
+from flask import Blueprint, Response, abort, request, stream_with_context
+from flask_login import login_required
+
+from nutri_app.utils import admin_required, iter_catalog, iter_ndjson, parse_since
+
+bp = Blueprint("admin", __name__, url_prefix="/admin")
+logger = logging.getLogger(__name__)
+
+
+@bp.route("/export")
+@login_required
+@admin_required
+def export():
+    """Stream the catalog as NDJSON, optionally gzipped and limited to rows updated since a time."""
+    try:
+        since = parse_since(request.args.get("since"))
+    except ValueError:
+        abort(400, description="'since' must be an ISO 8601 timestamp.")
+    compress = request.args.get("gzip", type=int, default=0) == 1
+
+    filename = "catalog.ndjson.gz" if compress else "catalog.ndjson"
+    logger.info(f"Catalog export started (since={since}, gzip={compress}).")
+    return Response(
+        stream_with_context(iter_ndjson(iter_catalog(since), compress=compress)),
+        mimetype="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
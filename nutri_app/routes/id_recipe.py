@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+import logging
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
 from flask_login import current_user, login_required
-from sqlalchemy.orm import joinedload
+from sqlalchemy import func
 
 from nutri_app import db
 from nutri_app.models import (
@@ -9,67 +11,97 @@ from nutri_app.models import (
     Ingredient,
     Instruction,
     UserRecipeNote,
-    Favorite,
     Tag,
 )
 from nutri_app.utils import (
-    get_recipe_ingredients,
-    update_ingredients,
-    update_instructions,
-    update_tags,
+    MAX_SERVINGS,
+    cache_anonymous_page,
+    conditional_response,
+    format_changes,
+    get_recipe_version,
+    is_conditional_request,
+    invalidate_rendered_pages,
+    load_recipe_detail,
+    merge_ingredients,
+    merge_instructions,
+    merge_tags,
+    recipe_dependency,
+    recipe_validators,
+    refresh_recipe_cards,
+    refresh_search_documents,
+    scale_ingredients,
+    scaled_recipe_validators,
     update_notes,
     upload_image,
 )
 
 bp = Blueprint("recipe_id", __name__)
+logger = logging.getLogger(__name__)
 
 
 @bp.route("/recipe/<int:recipe_id>")
+@cache_anonymous_page(lambda recipe_id: (recipe_dependency(recipe_id),))
 def recipe_id(recipe_id):
     """Render the recipe detail page."""
-    # Fetch recipe and eager-load relationships
-    recipe = Recipe.query.options(
-        joinedload(Recipe.tags),
-        joinedload(Recipe.instructions),
-        joinedload(Recipe.ingredients),
-    ).get(recipe_id)
-
-    if not recipe:
-        abort(404, description=f"Recipe with ID {recipe_id} not found.")
-
-    # Instructions (already eager-loaded, but sorted just in case)
-    instructions = sorted(recipe.instructions, key=lambda x: x.step_number)
+    user_id = current_user.id if current_user.is_authenticated else None
+    detail = None
+
+    if user_id is None and is_conditional_request():
+        # Revalidations are answered from a primary key lookup, and the detail is
+        # only loaded when the client's copy is stale
+        version = get_recipe_version(recipe_id)
+        if version is None:
+            abort(404, description=f"Recipe with ID {recipe_id} not found.")
+        updated_at = version.updated_at
+    else:
+        # Recipe, tags, instructions, favorite flag and note, then ingredients:
+        # two queries, the page being validated from the loaded updated_at
+        detail = load_recipe_detail(recipe_id, user_id)
+        if not detail:
+            abort(404, description=f"Recipe with ID {recipe_id} not found.")
+        updated_at = detail["recipe"]["updated_at"]
+
+    def render_page():
+        page_detail = detail or load_recipe_detail(recipe_id, user_id)
+        if not page_detail:
+            abort(404, description=f"Recipe with ID {recipe_id} not found.")
+        recipe = page_detail["recipe"]
 
-    # Format ingredient data as needed
-    ingredients = get_recipe_ingredients(recipe_id)
+        # Check if this recipe has a 'my_recipe' tag to determine if it's editable
+        has_my_recipe_tag = user_id is not None and any(
+            tag["type"] == "my_recipe" for tag in recipe["tags"]
+        )
+        return render_template(
+            "recipes/recipe_id.html",
+            recipe=recipe,
+            ingredients=page_detail["ingredients"],
+            instructions=page_detail["instructions"],
+            favorite=page_detail["favorite"],
+            note=page_detail["note"],
+            user=current_user,
+            editable=has_my_recipe_tag,
+        )
 
-    # Set up initial values
-    has_my_recipe_tag = False
-    note = None
-    favorite_recipe_ids_set = set()
+    return conditional_response(recipe_validators(recipe_id, updated_at), render_page)
 
-    # Favorite recipes set and notes
-    if current_user:
-        favorite_recipe_ids_set = {
-            fav.recipe_id
-            for fav in Favorite.query.filter_by(user_id=current_user.id).all()
-        }
-        note = UserRecipeNote.query.filter_by(
-            user_id=current_user.id, recipe_id=recipe_id
-        ).first()
 
-        # Check if this recipe has a 'my_recipe' tag to determine if it's editable
-        has_my_recipe_tag = any(tag.type == "my_recipe" for tag in recipe.tags)
+@bp.route("/recipe/<int:recipe_id>/scaled")
+def scaled(recipe_id):
+    """Return the ingredients of a recipe rescaled to ?servings=N."""
+    servings = request.args.get("servings", type=int)
+    if servings is None or not 1 <= servings <= MAX_SERVINGS:
+        abort(
+            400,
+            description=f"'servings' must be an integer from 1 to {MAX_SERVINGS}.",
+        )
 
-    return render_template(
-        "recipes/recipe_id.html",
-        recipe=recipe,
-        ingredients=ingredients,
-        instructions=instructions,
-        favorite_recipe_ids_set=favorite_recipe_ids_set,
-        note=note,
-        user=current_user,
-        editable=has_my_recipe_tag,
+    # The version read here validates the request and keys the scaled list
+    version = get_recipe_version(recipe_id)
+    if version is None:
+        abort(404, description=f"Recipe with ID {recipe_id} not found.")
+    return conditional_response(
+        scaled_recipe_validators(recipe_id, servings, version.updated_at),
+        lambda: jsonify(scale_ingredients(recipe_id, servings, version)),
     )
 
 
@@ -121,15 +153,20 @@ def edit(recipe_id):
             flash("At least one instruction is required.", "error")
             return redirect(request.referrer)
 
-        # Update recipe details
-        recipe.title = title.strip()
-        recipe.servings = servings
-        recipe.prep_time = prep_time
-        recipe.cook_time = cook_time
-
-        # Remove existing ingredients first and update
-        recipe.ingredients.clear()
-        update_ingredients(
+        # Update only the recipe details that changed
+        changed_fields = []
+        for field, value in (
+            ("title", title.strip()),
+            ("servings", servings),
+            ("prep_time", prep_time),
+            ("cook_time", cook_time),
+        ):
+            if getattr(recipe, field) != value:
+                setattr(recipe, field, value)
+                changed_fields.append(field)
+
+        # Write only the ingredient, instruction and tag rows that differ
+        ingredient_changes = merge_ingredients(
             ingredient_names,
             quantities,
             units,
@@ -137,32 +174,59 @@ def edit(recipe_id):
             ingredient_notes,
             recipe,
         )
-
-        # Remove existing instructions first and update
-        recipe.instructions.clear()
-        update_instructions(instructions, steps, recipe)
-
-        # Remove existing tags first and update
-        recipe.tags.clear()
-        update_tags(tag_list, recipe)
+        instruction_changes = merge_instructions(instructions, steps, recipe)
+        tag_changes = merge_tags(tag_list, recipe)
 
         # Update notes
         update_notes(notes, recipe, current_user.id)
 
-        # Upload image
-        image = request.files.get("image")
-        upload_image(image, recipe)
+        # Queue the image, its variants replace the current ones once processed
+        upload_image(request.files.get("image"), recipe)
+
+        ingredients_changed = any(ingredient_changes.values())
+        instructions_changed = any(instruction_changes.values())
+        tags_changed = any(tag_changes.values())
+
+        # Re-index the title, ingredients and instructions for full-text search
+        if "title" in changed_fields or ingredients_changed or instructions_changed:
+            refresh_search_documents([recipe.id])
+
+        # Rebuild the listing card
+        if (
+            {"title", "prep_time", "cook_time"} & set(changed_fields)
+            or tags_changed
+        ):
+            refresh_recipe_cards([recipe.id])
+
+        # Bump the version only when the recipe content changed
+        if (
+            changed_fields
+            or ingredients_changed
+            or instructions_changed
+            or tags_changed
+        ):
+            recipe.updated_at = func.now()
+
+        logger.info(
+            f"Recipe {recipe.id} saved: fields {changed_fields or 'unchanged'}, "
+            f"ingredients {format_changes(ingredient_changes)}, "
+            f"instructions {format_changes(instruction_changes)}, "
+            f"tags {format_changes(tag_changes)}."
+        )
 
         db.session.commit()
+        invalidate_rendered_pages([recipe.id])
         flash("Recipe updated successfully!", "success")
         return redirect(url_for("recipes.recipe_id", recipe_id=recipe.id))
 
-    # If GET request, render the edit recipe form and pre-fill with current data
+    # If GET request, render the edit recipe form and pre-fill with current data.
+    # Ingredients are listed in display order, the order merge_ingredients pairs
+    # the submitted rows with the stored ones.
     ingredients = (
         db.session.query(RecipeIngredient, Ingredient)
         .join(Ingredient, RecipeIngredient.ingredient_id == Ingredient.id)
         .filter(RecipeIngredient.recipe_id == recipe.id)
-        .order_by(Ingredient.name)
+        .order_by(RecipeIngredient.id)
         .all()
     )
 
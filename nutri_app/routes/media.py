@@ -0,0 +1,17 @@
+"""Routes serving the files of the storage backend."""
+
+import logging
+
+from flask import Blueprint
+
+from nutri_app.utils import get_storage
+from nutri_app.utils.storage_utils import LOCAL_MEDIA_URL
+
+bp = Blueprint("media", __name__, url_prefix=LOCAL_MEDIA_URL)
+logger = logging.getLogger(__name__)
+
+
+@bp.route("/<path:key>")
+def media(key):
+    """Serve a stored file, from disk with the local backend or by redirect to S3."""
+    return get_storage().send(key)
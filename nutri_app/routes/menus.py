@@ -2,11 +2,25 @@
 
 import logging
 
-from flask import Blueprint, jsonify, render_template
-from sqlalchemy.orm import joinedload
-
-from nutri_app.models import Recipe, Tag, MenuShoppingInfo
-from nutri_app.utils import build_shopping_info, organize_recipes_by_day
+from flask import Blueprint, abort, current_app, jsonify, render_template, request
+from flask_login import current_user
+
+from nutri_app.models import Tag
+from nutri_app.utils import (
+    MAX_BATCH_MENUS,
+    MAX_SHOPPING_LIST_RECIPES,
+    MENU_FIELDS,
+    build_menus_batch,
+    build_shopping_list,
+    cache_anonymous_page,
+    conditional_get,
+    conditional_response,
+    get_favorite_ids,
+    get_menu_snapshot,
+    menu_categories_validators,
+    menu_validators,
+    menus_batch_validators,
+)
 
 
 bp = Blueprint("menus", __name__)
@@ -14,58 +28,56 @@ logger = logging.getLogger(__name__)
 
 
 @bp.route("/menus")
+@cache_anonymous_page()
 def menus():
     """Render the menus page with a list of menu names."""
     return render_template("menus/menus.html")
 
 
+@bp.route("/menus/batch", methods=["GET"])
+@conditional_get(menus_batch_validators)
+def get_menus_batch():
+    """Return several weekly menus from ?names=A,B, limited to ?fields=... if given."""
+    names = [name.strip() for name in request.args.get("names", "").split(",")]
+    names = list(dict.fromkeys(name for name in names if name))
+    if not names:
+        abort(400, description="No menus selected.")
+    if len(names) > MAX_BATCH_MENUS:
+        abort(400, description=f"At most {MAX_BATCH_MENUS} menus can be requested.")
+
+    fields = request.args.get("fields")
+    fields = (
+        tuple(field.strip() for field in fields.split(",")) if fields else MENU_FIELDS
+    )
+    unknown = set(fields) - set(MENU_FIELDS)
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+    return jsonify(build_menus_batch(names, fields))
+
+
 @bp.route("/menus/<menu_name>", methods=["GET"])
 def get_weekly_menu(menu_name):
     """Return structured weekly menu and shopping info for a given menu name."""
-    menu_tag = Tag.query.filter_by(name=menu_name, type="menu_name").first()
-    if not menu_tag:
+    # The response is pre-serialized, rebuilt only when the menu changed; the same
+    # query returns the version the response is validated from
+    menu_tag_id, version, body = get_menu_snapshot(menu_name)
+    if menu_tag_id is None:
         logger.warning(f"Menu '{menu_name}' not found.")
         return jsonify({"error": f"Menu '{menu_name}' not found."}), 404
 
-    # Fetch the menu shopping information
-    menu_shopping_info = MenuShoppingInfo.query.filter_by(
-        menu_tag_id=menu_tag.id
-    ).first()
-
-    # Preload tags for organizing recipes
-    meal_types = Tag.query.filter_by(type="meal_type").all()
-    days_of_week = Tag.query.filter_by(type="day_of_week").order_by(Tag.id).all()
-
-    # Retrieve recipes matching the menu, day, and meal type
-    recipes = (
-        Recipe.query.join(Recipe.tags)
-        .filter(
-            Recipe.tags.any(id=menu_tag.id),
-            Recipe.tags.any(Tag.type == "day_of_week"),
-            Recipe.tags.any(Tag.type == "meal_type"),
-            ~Recipe.tags.any(Tag.type == "my_recipe"),
-        )
-        .options(joinedload(Recipe.tags))
-        .all()
-    )
-
-    if recipes and meal_types and days_of_week:
-        # Organize by day and meal type
-        result = organize_recipes_by_day(recipes, days_of_week, meal_types)
-    else:
+    if body is None:
         logger.warning(f"No recipes found for menu '{menu_name}'.")
         return jsonify({"error": f"Recipes for '{menu_name}' were not found."}), 404
 
-    # Build shopping info if available
-    shopping_info = build_shopping_info(menu_shopping_info)
-
-    # Return the JSON response including menu shopping info
-    return jsonify(
-        {"menu": menu_name, "recipes_by_day": result, "shopping_info": shopping_info}
+    return conditional_response(
+        menu_validators(version),
+        lambda: current_app.response_class(body, mimetype="application/json"),
     )
 
 
 @bp.route("/menus/categories")
+@conditional_get(menu_categories_validators)
 def get_categories():
     """Return a list of menu categories with associated images for search modal in nav.js."""
     categories = Tag.query.filter_by(type="menu_name").order_by(Tag.name.asc()).all()
@@ -90,3 +102,34 @@ def get_categories():
         result.append({"name": category.name, "image_url": image_url})
 
     return jsonify(result)
+
+
+@bp.route("/shopping-list", methods=["GET"])
+def get_shopping_list():
+    """Return the summed ingredients of the recipes in ?ids=1,2,3, or of ?favorites=1."""
+    if request.args.get("favorites", type=int) == 1:
+        if not current_user.is_authenticated:
+            abort(401, description="Log in to build a list from your favorites.")
+        recipe_ids = sorted(get_favorite_ids(current_user.id))
+    else:
+        try:
+            recipe_ids = [
+                int(recipe_id)
+                for recipe_id in request.args.get("ids", "").split(",")
+                if recipe_id.strip()
+            ]
+        except ValueError:
+            abort(400, description="'ids' must be a comma-separated list of recipe IDs.")
+
+    if not recipe_ids:
+        abort(400, description="No recipes selected.")
+    if len(recipe_ids) > MAX_SHOPPING_LIST_RECIPES:
+        abort(
+            400,
+            description=f"At most {MAX_SHOPPING_LIST_RECIPES} recipes can be selected.",
+        )
+
+    return jsonify(
+        {"recipe_ids": recipe_ids, "items": build_shopping_list(recipe_ids)}
+    )
+
@@ -4,19 +4,38 @@ import logging
 
 from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import login_required, current_user
-from sqlalchemy import asc, desc, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, false
 
 from nutri_app import db
 from nutri_app.models import (
     Favorite,
     Ingredient,
     Recipe,
+    RecipeCard,
     Tag,
 )
 from nutri_app.utils import (
-    delete_s3_image,
-    get_tag_options,
+    ALL_RECIPES,
+    CARDS_VERSION,
+    CARD_COLUMNS,
+    bump_content_version,
+    cache_anonymous_page,
+    card_to_dict,
+    conditional_get,
+    get_favorite_ids,
+    get_search_query,
+    get_search_rank,
+    get_sort_keys,
+    get_tag_catalog,
+    invalidate_rendered_pages,
+    keyset_paginate,
+    order_by_sort_keys,
+    release_recipe_image,
+    recipe_list_validators,
+    refresh_recipe_cards,
+    refresh_search_documents,
+    search_titles,
+    update_cached_favorite,
     update_instructions,
     update_ingredients,
     update_tags,
@@ -30,20 +49,25 @@ logger = logging.getLogger(__name__)
 
 
 @bp.route("/")
+@cache_anonymous_page(lambda: (ALL_RECIPES,))
 def index():
     """Render the index page with a list of first 7 recipes."""
-    # Fetch first 7 recipes
-    recipes = Recipe.query.limit(7).all()
+    # Fetch first 7 recipe cards
+    cards = (
+        RecipeCard.query.with_entities(*CARD_COLUMNS)
+        .order_by(RecipeCard.id)
+        .limit(7)
+        .all()
+    )
 
     favorite_recipes = [
         {
-            "name": recipe.title.capitalize(),
-            "id": recipe.id,
-            "time": (recipe.prep_time or 0) + (recipe.cook_time or 0),
-            "image": recipe.compressed_img_URL
-            or "/static/img/recipes/placeholder-image.jpeg",
+            "name": card.title.capitalize(),
+            "id": card.id,
+            "time": card.total_time,
+            "image": card.image_url or "/static/img/recipes/placeholder-image.jpeg",
         }
-        for recipe in recipes
+        for card in cards
     ]
 
     return render_template("recipes/index.html", favorites=favorite_recipes)
@@ -51,114 +75,110 @@ def index():
 
 @bp.route("/search")
 def search():
-    """Search for recipes by title."""
-    q = request.args.get("q", "")
+    """Autocomplete recipes by title."""
+    q = request.args.get("q", "").strip()
     if q:
-        results = Recipe.query.filter(Recipe.title.ilike(f"%{q}%")).limit(10).all()
+        results = search_titles(q)
     else:
         results = []
         logger.warning("The recipes for this search were not found!")
 
-    return jsonify(
-        [
-            {
-                "title": r.title.capitalize(),
-                "id": r.id,
-                "thumbnail": r.compressed_img_URL,
-            }
-            for r in results
-        ]
-    )
+    return jsonify(results)
 
 
 @bp.route("/recipes")
+@conditional_get(recipe_list_validators, private=True)
 def recipes():
     search_query = request.args.get("search", "")
     filter_tag = request.args.get("filter", None)
     tag_type = request.args.get("tag_type")
     sort_order = request.args.get("sort", "default")
     page = request.args.get("page", 1, type=int)
+    # Keyset mode is selected by the presence of "cursor" (empty for the first page)
+    cursor = request.args.get("cursor")
     per_page = 9
 
     if current_user.is_authenticated:
-        favorite_recipes_ids = (
-            Favorite.query.filter_by(user_id=current_user.id)
-            .with_entities(Favorite.recipe_id)
-            .all()
-        )
-        favorite_recipe_ids_set = {recipe_id for recipe_id, in favorite_recipes_ids}
+        favorite_recipe_ids_set = get_favorite_ids(current_user.id)
     else:
-        favorite_recipe_ids_set = set()
+        favorite_recipe_ids_set = frozenset()
 
-    tag_types = db.session.query(Tag.type).distinct().all()
-    tag_options = get_tag_options(tag_types)
+    tag_options = get_tag_catalog()
 
-    # Full-text search query
+    # Base query over the denormalized recipe cards, fetched as plain row tuples
+    query = RecipeCard.query.with_entities(*CARD_COLUMNS)
+    search_rank = None
+
+    # Full-text search over the weighted title, ingredients and instructions document
     if search_query:
-        # Search in title, ingredients, and instructions
-        search_query_ts = func.websearch_to_tsquery("english", search_query)
-        search_conditions = Recipe.title_search.op("@@")(search_query_ts)
-
-        query = (
-            db.session.query(Recipe)
-            .join(Recipe.ingredients)
-            .join(Recipe.instructions)
-            .filter(search_conditions)
-            .distinct(Recipe.id)
+        search_query_ts = get_search_query(search_query)
+        query = query.join(Recipe, Recipe.id == RecipeCard.id).filter(
+            Recipe.search_document.op("@@")(search_query_ts)
         )
+        search_rank = get_search_rank(search_query_ts)
+
+    # Favorites are joined on (user_id, recipe_id) rather than sent as an IN list;
+    # the join also provides added_at for the "recently favorited" sort order
+    if filter_tag == "favorites" or sort_order == "recent":
+        if current_user.is_authenticated:
+            query = query.join(
+                Favorite,
+                and_(
+                    Favorite.recipe_id == RecipeCard.id,
+                    Favorite.user_id == current_user.id,
+                ),
+            )
+        else:
+            # Anonymous users have no favorites; "recent" falls back to the default order
+            if filter_tag == "favorites":
+                query = query.filter(false())
+            sort_order = "default"
 
-    else:
-        # Base query for recipes
-        query = Recipe.query.options(joinedload(Recipe.tags))
-
-    # Apply filter if a tag name is selected
+    # Apply filter if a tag name is selected, served by the GIN indexes on the tag arrays
     if filter_tag:
-        if filter_tag == "favorites":
-            query = query.filter(Recipe.id.in_(favorite_recipe_ids_set))
-        else:
-            query = query.join(Recipe.tags).filter(Tag.name == filter_tag)
+        if filter_tag != "favorites":
+            query = query.filter(RecipeCard.tag_names.contains([filter_tag]))
     elif tag_type:
-        query = query.join(Recipe.tags).filter(Tag.type == tag_type)
+        query = query.filter(RecipeCard.tag_types.contains([tag_type]))
 
-    # Apply sorting by title
-    if sort_order == "asc":
-        query = query.order_by(asc(Recipe.title))
-    elif sort_order == "desc":
-        query = query.order_by(desc(Recipe.title))
-    else:
-        query = query.order_by(Recipe.id.asc())
+    # Sorting by title, favorite date or search rank, with a unique tie-breaker
+    sort_keys = get_sort_keys(sort_order, search_rank)
 
     # Pagination
-    paginated_recipes = query.paginate(page=page, per_page=per_page, error_out=False)
+    if cursor is not None:
+        items, next_cursor = keyset_paginate(
+            query, sort_order, sort_keys, cursor, per_page
+        )
+        total_pages = None
+    else:
+        paginated_recipes = order_by_sort_keys(query, sort_keys).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        items, next_cursor = paginated_recipes.items, None
+        total_pages = paginated_recipes.pages
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        return jsonify(
-            {
-                "recipes": [
-                    {
-                        "title": recipe.title,
-                        "compressed_img_URL": recipe.compressed_img_URL
-                        or recipe.quality_img_URL
-                        or recipe.local_image_path,
-                        "prep_time": recipe.prep_time,
-                        "cook_time": recipe.cook_time,
-                        "tags": [{"name": tag.name} for tag in recipe.tags],
-                        "favorite": recipe.id in favorite_recipe_ids_set,
-                        "id": recipe.id,
-                    }
-                    for recipe in paginated_recipes.items
-                ],
-                "total_pages": paginated_recipes.pages,
-                "user": True if current_user else False,
-            }
-        )
+        response = {
+            "recipes": [
+                card_to_dict(card, favorite_recipe_ids_set) for card in items
+            ],
+            "user": True if current_user else False,
+        }
+        if cursor is not None:
+            response["next_cursor"] = next_cursor
+        else:
+            response["total_pages"] = total_pages
+        return jsonify(response)
     # Render the recipes page
     return render_template(
         "recipes/recipes.html",
-        recipes=paginated_recipes.items,
+        recipes=items,
         tag_options=tag_options,
         page=page,
-        total_pages=paginated_recipes.pages,
+        total_pages=total_pages or 0,
+        next_cursor=next_cursor,
+        search_query=search_query,
+        filter_tag=filter_tag,
         sort_order=sort_order,
         favorite_recipe_ids_set=favorite_recipe_ids_set,
         user=current_user,
@@ -181,6 +201,7 @@ def toggle_favorite(recipe_id):
     if favorite:
         db.session.delete(favorite)
         db.session.commit()
+        update_cached_favorite(current_user.id, recipe_id, False)
         return jsonify(
             {"success": True, "favorite": False, "message": "Removed from favorites!"}
         )
@@ -188,6 +209,7 @@ def toggle_favorite(recipe_id):
         new_favorite = Favorite(user_id=current_user.id, recipe_id=recipe_id)
         db.session.add(new_favorite)
         db.session.commit()
+        update_cached_favorite(current_user.id, recipe_id, True)
         return jsonify(
             {"success": True, "favorite": True, "message": "Added to favorites!"}
         )
@@ -265,11 +287,17 @@ def create():
         # Add notes
         update_notes(notes, recipe, current_user.id)
 
-        # Upload image
-        image = request.files.get("image")
-        upload_image(image, recipe)
+        # Index the title, ingredients and instructions for full-text search
+        refresh_search_documents([recipe.id])
+
+        # Build the listing card
+        refresh_recipe_cards([recipe.id])
+
+        # Queue the image, processed in the background once the recipe is committed
+        upload_image(request.files.get("image"), recipe)
 
         db.session.commit()
+        invalidate_rendered_pages([recipe.id])
         flash("Recipe added successfully!", "success")
         return redirect(url_for("recipes.recipe_id", recipe_id=recipe.id))
 
@@ -290,10 +318,13 @@ def delete(recipe_id):
         flash("You are not allowed to delete this recipe.", "error")
         return redirect(url_for("recipes.recipe_id", recipe_id=recipe.id))
 
-    delete_s3_image(recipe.quality_img_URL)
-    delete_s3_image(recipe.compressed_img_URL)
+    # The image is deleted in the background once no recipe uses it
+    release_recipe_image(recipe)
 
+    # The recipe card is removed by the foreign key cascade, outside card_utils
     db.session.delete(recipe)
+    bump_content_version(CARDS_VERSION)
     db.session.commit()
+    invalidate_rendered_pages([recipe_id])
     flash("Recipe deleted successfully!", "success")
     return redirect(url_for("recipes.index"))
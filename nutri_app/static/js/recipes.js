@@ -49,7 +49,7 @@ function fetchRecipes(page = 1, filter = "", sort = "", search = "") {
                                     ` : ''}
                                     <div class="cook-time d-flex justify-content-center align-items-center">
                                         &nbsp;<ion-icon name="time-outline"></ion-icon>
-                                        &nbsp; <span class="text-white">${recipe.prep_time + recipe.cook_time}</span>&nbsp; 
+                                        &nbsp; <span class="text-white">${recipe.total_time}</span>&nbsp; 
                                     </div>
                                     <div class="recipe-tags d-flex justify-content-start align-items-center">
                                         ${recipe.tags.map(tag => `<button class="btn btn-sm btn-outline-secondary rounded-3 mx-1 filter-btn" data-filter="${tag.name}">${tag.name}</button>`).join('')}
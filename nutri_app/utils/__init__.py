@@ -1,32 +1,209 @@
-from .auth_utils import generate_reset_token, verify_reset_token
+from .auth_utils import (
+    admin_required,
+    generate_reset_token,
+    is_admin,
+    verify_reset_token,
+)
+from .autocomplete_utils import search_titles
+from .card_utils import (
+    CARDS_VERSION,
+    CARD_COLUMNS,
+    card_to_dict,
+    refresh_recipe_cards,
+)
+from .catalog_utils import get_tag_catalog, invalidate_tag_catalog
+from .deletion_utils import (
+    init_deletion_worker,
+    process_storage_deletions,
+    queue_storage_deletions,
+)
+from .detail_utils import load_recipe_detail
+from .export_utils import iter_catalog, iter_ndjson, parse_since
+from .favorites_utils import get_favorite_ids, update_cached_favorite
+from .http_cache_utils import (
+    conditional_get,
+    conditional_response,
+    is_conditional_request,
+    make_etag,
+    menu_categories_validators,
+    menu_validators,
+    menus_batch_validators,
+    recipe_list_validators,
+    recipe_validators,
+    scaled_recipe_validators,
+)
+from .image_utils import (
+    image_srcset,
+    image_urls,
+    init_image_pipeline,
+    release_recipe_image,
+    upload_image,
+)
+from .import_utils import import_batch, read_bundle, validate_record
+from .menu_snapshot_utils import (
+    build_menu_payload,
+    get_menu_snapshot,
+    get_menu_versions,
+    refresh_menu_snapshots,
+)
 from .menus_utils import (
+    MAX_BATCH_MENUS,
+    MENU_FIELDS,
+    SHOPPING_INFO_FIELDS,
+    build_menus_batch,
     to_structured_list,
     build_shopping_info,
     organize_recipes_by_day,
+    parse_shopping_info,
+)
+from .orphan_utils import collect_orphans, diff_sorted
+from .pagination_utils import (
+    get_sort_keys,
+    keyset_paginate,
+    order_by_sort_keys,
+)
+from .profiling_utils import get_query_count, init_query_counter
+from .render_cache_utils import (
+    ALL_RECIPES,
+    cache_anonymous_page,
+    get_render_cache,
+    init_render_cache,
+    invalidate_rendered_pages,
+    recipe_dependency,
+)
+from .shopping_list_utils import MAX_SHOPPING_LIST_RECIPES, build_shopping_list
+from .storage_utils import (
+    LocalStorage,
+    S3Storage,
+    StorageBackend,
+    get_storage,
+    init_storage,
+)
+from .quantity_utils import (
+    backfill_quantity_columns,
+    normalize_unit,
+    parse_quantity,
+    quantity_columns,
+)
+from .scaling_utils import (
+    MAX_SERVINGS,
+    clear_scaled_cache,
+    get_recipe_version,
+    round_quantity,
+    scale_ingredients,
+)
+from .search_utils import (
+    get_search_query,
+    get_search_rank,
+    refresh_search_documents,
 )
 from .recipe_utils import (
-    delete_s3_image,
+    format_changes,
     get_tag_options,
     get_recipe_ingredients,
+    merge_ingredients,
+    merge_instructions,
+    merge_tags,
     update_ingredients,
     update_instructions,
     update_tags,
     update_notes,
-    upload_image,
 )
+from .version_utils import bump_content_version, get_content_version
 
 __all__ = [
+    "admin_required",
     "generate_reset_token",
+    "is_admin",
     "verify_reset_token",
+    "search_titles",
+    "CARDS_VERSION",
+    "CARD_COLUMNS",
+    "card_to_dict",
+    "refresh_recipe_cards",
+    "get_tag_catalog",
+    "invalidate_tag_catalog",
+    "init_deletion_worker",
+    "process_storage_deletions",
+    "queue_storage_deletions",
+    "load_recipe_detail",
+    "iter_catalog",
+    "iter_ndjson",
+    "parse_since",
+    "get_favorite_ids",
+    "update_cached_favorite",
+    "conditional_get",
+    "conditional_response",
+    "is_conditional_request",
+    "make_etag",
+    "menu_categories_validators",
+    "menu_validators",
+    "menus_batch_validators",
+    "recipe_list_validators",
+    "recipe_validators",
+    "scaled_recipe_validators",
+    "image_srcset",
+    "image_urls",
+    "init_image_pipeline",
+    "release_recipe_image",
+    "upload_image",
+    "import_batch",
+    "read_bundle",
+    "validate_record",
+    "build_menu_payload",
+    "get_menu_snapshot",
+    "get_menu_versions",
+    "refresh_menu_snapshots",
     "to_structured_list",
     "build_shopping_info",
     "organize_recipes_by_day",
-    "delete_s3_image",
+    "parse_shopping_info",
+    "SHOPPING_INFO_FIELDS",
+    "MAX_BATCH_MENUS",
+    "MENU_FIELDS",
+    "build_menus_batch",
+    "collect_orphans",
+    "diff_sorted",
+    "get_sort_keys",
+    "keyset_paginate",
+    "order_by_sort_keys",
+    "get_query_count",
+    "init_query_counter",
+    "ALL_RECIPES",
+    "cache_anonymous_page",
+    "get_render_cache",
+    "init_render_cache",
+    "invalidate_rendered_pages",
+    "recipe_dependency",
+    "MAX_SHOPPING_LIST_RECIPES",
+    "build_shopping_list",
+    "LocalStorage",
+    "S3Storage",
+    "StorageBackend",
+    "get_storage",
+    "init_storage",
+    "backfill_quantity_columns",
+    "normalize_unit",
+    "parse_quantity",
+    "quantity_columns",
+    "MAX_SERVINGS",
+    "clear_scaled_cache",
+    "get_recipe_version",
+    "round_quantity",
+    "scale_ingredients",
+    "get_search_query",
+    "get_search_rank",
+    "refresh_search_documents",
+    "format_changes",
     "get_tag_options",
     "get_recipe_ingredients",
+    "merge_ingredients",
+    "merge_instructions",
+    "merge_tags",
     "update_ingredients",
     "update_instructions",
     "update_tags",
     "update_notes",
-    "upload_image",
+    "bump_content_version",
+    "get_content_version",
 ]
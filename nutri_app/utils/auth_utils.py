@@ -1,6 +1,9 @@
 """Token configuration for password reset"""
 
-from flask import current_app
+from functools import wraps
+
+from flask import abort, current_app
+from flask_login import current_user
 from itsdangerous import URLSafeTimedSerializer
 
 
@@ -17,3 +20,22 @@ def verify_reset_token(token: str, max_age=3600) -> str | None:
         return s.loads(token, salt="password-reset-salt", max_age=max_age)
     except Exception:
         return None
+
+
+def is_admin(user: object) -> bool:
+    """Check whether a user is listed in the ADMIN_EMAILS configuration"""
+    return user.is_authenticated and user.email in current_app.config.get(
+        "ADMIN_EMAILS", ()
+    )
+
+
+def admin_required(view):
+    """Restrict a view to the administrators, answering 403 to everyone else"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin(current_user):
+            abort(403, description="Administrator access required.")
+        return view(*args, **kwargs)
+
+    return wrapper
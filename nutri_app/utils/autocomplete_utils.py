@@ -0,0 +1,177 @@
+"""Recipe title autocomplete for the navbar search."""
+
+import bisect
+import logging
+import threading
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+from nutri_app import db
+from nutri_app.models import Recipe
+from .cache_utils import MISSING, LRUCache, invalidate_on_commit
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_LIMIT = 10
+
+# Seconds after which the index is rebuilt. Commits in this process invalidate it
+# at once; recipes written by other workers or the CLI show up within this delay.
+PREFIX_INDEX_TTL = 300
+
+_index_lock = threading.Lock()
+_prefix_index = LRUCache(maxsize=1, ttl=PREFIX_INDEX_TTL)
+# Bumped by every invalidation, so that a build that read the titles before a
+# commit does not store its stale index after the commit cleared it
+_index_generation = 0
+
+
+def normalize_title(text: str) -> str:
+    """Casefold a title and collapse its whitespace for prefix matching."""
+    return " ".join(text.casefold().split())
+
+
+def to_suggestion(recipe_id: int, title: str, thumbnail: str | None) -> dict:
+    """Format one autocomplete suggestion as returned by the /search endpoint."""
+    return {"title": title.capitalize(), "id": recipe_id, "thumbnail": thumbnail}
+
+
+class TitlePrefixIndex:
+    """
+    Sorted arrays of normalized recipe titles searched with bisect.
+    Whole titles are matched first, then the titles whose later words start
+    with the typed prefix (e.g. "chi" finds "Grilled chicken").
+    """
+
+    def __init__(self, rows: list[tuple]):
+        """
+        Build the index.
+        Args:
+            rows (list[tuple]): List of (recipe id, title, thumbnail URL) tuples.
+        """
+        self.suggestions = []
+        title_keys = []
+        word_keys = []
+
+        for ref, (recipe_id, title, thumbnail) in enumerate(rows):
+            self.suggestions.append(to_suggestion(recipe_id, title, thumbnail))
+            words = normalize_title(title).split(" ")
+            title_keys.append((" ".join(words), ref))
+            for start in range(1, len(words)):
+                word_keys.append((" ".join(words[start:]), ref))
+
+        title_keys.sort()
+        word_keys.sort()
+        self._levels = [
+            ([key for key, _ in title_keys], [ref for _, ref in title_keys]),
+            ([key for key, _ in word_keys], [ref for _, ref in word_keys]),
+        ]
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def lookup(self, prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[dict]:
+        """
+        Find the suggestions whose title or one of its words starts with the prefix.
+        Args:
+            prefix (str): The text typed by the user.
+            limit (int): Maximum number of suggestions.
+        Returns:
+            list[dict]: Matching suggestions, whole-title matches first.
+        """
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        for keys, refs in self._levels:
+            i = bisect.bisect_left(keys, prefix)
+            while i < len(keys) and len(results) < limit and keys[i].startswith(prefix):
+                if refs[i] not in seen:
+                    seen.add(refs[i])
+                    results.append(self.suggestions[refs[i]])
+                i += 1
+        return results
+
+
+def get_prefix_index() -> TitlePrefixIndex:
+    """
+    Get the in-memory prefix index, building it with one query on first use and
+    once PREFIX_INDEX_TTL has elapsed.
+    Returns:
+        TitlePrefixIndex: The index over all recipe titles.
+    """
+    index = _prefix_index.get("index")
+    if index is not MISSING:
+        return index
+
+    with _index_lock:
+        index = _prefix_index.get("index")
+        if index is MISSING:
+            generation = _index_generation
+            rows = db.session.query(
+                Recipe.id, Recipe.title, Recipe.compressed_img_URL
+            ).all()
+            index = TitlePrefixIndex(rows)
+            if generation == _index_generation:
+                _prefix_index.set("index", index)
+            logger.info(f"Title prefix index built with {len(rows)} recipes.")
+        return index
+
+
+@invalidate_on_commit("title_prefix_index", Recipe)
+def invalidate_prefix_index() -> None:
+    """Drop the prefix index so the next autocomplete request rebuilds it."""
+    global _index_generation
+
+    _index_generation += 1
+    _prefix_index.clear()
+    logger.info("Title prefix index invalidated.")
+
+
+def search_titles_in_db(q: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[dict]:
+    """
+    Find recipe titles containing or resembling the query through the pg_trgm index.
+    Args:
+        q (str): The text typed by the user.
+        limit (int): Maximum number of suggestions.
+    Returns:
+        list[dict]: Matching suggestions, prefix matches first, then by similarity.
+    """
+    similarity = func.similarity(Recipe.title, q)
+    rows = (
+        db.session.query(Recipe.id, Recipe.title, Recipe.compressed_img_URL)
+        .filter(
+            or_(
+                Recipe.title.icontains(q, autoescape=True),
+                Recipe.title.bool_op("%")(q),
+            )
+        )
+        .order_by(
+            Recipe.title.istartswith(q, autoescape=True).desc(),
+            similarity.desc(),
+            Recipe.id,
+        )
+        .limit(limit)
+        .all()
+    )
+    return [to_suggestion(*row) for row in rows]
+
+
+def search_titles(q: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[dict]:
+    """
+    Autocomplete recipe titles.
+    When AUTOCOMPLETE_PREFIX_INDEX is enabled, prefix matches are served from
+    memory and Postgres is only queried for fuzzy matches of unknown prefixes.
+    Args:
+        q (str): The text typed by the user.
+        limit (int): Maximum number of suggestions.
+    Returns:
+        list[dict]: Matching suggestions.
+    """
+    if current_app.config.get("AUTOCOMPLETE_PREFIX_INDEX"):
+        results = get_prefix_index().lookup(q, limit)
+        if results:
+            return results
+    return search_titles_in_db(q, limit)
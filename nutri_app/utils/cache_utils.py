@@ -0,0 +1,142 @@
+"""In-process cache primitives and their invalidation when the underlying rows change."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding the names of the caches to invalidate on commit
+PENDING_INVALIDATIONS = "pending_cache_invalidations"
+
+# Sentinel returned by LRUCache.get for missing or expired entries
+MISSING = object()
+
+_invalidation_callbacks = {}
+_watched_models = {}
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entries and expires old ones."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        """
+        Create the cache.
+        Args:
+            maxsize (int): Maximum number of entries kept.
+            ttl (float, optional): Seconds after which an entry expires, None to never expire.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: object, default: object = MISSING) -> object:
+        """Return the cached value of a key, or default when it is missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: object, value: object) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def update(self, key: object, func) -> None:
+        """Replace a cached value with func(value), only if the key is currently cached."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                self._data[key] = (func(value), expires_at)
+
+    def delete(self, key: object) -> None:
+        """Remove a key from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._data.clear()
+
+
+def _mark_pending(session: Session, model: type) -> None:
+    names = _watched_models.get(model)
+    if session is not None and names:
+        session.info.setdefault(PENDING_INVALIDATIONS, set()).update(names)
+
+
+def _mark_pending_on_write(mapper, connection, target):
+    _mark_pending(object_session(target), mapper.class_)
+
+
+def invalidate_on_commit(name: str, *models: type):
+    """
+    Register a cache invalidation callback run after a transaction that wrote
+    any of the given models is committed.
+    Rows written in a transaction that is rolled back never trigger the callback.
+    Args:
+        name (str): Unique name of the cache.
+        models (type): Mapped classes whose inserts, updates and deletes invalidate the cache.
+    Returns:
+        Callable: Decorator registering the callback.
+    """
+
+    def decorator(callback):
+        _invalidation_callbacks[name] = callback
+        for model in models:
+            if model not in _watched_models:
+                _watched_models[model] = set()
+                for event_name in ("after_insert", "after_update", "after_delete"):
+                    event.listen(model, event_name, _mark_pending_on_write)
+            _watched_models[model].add(name)
+        return callback
+
+    return decorator
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_pending_on_bulk_write(orm_execute_state):
+    """Bulk UPDATE/DELETE statements bypass the mapper events."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _mark_pending(orm_execute_state.session, mapper.class_)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_pending_invalidations(session):
+    # Invalidate only once the write is visible to other sessions
+    for name in session.info.pop(PENDING_INVALIDATIONS, ()):
+        try:
+            _invalidation_callbacks[name]()
+        except Exception as e:
+            logger.error(f"Failed to invalidate cache '{name}': {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session):
+    session.info.pop(PENDING_INVALIDATIONS, None)
@@ -0,0 +1,98 @@
+"""Maintenance of the denormalized recipe-card read model used by the listings."""
+
+import logging
+
+from sqlalchemy import String, distinct, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert
+
+from nutri_app import db
+from nutri_app.models import Recipe, RecipeCard, RecipeTag, Tag
+from .version_utils import bump_content_version
+
+logger = logging.getLogger(__name__)
+
+# Content version bumped with every change of the cards, see version_utils
+CARDS_VERSION = "recipe_cards"
+
+# Columns read by the listing pages, fetched as plain row tuples
+CARD_COLUMNS = (
+    RecipeCard.id,
+    RecipeCard.title,
+    RecipeCard.image_url,
+    RecipeCard.total_time,
+    RecipeCard.tag_names,
+)
+
+
+def _recipe_tag_array(expression: object) -> object:
+    """Aggregate a tag expression of the correlated recipe into an array, empty when untagged."""
+    return (
+        select(func.coalesce(expression, literal([], ARRAY(String))))
+        .select_from(RecipeTag)
+        .join(Tag, Tag.id == RecipeTag.tag_id)
+        .where(RecipeTag.recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+
+
+def refresh_recipe_cards(recipe_ids: list[int]) -> None:
+    """
+    Upsert the cards of the given recipes with one INSERT ... SELECT ... ON CONFLICT.
+    Cards of deleted recipes are removed by the foreign key cascade. The cards
+    version is bumped in the same transaction.
+    Args:
+        recipe_ids (list[int]): IDs of the recipes whose cards are rebuilt.
+    """
+    if not recipe_ids:
+        return
+
+    db.session.flush()
+    card_rows = select(
+        Recipe.id,
+        Recipe.title,
+        func.coalesce(
+            Recipe.compressed_img_URL, Recipe.quality_img_URL, Recipe.local_image_path
+        ),
+        func.coalesce(Recipe.prep_time, 0) + func.coalesce(Recipe.cook_time, 0),
+        _recipe_tag_array(func.array_agg(aggregate_order_by(Tag.name, Tag.id))),
+        _recipe_tag_array(func.array_agg(distinct(Tag.type))),
+        func.now(),
+    ).where(Recipe.id.in_(recipe_ids))
+
+    stmt = insert(RecipeCard).from_select(
+        ["id", "title", "image_url", "total_time", "tag_names", "tag_types", "updated_at"],
+        card_rows,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RecipeCard.id],
+        set_={
+            "title": stmt.excluded.title,
+            "image_url": stmt.excluded.image_url,
+            "total_time": stmt.excluded.total_time,
+            "tag_names": stmt.excluded.tag_names,
+            "tag_types": stmt.excluded.tag_types,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.session.execute(stmt)
+    bump_content_version(CARDS_VERSION)
+    logger.info(f"Recipe cards refreshed for {len(recipe_ids)} recipe(s).")
+
+
+def card_to_dict(card: object, favorite_recipe_ids_set: frozenset) -> dict:
+    """
+    Serialize a recipe-card row for the listing XHR response.
+    Args:
+        card (Row): A row selected with CARD_COLUMNS.
+        favorite_recipe_ids_set (frozenset): IDs of the current user's favorite recipes.
+    Returns:
+        dict: The card as expected by recipes.js.
+    """
+    return {
+        "title": card.title,
+        "compressed_img_URL": card.image_url,
+        "total_time": card.total_time,
+        "tags": [{"name": name} for name in card.tag_names],
+        "favorite": card.id in favorite_recipe_ids_set,
+        "id": card.id,
+    }
@@ -0,0 +1,55 @@
+"""In-process catalog of the tag filter options shown on the recipes listing."""
+
+import logging
+import threading
+
+from nutri_app import db
+from nutri_app.models import RecipeTag, Tag
+from .cache_utils import MISSING, LRUCache, invalidate_on_commit
+from .recipe_utils import get_tag_options
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which the catalog is reloaded. Commits in this process invalidate
+# it at once; tags written by other workers or the CLI show up within this delay.
+TAG_CATALOG_TTL = 60
+
+_catalog_lock = threading.Lock()
+_tag_catalog = LRUCache(maxsize=1, ttl=TAG_CATALOG_TTL)
+# Bumped by every invalidation, so that a load that read the tags before a commit
+# does not store its stale catalog after the commit cleared it
+_catalog_generation = 0
+
+
+def get_tag_catalog() -> dict[str, list[str]]:
+    """
+    Get the tag filter options, loading them with a single query on first use and
+    once TAG_CATALOG_TTL has elapsed.
+    The returned dictionary is shared between requests and must not be modified.
+    Returns:
+        dict[str, list[str]]: Dictionary with tag type names as keys and sorted tag names as values.
+    """
+    catalog = _tag_catalog.get("catalog")
+    if catalog is not MISSING:
+        return catalog
+
+    with _catalog_lock:
+        catalog = _tag_catalog.get("catalog")
+        if catalog is MISSING:
+            generation = _catalog_generation
+            tag_rows = db.session.query(Tag.type, Tag.name).distinct().all()
+            catalog = get_tag_options(tag_rows)
+            if generation == _catalog_generation:
+                _tag_catalog.set("catalog", catalog)
+            logger.info(f"Tag catalog loaded with {len(tag_rows)} tags.")
+        return catalog
+
+
+@invalidate_on_commit("tag_catalog", Tag, RecipeTag)
+def invalidate_tag_catalog() -> None:
+    """Drop the cached tag options so the next request reloads them."""
+    global _catalog_generation
+
+    _catalog_generation += 1
+    _tag_catalog.clear()
+    logger.info("Tag catalog invalidated.")
@@ -0,0 +1,191 @@
+"""Outbox of stored files to delete, drained in batches by a background worker."""
+
+import logging
+import threading
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.orm import Session
+
+from nutri_app import db
+from nutri_app.models import StorageDeletion
+from .storage_utils import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Session.info key set when the transaction queued deletions
+PENDING_DELETIONS = "pending_storage_deletions"
+
+# Deletions given up after this many failed attempts, see the last_error column
+MAX_DELETION_ATTEMPTS = 8
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff between two attempts at deleting a file.
+    Args:
+        attempts (int): The number of failed attempts so far.
+    Returns:
+        timedelta: 30 seconds doubled at each attempt, at most one hour.
+    """
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+def queue_storage_deletions(urls: set[str] | list[str]) -> int:
+    """
+    Queue the files behind public URLs for deletion in the current transaction,
+    so that they are only deleted if the change that drops them is committed.
+    Args:
+        urls (set[str] | list[str]): Public URLs of the files.
+    Returns:
+        int: The number of queued files.
+    """
+    storage = get_storage()
+    keys = set()
+    for url in urls:
+        key = storage.key_from_url(url) if url else None
+        if key:
+            keys.add(key)
+        else:
+            logger.warning(f"Could not extract a storage key from URL: {url}")
+
+    if keys:
+        db.session.add_all(StorageDeletion(key=key) for key in sorted(keys))
+        db.session.info[PENDING_DELETIONS] = True
+    return len(keys)
+
+
+def process_storage_deletions(batch_size: int = 1000) -> tuple[int, int]:
+    """
+    Delete one batch of due files and record the failures for a later retry.
+    The rows are locked with SKIP LOCKED so that several workers never share a batch.
+    Args:
+        batch_size (int): Maximum number of files deleted.
+    Returns:
+        tuple[int, int]: The number of deleted and failed files.
+    """
+    rows = db.session.execute(
+        select(StorageDeletion.id, StorageDeletion.key, StorageDeletion.attempts)
+        .where(
+            StorageDeletion.next_attempt_at <= func.now(),
+            StorageDeletion.attempts < MAX_DELETION_ATTEMPTS,
+        )
+        .order_by(StorageDeletion.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.session.commit()
+        return 0, 0
+
+    errors = get_storage().delete_many(list({row.key for row in rows}))
+
+    deleted_ids = [row.id for row in rows if row.key not in errors]
+    if deleted_ids:
+        db.session.execute(
+            delete(StorageDeletion).where(StorageDeletion.id.in_(deleted_ids))
+        )
+
+    failed = [row for row in rows if row.key in errors]
+    for row in failed:
+        attempts = row.attempts + 1
+        db.session.execute(
+            update(StorageDeletion)
+            .where(StorageDeletion.id == row.id)
+            .values(
+                attempts=attempts,
+                next_attempt_at=func.now() + retry_delay(attempts),
+                last_error=errors[row.key],
+            )
+        )
+        if attempts >= MAX_DELETION_ATTEMPTS:
+            logger.error(f"Giving up deleting {row.key}: {errors[row.key]}")
+    db.session.commit()
+
+    logger.info(f"Deleted {len(deleted_ids)} stored file(s), {len(failed)} failed.")
+    return len(deleted_ids), len(failed)
+
+
+class DeletionWorker:
+    """Daemon thread draining the deletion outbox when woken up, and periodically."""
+
+    def __init__(self, app: object, poll_interval: float, batch_size: int):
+        """
+        Configure the worker, the thread is started by start() or the first wake-up.
+        Args:
+            app (Flask): The Flask application instance.
+            poll_interval (float): Seconds between two scans, which pick up the retries.
+            batch_size (int): Files deleted per batch.
+        """
+        self.app = app
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Start the thread if it is not running. Its first scan drains the rows left
+        by previous runs, such as due retries, without waiting for a new deletion.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="storage-deletions", daemon=True
+                )
+                self._thread.start()
+
+    def wake(self) -> None:
+        """Ask the worker to drain the outbox now, starting it if needed."""
+        self.start()
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            # Cleared before the scan, so a wake-up during the scan triggers another
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    # Drain full batches until only retries that are not due are left
+                    done = self.batch_size
+                    while done == self.batch_size:
+                        done = sum(process_storage_deletions(self.batch_size))
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception(f"Storage deletion worker failed: {e}")
+            self._wakeup.wait(self.poll_interval)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_deletion_worker(session):
+    if session.info.pop(PENDING_DELETIONS, False):
+        worker = current_app.extensions.get("storage_deletions")
+        if worker is not None:
+            worker.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_deletions(session):
+    session.info.pop(PENDING_DELETIONS, None)
+
+
+def init_deletion_worker(app: object) -> None:
+    """
+    Create and start the background worker of the deletion outbox when
+    STORAGE_DELETION_WORKER is enabled. Otherwise the outbox is drained by
+    'flask nutricat process-deletions'.
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    if not app.config.get("STORAGE_DELETION_WORKER"):
+        return
+
+    worker = DeletionWorker(
+        app,
+        poll_interval=app.config.get("STORAGE_DELETION_POLL_INTERVAL", 60),
+        batch_size=app.config.get("STORAGE_DELETION_BATCH_SIZE", 1000),
+    )
+    app.extensions["storage_deletions"] = worker
+    worker.start()
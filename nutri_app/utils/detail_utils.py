@@ -0,0 +1,122 @@
+"""Assembly of the recipe detail page data in a bounded number of queries."""
+
+import logging
+
+from sqlalchemy import exists, false, func, literal_column, null, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from nutri_app import db
+from nutri_app.models import (
+    Favorite,
+    Instruction,
+    Recipe,
+    RecipeTag,
+    Tag,
+    UserRecipeNote,
+)
+from .recipe_utils import get_recipe_ingredients
+
+logger = logging.getLogger(__name__)
+
+EMPTY_JSON_ARRAY = literal_column("'[]'::json")
+
+
+def load_recipe_detail(recipe_id: int, user_id: int | None = None) -> dict | None:
+    """
+    Load everything the recipe detail page needs in two queries.
+    The first query returns the recipe with its tags, ordered instructions, the user's
+    favorite flag and note; the second returns the ingredients with their quantities.
+    Args:
+        recipe_id (int): The ID of the recipe.
+        user_id (int, optional): The ID of the current user, None for anonymous visitors.
+    Returns:
+        dict | None: The recipe, instructions, ingredients, favorite flag and note, or None if not found.
+    """
+    tags = (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object("name", Tag.name, "type", Tag.type),
+                        Tag.id,
+                    )
+                ),
+                EMPTY_JSON_ARRAY,
+            )
+        )
+        .select_from(RecipeTag)
+        .join(Tag, Tag.id == RecipeTag.tag_id)
+        .where(RecipeTag.recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+    instructions = (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "step_number",
+                            Instruction.step_number,
+                            "instruction",
+                            Instruction.instruction,
+                        ),
+                        Instruction.step_number,
+                    )
+                ),
+                EMPTY_JSON_ARRAY,
+            )
+        )
+        .where(Instruction.recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+
+    if user_id is not None:
+        favorite = exists().where(
+            Favorite.user_id == user_id, Favorite.recipe_id == Recipe.id
+        )
+        note = (
+            select(func.json_build_object("note", UserRecipeNote.note))
+            .where(
+                UserRecipeNote.user_id == user_id,
+                UserRecipeNote.recipe_id == Recipe.id,
+            )
+            .scalar_subquery()
+        )
+    else:
+        favorite = false()
+        note = null()
+
+    row = db.session.execute(
+        select(
+            Recipe.id,
+            Recipe.title,
+            Recipe.servings,
+            Recipe.prep_time,
+            Recipe.cook_time,
+            Recipe.local_image_path,
+            Recipe.quality_img_URL,
+            Recipe.compressed_img_URL,
+            Recipe.image_variants,
+            Recipe.updated_at,
+            tags.label("tags"),
+            instructions.label("instructions"),
+            favorite.label("favorite"),
+            note.label("note"),
+        ).where(Recipe.id == recipe_id)
+    ).first()
+
+    if row is None:
+        return None
+
+    recipe = dict(row._mapping)
+    instructions = recipe.pop("instructions")
+    favorite = recipe.pop("favorite")
+    note = recipe.pop("note")
+
+    return {
+        "recipe": recipe,
+        "instructions": instructions,
+        "ingredients": get_recipe_ingredients(recipe_id),
+        "favorite": bool(favorite),
+        "note": note,
+    }
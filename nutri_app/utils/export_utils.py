@@ -0,0 +1,193 @@
+"""Streaming export of the recipe catalog as NDJSON."""
+
+import json
+import logging
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from nutri_app import db
+from nutri_app.models import (
+    Ingredient,
+    Instruction,
+    MenuShoppingInfo,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+)
+from .import_utils import SHOPPING_INFO_FIELDS
+
+logger = logging.getLogger(__name__)
+
+RECIPE_FIELDS = (
+    "id",
+    "title",
+    "servings",
+    "prep_time",
+    "cook_time",
+    "local_image_path",
+    "quality_img_URL",
+    "compressed_img_URL",
+    "created_at",
+    "updated_at",
+)
+
+# Uncompressed bytes gathered before a chunk is sent
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_since(value: str | None) -> datetime | None:
+    """
+    Parse the ISO 8601 timestamp of an incremental export, naive times being UTC.
+    Args:
+        value (str, optional): The timestamp, None or empty for a full export.
+    Returns:
+        datetime | None: The aware timestamp, or None.
+    Raises:
+        ValueError: If the value is not an ISO 8601 timestamp.
+    """
+    if not value:
+        return None
+    since = datetime.fromisoformat(value)
+    return since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+
+
+def _group_by_recipe(rows: Iterable, fields: tuple) -> dict[int, list[dict]]:
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.recipe_id, []).append(
+            {field: getattr(row, field) for field in fields}
+        )
+    return grouped
+
+
+def iter_catalog(since: datetime | None = None, batch_size: int = 500) -> Iterator[dict]:
+    """
+    Stream the catalog in the record format read by the import command.
+    Recipes are read through a server-side cursor, batch_size at a time, and each
+    batch's ingredients, instructions and tags are loaded with one query each,
+    so memory use does not grow with the catalog. Menu shopping infos follow the recipes.
+    Args:
+        since (datetime, optional): Only export rows updated after this time.
+        batch_size (int): Recipes fetched per round trip.
+    Returns:
+        Iterator[dict]: Recipe records, then menu records.
+    """
+    recipes = select(*(getattr(Recipe, field) for field in RECIPE_FIELDS)).order_by(
+        Recipe.id
+    )
+    if since is not None:
+        recipes = recipes.where(Recipe.updated_at > since)
+
+    result = db.session.execute(recipes.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        recipe_ids = [row.id for row in partition]
+
+        ingredients = _group_by_recipe(
+            db.session.execute(
+                select(
+                    RecipeIngredient.recipe_id,
+                    Ingredient.name,
+                    RecipeIngredient.quantity,
+                    RecipeIngredient.unit,
+                    RecipeIngredient.quantity_notes,
+                    RecipeIngredient.ingredient_notes,
+                )
+                .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+                .where(RecipeIngredient.recipe_id.in_(recipe_ids))
+                .order_by(RecipeIngredient.id)
+            ),
+            ("name", "quantity", "unit", "quantity_notes", "ingredient_notes"),
+        )
+        instructions = _group_by_recipe(
+            db.session.execute(
+                select(
+                    Instruction.recipe_id, Instruction.step_number, Instruction.instruction
+                )
+                .where(Instruction.recipe_id.in_(recipe_ids))
+                .order_by(Instruction.step_number, Instruction.id)
+            ),
+            ("step_number", "instruction"),
+        )
+        tags = _group_by_recipe(
+            db.session.execute(
+                select(RecipeTag.recipe_id, Tag.name, Tag.type)
+                .join(Tag, Tag.id == RecipeTag.tag_id)
+                .where(RecipeTag.recipe_id.in_(recipe_ids))
+                .order_by(Tag.id)
+            ),
+            ("name", "type"),
+        )
+
+        for row in partition:
+            yield {
+                **row._asdict(),
+                "ingredients": ingredients.get(row.id, []),
+                "instructions": instructions.get(row.id, []),
+                "tags": tags.get(row.id, []),
+            }
+
+    menus = (
+        select(
+            Tag.name,
+            *(getattr(MenuShoppingInfo, field) for field in SHOPPING_INFO_FIELDS),
+        )
+        .join(Tag, Tag.id == MenuShoppingInfo.menu_tag_id)
+        .order_by(Tag.name)
+    )
+    if since is not None:
+        menus = menus.where(MenuShoppingInfo.updated_at > since)
+
+    for row in db.session.execute(menus.execution_options(yield_per=batch_size)):
+        yield {
+            "menu": row.name,
+            **{field: row._mapping[field] for field in SHOPPING_INFO_FIELDS},
+        }
+
+
+def _json_default(value: object) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def iter_ndjson(records: Iterable[dict], compress: bool = False) -> Iterator[bytes]:
+    """
+    Encode records as NDJSON chunks, optionally as one gzip stream.
+    Args:
+        records (Iterable[dict]): The records to encode.
+        compress (bool): Whether to gzip the output.
+    Returns:
+        Iterator[bytes]: Chunks of roughly CHUNK_SIZE uncompressed bytes.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = []
+    buffered = 0
+    count = 0
+
+    def flush():
+        chunk = b"".join(buffer)
+        buffer.clear()
+        return compressor.compress(chunk) if compressor else chunk
+
+    for record in records:
+        line = json.dumps(record, default=_json_default, ensure_ascii=False)
+        line = line.encode() + b"\n"
+        buffer.append(line)
+        buffered += len(line)
+        count += 1
+        if buffered >= CHUNK_SIZE:
+            buffered = 0
+            chunk = flush()
+            if chunk:
+                yield chunk
+
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+    logger.info(f"Catalog export finished with {count} records.")
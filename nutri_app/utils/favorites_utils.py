@@ -0,0 +1,50 @@
+"""Per-user favorite recipes, cached in process."""
+
+import logging
+
+from nutri_app import db
+from nutri_app.models import Favorite
+from .cache_utils import MISSING, LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Favorites cache configuration
+FAVORITES_CACHE_SIZE = 10_000
+FAVORITES_CACHE_TTL = 300
+
+_favorites_cache = LRUCache(maxsize=FAVORITES_CACHE_SIZE, ttl=FAVORITES_CACHE_TTL)
+
+
+def get_favorite_ids(user_id: int) -> frozenset[int]:
+    """
+    Get the IDs of a user's favorite recipes, loading them on a cache miss.
+    Args:
+        user_id (int): The ID of the user.
+    Returns:
+        frozenset[int]: IDs of the recipes the user has favorited.
+    """
+    favorite_ids = _favorites_cache.get(user_id)
+    if favorite_ids is MISSING:
+        favorite_ids = frozenset(
+            recipe_id
+            for recipe_id, in db.session.query(Favorite.recipe_id).filter(
+                Favorite.user_id == user_id
+            )
+        )
+        _favorites_cache.set(user_id, favorite_ids)
+    return favorite_ids
+
+
+def update_cached_favorite(user_id: int, recipe_id: int, favorite: bool) -> None:
+    """
+    Write a favorite change through to the cache once it is committed.
+    Users whose favorites are not cached are left to load on their next request.
+    Args:
+        user_id (int): The ID of the user.
+        recipe_id (int): The ID of the recipe.
+        favorite (bool): True if the recipe was added, False if it was removed.
+    """
+    if favorite:
+        _favorites_cache.update(user_id, lambda ids: ids | {recipe_id})
+    else:
+        _favorites_cache.update(user_id, lambda ids: ids - {recipe_id})
@@ -0,0 +1,226 @@
+"""HTTP validators (ETag / Last-Modified) answering conditional GETs before rendering."""
+
+import hashlib
+import logging
+from datetime import datetime
+from functools import wraps
+
+from flask import make_response, request, session
+from flask_login import current_user
+
+from .card_utils import CARDS_VERSION
+from .catalog_utils import get_tag_catalog
+from .favorites_utils import get_favorite_ids
+from .menu_snapshot_utils import get_menu_versions
+from .menus_utils import MAX_BATCH_MENUS
+from .version_utils import get_content_version
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(*parts: object) -> str:
+    """
+    Build an ETag from the values a response is derived from.
+    Args:
+        parts (object): Values whose change changes the response.
+    Returns:
+        str: The hex digest used as ETag.
+    """
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def is_not_modified(etag: str, last_modified: datetime | None = None) -> bool:
+    """
+    Check the request's conditional headers against the current validators.
+    If-None-Match takes precedence over If-Modified-Since, as required by RFC 9110.
+    Args:
+        etag (str): The current ETag.
+        last_modified (datetime, optional): The current modification time.
+    Returns:
+        bool: True if the client's copy is still valid.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def is_conditional_request() -> bool:
+    """Check whether the request carries If-None-Match or If-Modified-Since."""
+    return bool(request.if_none_match) or request.if_modified_since is not None
+
+
+def conditional_response(
+    validators: tuple | None, render, private: bool = False
+) -> object:
+    """
+    Answer with a 304 when the client's copy is still valid, otherwise render the
+    response, and add the validators to full responses.
+    Args:
+        validators (tuple | None): (etag, last_modified), None to render unvalidated.
+        render (Callable): Returns the full response.
+        private (bool, optional): The response depends on the user, so shared caches
+                                  must not store it.
+    Returns:
+        Response: The 304 or the rendered response.
+    """
+    if validators is None:
+        return render()
+
+    etag, last_modified = validators
+    if is_not_modified(etag, last_modified):
+        response = make_response("", 304)
+    else:
+        response = make_response(render())
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Let browsers and the CDN keep the copy but revalidate it on every use
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    return response
+
+
+def conditional_get(validators, private: bool = False):
+    """
+    Answer GET requests with a 304 when the client's copy is still valid,
+    and add the validators to full responses.
+    Args:
+        validators (Callable): Returns (etag, last_modified) from the view arguments,
+                               or None when the response must not be validated.
+        private (bool, optional): The response depends on the user, see
+                                  conditional_response.
+    Returns:
+        Callable: Decorator wrapping the view.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            current = validators(**view_args) if request.method == "GET" else None
+            return conditional_response(
+                current, lambda: view(**view_args), private
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def recipe_validators(recipe_id: int, updated_at: datetime) -> tuple | None:
+    """
+    Validators of the recipe detail page, served to anonymous visitors only since
+    signed-in users see their own favorite flag, note and CSRF-protected forms.
+    The view reads updated_at with a primary key lookup for conditional requests,
+    and from the first detail query otherwise.
+    Args:
+        recipe_id (int): The ID of the recipe.
+        updated_at (datetime): When the recipe was last changed.
+    Returns:
+        tuple | None: (etag, last_modified), or None when the page is not validated.
+    """
+    if (
+        request.method != "GET"
+        or current_user.is_authenticated
+        or "_flashes" in session
+        or updated_at is None
+    ):
+        return None
+    return make_etag("recipe", recipe_id, updated_at.isoformat()), updated_at
+
+
+def scaled_recipe_validators(
+    recipe_id: int, servings: int, updated_at: datetime
+) -> tuple:
+    """
+    Validators of the scaled ingredients of a recipe. The view computes them from
+    the version it passes on to scale_ingredients.
+    Args:
+        recipe_id (int): The ID of the recipe.
+        servings (int): The requested number of servings.
+        updated_at (datetime): When the recipe was last changed.
+    Returns:
+        tuple: (etag, last_modified).
+    """
+    return (
+        make_etag("scaled", recipe_id, servings, updated_at.isoformat()),
+        updated_at,
+    )
+
+
+def menu_validators(menu_version: str) -> tuple:
+    """
+    Validators of a weekly menu, from the version of its recipes and shopping info.
+    The view passes the version its snapshot was checked against.
+    Args:
+        menu_version (str): The version of the menu.
+    Returns:
+        tuple: (etag, None).
+    """
+    return make_etag("menu", menu_version), None
+
+
+def menus_batch_validators() -> tuple | None:
+    """
+    Validators of the multi-menu response, from the versions of the requested menus
+    and the selected fields.
+    Returns:
+        tuple | None: (etag, None), or None when the request is invalid.
+    """
+    names = [name.strip() for name in request.args.get("names", "").split(",")]
+    names = [name for name in names if name]
+    if not names or len(names) > MAX_BATCH_MENUS:
+        return None
+
+    versions = get_menu_versions(names)
+    return (
+        make_etag(
+            "menus",
+            tuple((name, versions.get(name)) for name in names),
+            request.args.get("fields"),
+        ),
+        None,
+    )
+
+
+def menu_categories_validators() -> tuple:
+    """
+    Validators of the menu categories, from the menu names of the cached tag catalog.
+    Returns:
+        tuple: (etag, None).
+    """
+    return make_etag("menu_categories", tuple(get_tag_catalog().get("Menu", ()))), None
+
+
+def recipe_list_validators() -> tuple | None:
+    """
+    Validators of the recipe listing XHR response, from the version of the recipe
+    cards and the current user's favorites. The HTML page is not validated.
+    Returns:
+        tuple | None: (etag, None), or None for non-XHR requests.
+    """
+    if request.headers.get("X-Requested-With") != "XMLHttpRequest":
+        return None
+
+    cards_version = get_content_version(CARDS_VERSION)
+
+    if current_user.is_authenticated:
+        user_id = current_user.id
+        favorite_ids = tuple(sorted(get_favorite_ids(user_id)))
+    else:
+        user_id, favorite_ids = None, ()
+
+    return (
+        make_etag(
+            "recipes",
+            cards_version,
+            user_id,
+            favorite_ids,
+        ),
+        None,
+    )
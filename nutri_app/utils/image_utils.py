@@ -0,0 +1,353 @@
+"""Background pipeline turning uploaded recipe images into resized WebP/JPEG variants."""
+
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy import delete, event, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import abort
+
+from nutri_app import db
+from nutri_app.models import Recipe, StorageDeletion, StoredImage
+from .card_utils import refresh_recipe_cards
+from .deletion_utils import queue_storage_deletions
+from .render_cache_utils import invalidate_rendered_pages
+from .storage_utils import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Image upload configuration
+MAX_FILE_SIZE = 4 * 1024 * 1024
+
+# Session.info key holding the uploads to process once the recipe is committed
+PENDING_IMAGES = "pending_recipe_images"
+
+# Variant name and maximum width, None keeping the original size
+IMAGE_VARIANTS = (("card", 480), ("detail", 1200), ("original", None))
+
+# Output format: Pillow format, content type and encoder options
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": (
+        "JPEG",
+        "image/jpeg",
+        {"quality": 82, "optimize": True, "progressive": True},
+    ),
+}
+
+# Variant file names are unique, so clients may keep them forever
+VARIANT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def upload_image(image: object, recipe: object) -> None:
+    """
+    Validate an uploaded image and queue it for processing once the recipe is committed.
+    The upload is decoded, resized and stored off the request thread, unless the same
+    content is already stored.
+    Args:
+        image (object): The image file to be uploaded.
+        recipe (object): The recipe object to which the image belongs.
+    """
+    if not image or not image.filename:
+        return
+
+    data = image.read(MAX_FILE_SIZE + 1)
+    if len(data) > MAX_FILE_SIZE:
+        abort(400, description="File is too large. Maximum size is 4MB.")
+
+    # Only the header and the file structure are checked here, the pixels are
+    # decoded by the worker
+    try:
+        with Image.open(io.BytesIO(data)) as uploaded:
+            pixels = uploaded.width * uploaded.height
+            uploaded.verify()
+    except Image.DecompressionBombError:
+        abort(400, description="Image dimensions are too large.")
+    except (UnidentifiedImageError, SyntaxError, OSError, ValueError):
+        abort(400, description="File is not a supported image.")
+
+    # Images Pillow only warns about would still be decoded in full by the worker
+    if Image.MAX_IMAGE_PIXELS and pixels > Image.MAX_IMAGE_PIXELS:
+        abort(400, description="Image dimensions are too large.")
+
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == recipe.image_digest:
+        logger.info(f"Recipe {recipe.id} already has image {digest}.")
+        return
+
+    if recipe.id is None:
+        db.session.flush()
+
+    db.session.info.setdefault(PENDING_IMAGES, []).append((recipe.id, data, digest))
+    logger.info(f"Image {digest} of recipe {recipe.id} queued for processing.")
+
+
+def render_variants(data: bytes) -> list[dict]:
+    """
+    Decode an image once and encode each size in each output format, without metadata.
+    Sizes larger than the original are skipped.
+    Args:
+        data (bytes): The uploaded image.
+    Returns:
+        list[dict]: Variants with name, width, height, format, content_type and body.
+    """
+    with Image.open(io.BytesIO(data)) as uploaded:
+        # Apply the EXIF orientation before the EXIF block is dropped
+        source = ImageOps.exif_transpose(uploaded)
+        source.load()
+
+    if source.mode in ("RGBA", "LA", "P"):
+        source = source.convert("RGBA")
+        opaque = Image.new("RGB", source.size, "white")
+        opaque.paste(source, mask=source.getchannel("A"))
+    else:
+        source = source.convert("RGB")
+        opaque = source
+
+    variants = []
+    widths = set()
+    for name, max_width in IMAGE_VARIANTS:
+        width = min(max_width or source.width, source.width)
+        if width in widths:
+            continue
+        widths.add(width)
+        height = max(1, round(source.height * width / source.width))
+
+        for fmt, (pil_format, content_type, options) in IMAGE_FORMATS.items():
+            image = source if fmt == "webp" else opaque
+            if width != source.width:
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            body = io.BytesIO()
+            image.save(body, pil_format, **options)
+            variants.append(
+                {
+                    "name": name,
+                    "width": width,
+                    "height": height,
+                    "format": fmt,
+                    "content_type": content_type,
+                    "body": body.getvalue(),
+                }
+            )
+    return variants
+
+
+def variant_key(digest: str, variant: dict) -> str:
+    """
+    Content-addressed storage key of a variant.
+    Args:
+        digest (str): SHA-256 of the uploaded image.
+        variant (dict): A variant from render_variants.
+    Returns:
+        str: The key, in the image folder.
+    """
+    folder = current_app.config.get("STORAGE_IMAGE_FOLDER", "recipe_images")
+    return f"{folder}/{digest}_{variant['name']}.{variant['format']}"
+
+
+def store_variants(variants: list[dict], digest: str) -> dict[str, list[dict]]:
+    """
+    Save the variants in the storage backend, next to the other recipe images.
+    Args:
+        variants (list[dict]): Variants from render_variants.
+        digest (str): SHA-256 of the uploaded image.
+    Returns:
+        dict[str, list[dict]]: Per format, the name, width and URL of the variants.
+    """
+    storage = get_storage()
+    stored = {}
+    for variant in variants:
+        url = storage.save(
+            variant_key(digest, variant),
+            variant["body"],
+            variant["content_type"],
+            cache_control=VARIANT_CACHE_CONTROL,
+        )
+        stored.setdefault(variant["format"], []).append(
+            {"name": variant["name"], "width": variant["width"], "url": url}
+        )
+
+    for entries in stored.values():
+        entries.sort(key=lambda entry: entry["width"])
+    return stored
+
+
+def acquire_stored_image(data: bytes, digest: str) -> dict[str, list[dict]]:
+    """
+    Take a reference on the variants of an image, rendering and storing them only
+    when the content is not stored yet.
+    Args:
+        data (bytes): The uploaded image.
+        digest (str): SHA-256 of the uploaded image.
+    Returns:
+        dict[str, list[dict]]: The stored variants.
+    """
+    reused = db.session.execute(
+        update(StoredImage)
+        .where(StoredImage.digest == digest)
+        .values(refcount=StoredImage.refcount + 1)
+        .returning(StoredImage.variants)
+    ).first()
+    if reused is not None:
+        logger.info(f"Image {digest} is already stored, reusing its variants.")
+        return reused.variants
+
+    variants = render_variants(data)
+    # Keep the outbox from deleting the files of a previous release of this content.
+    # This waits for a worker deleting them, so the upload below comes after.
+    db.session.execute(
+        delete(StorageDeletion).where(
+            StorageDeletion.key.in_([variant_key(digest, v) for v in variants])
+        )
+    )
+    stored = store_variants(variants, digest)
+
+    stmt = insert(StoredImage).values(digest=digest, variants=stored, refcount=1)
+    # An identical upload processed concurrently stored the same keys
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StoredImage.digest],
+        set_={"refcount": StoredImage.refcount + 1},
+    )
+    db.session.execute(stmt)
+    return stored
+
+
+def release_stored_image(digest: str) -> None:
+    """
+    Drop a reference on the variants of an image, deleting them with the last one.
+    Args:
+        digest (str): SHA-256 of the image.
+    """
+    released = db.session.execute(
+        update(StoredImage)
+        .where(StoredImage.digest == digest)
+        .values(refcount=StoredImage.refcount - 1)
+        .returning(StoredImage.refcount, StoredImage.variants)
+    ).first()
+    if released is None or released.refcount > 0:
+        return
+
+    db.session.execute(delete(StoredImage).where(StoredImage.digest == digest))
+    queue_storage_deletions(
+        [entry["url"] for entries in released.variants.values() for entry in entries]
+    )
+    logger.info(f"Image {digest} is no longer used, its variants will be deleted.")
+
+
+def release_recipe_image(recipe: object) -> None:
+    """
+    Release the image of a recipe that is deleted or gets another image.
+    Images uploaded before content addressing are queued for deletion directly.
+    Args:
+        recipe (object): The recipe.
+    """
+    if recipe.image_digest:
+        release_stored_image(recipe.image_digest)
+    else:
+        queue_storage_deletions(image_urls(recipe))
+
+
+def image_urls(recipe: object) -> set[str]:
+    """
+    Collect every stored image URL of a recipe.
+    Args:
+        recipe (object): The recipe.
+    Returns:
+        set[str]: The URLs of the variants and of the legacy image columns.
+    """
+    urls = {recipe.quality_img_URL, recipe.compressed_img_URL}
+    for entries in (recipe.image_variants or {}).values():
+        urls.update(entry["url"] for entry in entries)
+    urls.discard(None)
+    return urls
+
+
+def image_srcset(variants: dict | None, fmt: str = "jpeg") -> str:
+    """
+    Build the srcset attribute of a recipe image, registered as a template global.
+    Args:
+        variants (dict, optional): The image_variants of a recipe.
+        fmt (str): The output format to list.
+    Returns:
+        str: "<url> <width>w" entries, empty when the recipe has no variants.
+    """
+    return ", ".join(
+        f"{entry['url']} {entry['width']}w" for entry in (variants or {}).get(fmt, [])
+    )
+
+
+def process_recipe_image(recipe_id: int, data: bytes, digest: str) -> None:
+    """
+    Point a recipe at the variants of an uploaded image, and release its previous image.
+    Args:
+        recipe_id (int): The ID of the recipe.
+        data (bytes): The uploaded image.
+        digest (str): SHA-256 of the uploaded image.
+    """
+    stored = acquire_stored_image(data, digest)
+
+    recipe = db.session.get(Recipe, recipe_id, with_for_update=True)
+    if recipe is None or recipe.image_digest == digest:
+        logger.info(f"Recipe {recipe_id} was deleted or has image {digest} already.")
+        release_stored_image(digest)
+        db.session.commit()
+        return
+
+    release_recipe_image(recipe)
+    jpegs = stored["jpeg"]
+    recipe.image_digest = digest
+    recipe.image_variants = stored
+    recipe.compressed_img_URL = jpegs[0]["url"]
+    recipe.quality_img_URL = next(
+        (entry["url"] for entry in jpegs if entry["name"] == "detail"), jpegs[-1]["url"]
+    )
+    refresh_recipe_cards([recipe_id])
+    db.session.commit()
+    invalidate_rendered_pages([recipe_id])
+    logger.info(f"Image {digest} of recipe {recipe_id} processed.")
+
+
+def _run_image_job(app: object, recipe_id: int, data: bytes, digest: str) -> None:
+    with app.app_context():
+        try:
+            process_recipe_image(recipe_id, data, digest)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(
+                f"Failed to process image {digest} of recipe {recipe_id}: {e}"
+            )
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_pending_images(session):
+    # The worker must see the committed recipe
+    pending = session.info.pop(PENDING_IMAGES, ())
+    if not pending:
+        return
+    app = current_app._get_current_object()
+    executor = app.extensions["image_pipeline"]
+    for recipe_id, data, digest in pending:
+        executor.submit(_run_image_job, app, recipe_id, data, digest)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_images(session):
+    session.info.pop(PENDING_IMAGES, None)
+
+
+def init_image_pipeline(app: object) -> None:
+    """
+    Create the worker threads processing uploaded images and register image_srcset.
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.extensions["image_pipeline"] = ThreadPoolExecutor(
+        max_workers=app.config.get("IMAGE_PIPELINE_WORKERS", 2),
+        thread_name_prefix="image-pipeline",
+    )
+    app.add_template_global(image_srcset)
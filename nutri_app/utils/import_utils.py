@@ -0,0 +1,363 @@
+"""Bulk import of recipe bundles through staging tables and COPY."""
+
+import csv
+import gzip
+import io
+import json
+import logging
+from collections.abc import Iterator
+
+from sqlalchemy import text
+
+from nutri_app import db
+from .card_utils import refresh_recipe_cards
+from .menus_utils import SHOPPING_INFO_FIELDS, parse_shopping_info
+from .quantity_utils import quantity_columns
+from .search_utils import refresh_search_documents
+
+logger = logging.getLogger(__name__)
+
+# CSV columns holding JSON-encoded lists
+CSV_JSON_COLUMNS = ("ingredients", "instructions", "tags")
+
+# Session-local staging tables, emptied by every commit
+STAGING_TABLES = {
+    "import_recipes": (
+        "title text, servings integer, prep_time integer, cook_time integer, "
+        "local_image_path text, quality_img_url text, compressed_img_url text"
+    ),
+    "import_ingredients": (
+        "title text, position integer, name text, quantity text, unit text, "
+        "quantity_notes text, ingredient_notes text, quantity_min double precision, "
+        "quantity_max double precision, canonical_unit text, unit_factor double precision"
+    ),
+    "import_instructions": "title text, step_number integer, instruction text",
+    "import_tags": "title text, name text, type text",
+    "import_shopping": "menu_name text, "
+    + ", ".join(f"{field} text" for field in SHOPPING_INFO_FIELDS)
+    + ", parsed_info jsonb",
+}
+
+# Set-wise statements resolving the staged rows into the catalog tables, in order
+UPSERT_RECIPES = text(
+    """
+    INSERT INTO recipes (title, servings, prep_time, cook_time, local_image_path,
+                         "quality_img_URL", "compressed_img_URL", title_search)
+    SELECT title, coalesce(servings, 1), prep_time, cook_time, local_image_path,
+           quality_img_url, compressed_img_url, to_tsvector('english', title)
+    FROM import_recipes
+    ON CONFLICT (title) DO UPDATE SET
+        servings = excluded.servings,
+        prep_time = excluded.prep_time,
+        cook_time = excluded.cook_time,
+        local_image_path = coalesce(excluded.local_image_path, recipes.local_image_path),
+        "quality_img_URL" = coalesce(excluded."quality_img_URL", recipes."quality_img_URL"),
+        "compressed_img_URL" = coalesce(excluded."compressed_img_URL", recipes."compressed_img_URL"),
+        updated_at = now()
+    RETURNING id
+    """
+)
+CLEAR_CHILDREN = [
+    text("DELETE FROM recipe_ingredients WHERE recipe_id = ANY(:recipe_ids)"),
+    text("DELETE FROM instructions WHERE recipe_id = ANY(:recipe_ids)"),
+    text("DELETE FROM recipe_tags WHERE recipe_id = ANY(:recipe_ids)"),
+]
+RESOLVE_CHILDREN = [
+    # Sorted inserts keep parallel chunks from deadlocking on shared names
+    text(
+        """
+        INSERT INTO ingredients (name, name_search)
+        SELECT name, to_tsvector('english', name)
+        FROM (SELECT DISTINCT name FROM import_ingredients) AS names
+        ORDER BY name
+        ON CONFLICT (name) DO NOTHING
+        """
+    ),
+    text(
+        """
+        INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity, unit,
+                                        quantity_notes, ingredient_notes, quantity_min,
+                                        quantity_max, canonical_unit, unit_factor)
+        SELECT r.id, i.id, s.quantity, s.unit, s.quantity_notes, s.ingredient_notes,
+               s.quantity_min, s.quantity_max, s.canonical_unit, s.unit_factor
+        FROM import_ingredients s
+        JOIN recipes r ON r.title = s.title
+        JOIN ingredients i ON i.name = s.name
+        ORDER BY r.id, s.position
+        """
+    ),
+    text(
+        """
+        INSERT INTO instructions (recipe_id, step_number, instruction, instruction_search)
+        SELECT r.id, s.step_number, s.instruction, to_tsvector('english', s.instruction)
+        FROM import_instructions s
+        JOIN recipes r ON r.title = s.title
+        ORDER BY r.id, s.step_number
+        """
+    ),
+    text(
+        """
+        INSERT INTO tags (name, type)
+        SELECT name, type FROM (
+            SELECT name, type FROM import_tags
+            UNION
+            SELECT menu_name, 'menu_name' FROM import_shopping
+        ) AS staged
+        ORDER BY name, type
+        ON CONFLICT (name, type) DO NOTHING
+        """
+    ),
+    text(
+        """
+        INSERT INTO recipe_tags (recipe_id, tag_id)
+        SELECT DISTINCT r.id, t.id
+        FROM import_tags s
+        JOIN recipes r ON r.title = s.title
+        JOIN tags t ON t.name = s.name AND t.type = s.type
+        ON CONFLICT DO NOTHING
+        """
+    ),
+    text(
+        f"""
+        INSERT INTO menu_shopping_infos
+            (menu_tag_id, {", ".join(SHOPPING_INFO_FIELDS)}, parsed_info)
+        SELECT t.id, {", ".join(f"s.{f}" for f in SHOPPING_INFO_FIELDS)}, s.parsed_info
+        FROM import_shopping s
+        JOIN tags t ON t.name = s.menu_name AND t.type = 'menu_name'
+        ON CONFLICT (menu_tag_id) DO UPDATE SET
+            {", ".join(f"{f} = excluded.{f}" for f in SHOPPING_INFO_FIELDS)},
+            parsed_info = excluded.parsed_info,
+            updated_at = now()
+        """
+    ),
+]
+
+
+def read_bundle(path: str, fmt: str | None = None) -> Iterator[tuple[int, dict]]:
+    """
+    Stream the records of a JSONL or CSV bundle, optionally gzip-compressed.
+    Recipe records carry a "title"; menu records carry a "menu" name and its shopping info.
+    In CSV bundles the ingredients, instructions and tags columns hold JSON lists.
+    Args:
+        path (str): Path of the bundle file.
+        fmt (str, optional): "jsonl" or "csv", guessed from the file extension when None.
+    Returns:
+        Iterator[tuple[int, dict]]: Line number and record, one at a time.
+    """
+    plain_path = path[:-3] if path.endswith(".gz") else path
+    fmt = fmt or ("csv" if plain_path.endswith(".csv") else "jsonl")
+    opener = gzip.open if path.endswith(".gz") else open
+
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                record = {key: value or None for key, value in row.items()}
+                try:
+                    for column in CSV_JSON_COLUMNS:
+                        if record.get(column):
+                            record[column] = json.loads(record[column])
+                except ValueError as e:
+                    record = {"_error": f"invalid JSON in column '{column}': {e}"}
+                yield line_no, record
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    record = {"_error": f"invalid JSON: {e}"}
+                yield line_no, record
+
+
+def _check_text(
+    errors: list, record: dict, field: str, max_length: int, required: bool = False
+) -> None:
+    value = record.get(field)
+    if value is None:
+        if required:
+            errors.append(f"'{field}' is required")
+    elif not isinstance(value, str) or (required and not value.strip()):
+        errors.append(f"'{field}' must be a non-empty string")
+    elif len(value) > max_length:
+        errors.append(f"'{field}' is longer than {max_length} characters")
+
+
+def _check_int(errors: list, record: dict, field: str, minimum: int) -> None:
+    value = record.get(field)
+    if value is None:
+        return
+    try:
+        if int(value) < minimum:
+            errors.append(f"'{field}' must be at least {minimum}")
+    except (TypeError, ValueError):
+        errors.append(f"'{field}' must be an integer")
+
+
+def validate_record(record: dict) -> list[str]:
+    """
+    Validate a bundle record against the catalog schema.
+    Args:
+        record (dict): A recipe or menu record.
+    Returns:
+        list[str]: Error messages, empty when the record is valid.
+    """
+    if not isinstance(record, dict):
+        return ["record must be an object"]
+    if "_error" in record:
+        return [record["_error"]]
+
+    errors = []
+    if "menu" in record:
+        _check_text(errors, record, "menu", 255, required=True)
+        for field in SHOPPING_INFO_FIELDS:
+            _check_text(errors, record, field, 1_000_000)
+        return errors
+
+    _check_text(errors, record, "title", 255, required=True)
+    _check_int(errors, record, "servings", 1)
+    _check_int(errors, record, "prep_time", 0)
+    _check_int(errors, record, "cook_time", 0)
+    for field in ("local_image_path", "quality_img_URL", "compressed_img_URL"):
+        _check_text(errors, record, field, 255)
+
+    for position, ingredient in enumerate(record.get("ingredients") or []):
+        if not isinstance(ingredient, dict):
+            errors.append(f"ingredient {position} must be an object")
+            continue
+        _check_text(errors, ingredient, "name", 255, required=True)
+        for field in ("quantity", "unit", "quantity_notes"):
+            _check_text(errors, ingredient, field, 50)
+        _check_text(errors, ingredient, "ingredient_notes", 255)
+
+    for position, instruction in enumerate(record.get("instructions") or []):
+        if isinstance(instruction, str):
+            instruction = {"instruction": instruction}
+        if not isinstance(instruction, dict):
+            errors.append(f"instruction {position} must be a string or an object")
+            continue
+        _check_text(errors, instruction, "instruction", 1_000_000, required=True)
+        _check_int(errors, instruction, "step_number", 1)
+
+    for position, tag in enumerate(record.get("tags") or []):
+        if not isinstance(tag, dict):
+            errors.append(f"tag {position} must be an object")
+            continue
+        _check_text(errors, tag, "name", 255, required=True)
+        _check_text(errors, tag, "type", 50, required=True)
+
+    return errors
+
+
+def _staging_rows(records: list[dict]) -> dict[str, list[tuple]]:
+    """Flatten validated records into the rows of each staging table."""
+    rows = {table: [] for table in STAGING_TABLES}
+    # A title or menu repeated within a batch keeps its last record
+    recipes = {r["title"].strip(): r for r in records if "menu" not in r}
+    menus = {r["menu"].strip(): r for r in records if "menu" in r}
+
+    for title, record in recipes.items():
+        rows["import_recipes"].append(
+            (
+                title,
+                record.get("servings"),
+                record.get("prep_time"),
+                record.get("cook_time"),
+                record.get("local_image_path"),
+                record.get("quality_img_URL"),
+                record.get("compressed_img_URL"),
+            )
+        )
+        for position, ingredient in enumerate(record.get("ingredients") or []):
+            rows["import_ingredients"].append(
+                (
+                    title,
+                    position,
+                    ingredient["name"].strip(),
+                    ingredient.get("quantity"),
+                    ingredient.get("unit"),
+                    ingredient.get("quantity_notes"),
+                    ingredient.get("ingredient_notes"),
+                    *quantity_columns(
+                        ingredient.get("quantity"), ingredient.get("unit")
+                    ).values(),
+                )
+            )
+        for position, instruction in enumerate(record.get("instructions") or [], start=1):
+            if isinstance(instruction, str):
+                instruction = {"instruction": instruction}
+            rows["import_instructions"].append(
+                (
+                    title,
+                    instruction.get("step_number") or position,
+                    instruction["instruction"],
+                )
+            )
+        for tag in record.get("tags") or []:
+            rows["import_tags"].append((title, tag["name"].strip(), tag["type"].strip()))
+
+    for menu_name, record in menus.items():
+        # Parsed here since the COPY path bypasses the MenuShoppingInfo listener
+        rows["import_shopping"].append(
+            (
+                menu_name,
+                *(record.get(field) for field in SHOPPING_INFO_FIELDS),
+                json.dumps(parse_shopping_info(record)),
+            )
+        )
+    return rows
+
+
+def _copy_rows(cursor: object, table: str, rows: list[tuple]) -> None:
+    """Send rows to a staging table with COPY FROM STDIN."""
+    if not rows:
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if value is None else value for value in row])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
+
+def import_batch(records: list[dict]) -> tuple[list[int], dict[str, int]]:
+    """
+    Import a batch of validated records in the current transaction.
+    Rows are copied into session-local staging tables, emptied first, then resolved
+    into the catalog with one set-wise statement per table. Imported recipes replace
+    the ingredients, instructions and tags of existing recipes with the same title.
+    Args:
+        records (list[dict]): Valid recipe and menu records.
+    Returns:
+        tuple[list[int], dict[str, int]]: IDs of the imported recipes and the number
+                                          of staged rows per staging table.
+    """
+    rows = _staging_rows(records)
+
+    for table, columns in STAGING_TABLES.items():
+        db.session.execute(
+            text(
+                f"CREATE TEMP TABLE IF NOT EXISTS {table} ({columns}) "
+                "ON COMMIT DELETE ROWS"
+            )
+        )
+    # Batches sharing a transaction must not resolve the rows of the previous one
+    db.session.execute(text(f"TRUNCATE {', '.join(STAGING_TABLES)}"))
+
+    cursor = db.session.connection().connection.cursor()
+    try:
+        for table, table_rows in rows.items():
+            _copy_rows(cursor, table, table_rows)
+    finally:
+        cursor.close()
+
+    recipe_ids = db.session.execute(UPSERT_RECIPES).scalars().all()
+    for statement in CLEAR_CHILDREN:
+        db.session.execute(statement, {"recipe_ids": recipe_ids})
+    for statement in RESOLVE_CHILDREN:
+        db.session.execute(statement)
+
+    refresh_search_documents(recipe_ids)
+    refresh_recipe_cards(recipe_ids)
+
+    return recipe_ids, {table: len(table_rows) for table, table_rows in rows.items()}
@@ -0,0 +1,211 @@
+"""Weekly menu responses stored pre-serialized and rebuilt when their sources change."""
+
+import logging
+
+from flask import current_app
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.orm import aliased, joinedload
+
+from nutri_app import db
+from nutri_app.models import MenuShoppingInfo, MenuSnapshot, Recipe, RecipeTag, Tag
+from .menus_utils import build_shopping_info, organize_recipes_by_day
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(value, *order_by):
+    # md5 of the values joined in a stable order, NULL when there are none
+    return func.md5(func.string_agg(value, aggregate_order_by(literal(","), *order_by)))
+
+
+_linked_tag = aliased(Tag)
+_link = aliased(RecipeTag)
+_structure_tag = aliased(Tag)
+
+# Digest of every tag link of the menu's recipes, with the recipe's updated_at and
+# the tag name, so that edits, day and meal moves, removed recipes and renamed tags
+# all change it, whatever their timestamps.
+_MENU_LINKS_DIGEST = (
+    select(
+        _digest(
+            func.concat_ws(
+                ":", Recipe.id, Recipe.updated_at, _linked_tag.id, _linked_tag.name
+            ),
+            Recipe.id,
+            _linked_tag.id,
+        )
+    )
+    .select_from(RecipeTag)
+    .join(Recipe, Recipe.id == RecipeTag.recipe_id)
+    .join(_link, _link.recipe_id == Recipe.id)
+    .join(_linked_tag, _linked_tag.id == _link.tag_id)
+    .where(RecipeTag.tag_id == Tag.id)
+    .scalar_subquery()
+)
+
+# Digest of the day and meal type tags, which are keys of every menu payload
+_STRUCTURE_DIGEST = (
+    select(
+        _digest(
+            func.concat_ws(":", _structure_tag.id, _structure_tag.name),
+            _structure_tag.id,
+        )
+    )
+    .where(_structure_tag.type.in_(("day_of_week", "meal_type")))
+    .scalar_subquery()
+)
+
+# Columns from which the version of a menu is computed, per menu tag
+MENU_VERSION_COLUMNS = (
+    Tag.id,
+    Tag.name,
+    _MENU_LINKS_DIGEST,
+    _STRUCTURE_DIGEST,
+    select(MenuShoppingInfo.updated_at)
+    .where(MenuShoppingInfo.menu_tag_id == Tag.id)
+    .scalar_subquery(),
+)
+
+
+def _format_version(
+    tag_id, name, links_digest, structure_digest, shopping_info_updated_at
+):
+    return ":".join(
+        (
+            # The menu name is part of the links digest, through the menu tag links
+            str(tag_id),
+            links_digest or "",
+            structure_digest or "",
+            shopping_info_updated_at.isoformat() if shopping_info_updated_at else "",
+        )
+    )
+
+
+def get_menu_versions(menu_names: list[str]) -> dict[str, str]:
+    """
+    Compute the versions of several menus in one query.
+    Args:
+        menu_names (list[str]): The names of the menu tags.
+    Returns:
+        dict[str, str]: The version of each existing menu by name.
+    """
+    rows = db.session.execute(
+        select(*MENU_VERSION_COLUMNS).where(
+            Tag.name.in_(menu_names), Tag.type == "menu_name"
+        )
+    ).all()
+    return {row.name: _format_version(*row) for row in rows}
+
+
+def build_menu_payload(menu_tag_id: int, menu_name: str) -> dict | None:
+    """
+    Build the weekly menu response from the recipes and shopping info.
+    Args:
+        menu_tag_id (int): The ID of the menu tag.
+        menu_name (str): The name of the menu tag.
+    Returns:
+        dict | None: The menu organized by day and meal type, None when it has no recipes.
+    """
+    menu_shopping_info = MenuShoppingInfo.query.filter_by(
+        menu_tag_id=menu_tag_id
+    ).first()
+
+    # Preload tags for organizing recipes
+    meal_types = Tag.query.filter_by(type="meal_type").all()
+    days_of_week = Tag.query.filter_by(type="day_of_week").order_by(Tag.id).all()
+
+    # Retrieve recipes matching the menu, day, and meal type
+    recipes = (
+        Recipe.query.join(Recipe.tags)
+        .filter(
+            Recipe.tags.any(id=menu_tag_id),
+            Recipe.tags.any(Tag.type == "day_of_week"),
+            Recipe.tags.any(Tag.type == "meal_type"),
+            ~Recipe.tags.any(Tag.type == "my_recipe"),
+        )
+        .options(joinedload(Recipe.tags))
+        .all()
+    )
+    if not (recipes and meal_types and days_of_week):
+        return None
+
+    return {
+        "menu": menu_name,
+        "recipes_by_day": organize_recipes_by_day(recipes, days_of_week, meal_types),
+        "shopping_info": build_shopping_info(menu_shopping_info),
+    }
+
+
+def _store_snapshot(menu_tag_id: int, menu_name: str, version: str) -> bytes | None:
+    payload = build_menu_payload(menu_tag_id, menu_name)
+    if payload is None:
+        db.session.query(MenuSnapshot).filter_by(menu_tag_id=menu_tag_id).delete()
+        return None
+
+    # Serialized as jsonify does, so that the bytes can be sent as they are
+    body = current_app.json.dumps(payload).encode()
+    stmt = insert(MenuSnapshot).values(
+        menu_tag_id=menu_tag_id, version=version, payload=body
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MenuSnapshot.menu_tag_id],
+        set_={
+            "version": stmt.excluded.version,
+            "payload": stmt.excluded.payload,
+            "built_at": func.now(),
+        },
+    )
+    db.session.execute(stmt)
+    return body
+
+
+def get_menu_snapshot(menu_name: str) -> tuple[int | None, str | None, bytes | None]:
+    """
+    Return the serialized weekly menu, from its snapshot when the snapshot is current.
+    The version and the snapshot are read in one query. A stale or missing snapshot
+    is rebuilt and committed.
+    Args:
+        menu_name (str): The name of the menu tag.
+    Returns:
+        tuple[int | None, str | None, bytes | None]: The menu tag ID and version, None
+            when the menu does not exist, and the JSON body, None when the menu has
+            no recipes.
+    """
+    row = db.session.execute(
+        select(*MENU_VERSION_COLUMNS, MenuSnapshot.version, MenuSnapshot.payload)
+        .outerjoin(MenuSnapshot, MenuSnapshot.menu_tag_id == Tag.id)
+        .where(Tag.name == menu_name, Tag.type == "menu_name")
+    ).first()
+    if row is None:
+        return None, None, None
+
+    menu_tag_id = row[0]
+    version = _format_version(*row[:5])
+    if row.version == version:
+        return menu_tag_id, version, bytes(row.payload)
+
+    logger.info(f"Rebuilding the snapshot of menu '{menu_name}'.")
+    body = _store_snapshot(menu_tag_id, menu_name, version)
+    db.session.commit()
+    return menu_tag_id, version, body
+
+
+def refresh_menu_snapshots(menu_tag_ids: list[int] | None = None) -> int:
+    """
+    Rebuild the snapshots of the given menus, or of every menu.
+    Args:
+        menu_tag_ids (list[int], optional): IDs of the menu tags, None for all menus.
+    Returns:
+        int: The number of menus with a snapshot.
+    """
+    menus = select(*MENU_VERSION_COLUMNS).where(Tag.type == "menu_name")
+    if menu_tag_ids is not None:
+        menus = menus.where(Tag.id.in_(menu_tag_ids))
+
+    built = 0
+    for row in db.session.execute(menus).all():
+        if _store_snapshot(row[0], row.name, _format_version(*row[:5])) is not None:
+            built += 1
+    logger.info(f"Menu snapshots rebuilt for {built} menu(s).")
+    return built
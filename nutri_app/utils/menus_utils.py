@@ -1,5 +1,22 @@
 """Utility functions for handling menus and their organization in the application."""
 
+from collections.abc import Mapping
+
+from sqlalchemy import and_, event, inspect, or_, select
+from sqlalchemy.orm import aliased
+
+from nutri_app import db
+from nutri_app.models import MenuShoppingInfo, Recipe, RecipeTag, Tag
+
+# Shopping info sections of a menu, the text columns of MenuShoppingInfo
+SHOPPING_INFO_FIELDS = (
+    "shopping_list_text",
+    "preparations_text",
+    "meat_marinades_text",
+    "dressings_text",
+    "rules_and_tips_text",
+)
+
 
 def organize_recipes_by_day(recipes: list, days_of_week: list, meal_types: list) -> dict:
     """
@@ -29,6 +46,99 @@ def organize_recipes_by_day(recipes: list, days_of_week: list, meal_types: list)
     return result
 
 
+# Sections of the multi-menu response that clients may select
+MENU_FIELDS = ("recipes_by_day", "shopping_info")
+
+# Largest number of menus returned by one batch request
+MAX_BATCH_MENUS = 20
+
+
+def build_menus_batch(menu_names: list[str], fields: tuple = MENU_FIELDS) -> dict:
+    """
+    Build the weekly structure and shopping info of several menus at once.
+    The day, meal type and menu tags are read in one query, the recipes of every
+    menu in one query grouped by menu tag, and the shopping info in one more when
+    it is selected.
+    Args:
+        menu_names (list[str]): Names of the menu tags.
+        fields (tuple): The MENU_FIELDS to include.
+    Returns:
+        dict: "menus" with one entry per menu having recipes, in the requested order,
+              and "not_found" with the names of the other menus.
+    """
+    tags = (
+        Tag.query.filter(
+            or_(
+                Tag.type.in_(("day_of_week", "meal_type")),
+                and_(Tag.type == "menu_name", Tag.name.in_(menu_names)),
+            )
+        )
+        .order_by(Tag.id)
+        .all()
+    )
+    days_of_week = [tag for tag in tags if tag.type == "day_of_week"]
+    meal_types = [tag for tag in tags if tag.type == "meal_type"]
+    menu_ids = {tag.name: tag.id for tag in tags if tag.type == "menu_name"}
+
+    # One row per recipe of a menu and day, meal type or my_recipe tag of the recipe
+    menu_link = aliased(RecipeTag)
+    rows = db.session.execute(
+        select(menu_link.tag_id, Recipe.id, Recipe.title, Tag.type, Tag.name)
+        .join(menu_link, menu_link.recipe_id == Recipe.id)
+        .join(RecipeTag, RecipeTag.recipe_id == Recipe.id)
+        .join(Tag, Tag.id == RecipeTag.tag_id)
+        .where(
+            menu_link.tag_id.in_(menu_ids.values()),
+            Tag.type.in_(("day_of_week", "meal_type", "my_recipe")),
+        )
+        .order_by(menu_link.tag_id, Recipe.id)
+    ).all()
+
+    recipes = {}
+    for menu_id, recipe_id, title, tag_type, tag_name in rows:
+        recipe = recipes.setdefault((menu_id, recipe_id), {"title": title})
+        recipe[tag_type] = tag_name
+
+    by_menu = {}
+    for (menu_id, recipe_id), recipe in recipes.items():
+        day = recipe.get("day_of_week")
+        meal = recipe.get("meal_type")
+        if "my_recipe" in recipe or not (day and meal):
+            continue
+        if menu_id not in by_menu:
+            by_menu[menu_id] = {
+                day_tag.name: {meal_tag.name: [] for meal_tag in meal_types}
+                for day_tag in days_of_week
+            }
+        if day in by_menu[menu_id] and meal in by_menu[menu_id][day]:
+            by_menu[menu_id][day][meal].append(
+                {"id": recipe_id, "title": recipe["title"].capitalize()}
+            )
+
+    shopping_infos = {}
+    if "shopping_info" in fields and by_menu:
+        shopping_infos = {
+            info.menu_tag_id: info
+            for info in MenuShoppingInfo.query.filter(
+                MenuShoppingInfo.menu_tag_id.in_(by_menu)
+            )
+        }
+
+    result = {"menus": [], "not_found": []}
+    for name in menu_names:
+        menu_id = menu_ids.get(name)
+        if menu_id not in by_menu or not (meal_types and days_of_week):
+            result["not_found"].append(name)
+            continue
+        menu = {"menu": name}
+        if "recipes_by_day" in fields:
+            menu["recipes_by_day"] = by_menu[menu_id]
+        if "shopping_info" in fields:
+            menu["shopping_info"] = build_shopping_info(shopping_infos.get(menu_id))
+        result["menus"].append(menu)
+    return result
+
+
 def to_structured_list(lines: list) -> list:
     """
     Convert a list of lines into a structured list of categories and items.
@@ -64,67 +174,72 @@ def to_structured_list(lines: list) -> list:
     return structured_list
 
 
-def build_shopping_info(menu_shopping_info: object) -> dict:
+def _lines(text: str) -> list[str]:
+    return text.replace("\\n", "\n").split("\n")
+
+
+def parse_shopping_info(texts: Mapping[str, str | None]) -> dict:
     """
-    Build structured shopping information from the menu shopping info object.
+    Parse the shopping information texts of a menu into lists and categories.
     Args:
-        menu_shopping_info (MenuShoppingInfo): The menu shopping info object containing text data.
+        texts (Mapping[str, str | None]): The texts by SHOPPING_INFO_FIELDS name.
     Returns:
         shopping_info (dict): A dictionary containing structured shopping information.
     """
-    shopping_info = {}
-
-    if menu_shopping_info:
-        shopping_info["rules_and_tips"] = (
-            [
-                line
-                for line in menu_shopping_info.rules_and_tips_text.replace(
-                    "\\n", "\n"
-                ).split("\n")
-                if line.strip().startswith("*")
-            ]
-            if menu_shopping_info.rules_and_tips_text
+    rules_and_tips = texts.get("rules_and_tips_text")
+    preparations = texts.get("preparations_text")
+    shopping_list = texts.get("shopping_list_text")
+    meat_marinades = texts.get("meat_marinades_text")
+    dressings = texts.get("dressings_text")
+
+    return {
+        "rules_and_tips": (
+            [line for line in _lines(rules_and_tips) if line.strip().startswith("*")]
+            if rules_and_tips
             else ""
-        )
-
-        shopping_info["preparations"] = (
-            [
-                line
-                for line in menu_shopping_info.preparations_text.replace(
-                    "\\n", "\n"
-                ).split("\n")[1:]
-                if line.strip()
-            ]
-            if menu_shopping_info.preparations_text
+        ),
+        "preparations": (
+            [line for line in _lines(preparations)[1:] if line.strip()]
+            if preparations
             else ""
-        )
+        ),
+        "shopping_list": (
+            to_structured_list(_lines(shopping_list)[1:]) if shopping_list else ""
+        ),
+        "meat_marinades": (
+            to_structured_list(_lines(meat_marinades)[1:]) if meat_marinades else ""
+        ),
+        "dressings": to_structured_list(_lines(dressings)[1:]) if dressings else "",
+    }
 
-        shopping_info["shopping_list"] = (
-            to_structured_list(
-                menu_shopping_info.shopping_list_text.replace("\\n", "\n").split("\n")[
-                    1:
-                ]
-            )
-            if menu_shopping_info.shopping_list_text
-            else ""
-        )
 
-        shopping_info["meat_marinades"] = (
-            to_structured_list(
-                menu_shopping_info.meat_marinades_text.replace("\\n", "\n").split("\n")[
-                    1:
-                ]
-            )
-            if menu_shopping_info.meat_marinades_text
-            else ""
-        )
+def build_shopping_info(menu_shopping_info: object) -> dict:
+    """
+    Return the structured shopping information of a menu, parsed when it was written.
+    Args:
+        menu_shopping_info (MenuShoppingInfo): The menu shopping info object containing text data.
+    Returns:
+        shopping_info (dict): A dictionary containing structured shopping information.
+    """
+    if not menu_shopping_info:
+        return {}
 
-        shopping_info["dressings"] = (
-            to_structured_list(
-                menu_shopping_info.dressings_text.replace("\\n", "\n").split("\n")[1:]
-            )
-            if menu_shopping_info.dressings_text
-            else ""
+    if menu_shopping_info.parsed_info is None:
+        # Written before parsed_info existed, see 'flask nutricat parse-shopping-info'
+        return parse_shopping_info(
+            {field: getattr(menu_shopping_info, field) for field in SHOPPING_INFO_FIELDS}
+        )
+    return menu_shopping_info.parsed_info
+
+
+@event.listens_for(MenuShoppingInfo, "before_insert")
+@event.listens_for(MenuShoppingInfo, "before_update")
+def update_parsed_info(mapper, connection, target):
+    # Parse the texts again only when one of them changed
+    attrs = inspect(target).attrs
+    if target.parsed_info is None or any(
+        getattr(attrs, field).history.has_changes() for field in SHOPPING_INFO_FIELDS
+    ):
+        target.parsed_info = parse_shopping_info(
+            {field: getattr(target, field) for field in SHOPPING_INFO_FIELDS}
         )
-
-    return shopping_info
@@ -0,0 +1,159 @@
+"""Reconciliation of the stored images with the images the recipes reference."""
+
+import csv
+import logging
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from typing import TextIO
+
+from sqlalchemy import text
+
+from nutri_app import db
+from .storage_utils import S3_DELETE_BATCH_SIZE, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# Keys referenced by a recipe image column or a stored image, or already queued
+# for deletion, in the binary order of the storage listing
+REFERENCED_KEYS = text(
+    """
+    WITH urls AS (
+        SELECT "quality_img_URL" AS url FROM recipes
+        UNION ALL
+        SELECT "compressed_img_URL" FROM recipes
+        UNION ALL
+        SELECT entry ->> 'url'
+        FROM recipes,
+             jsonb_each(recipes.image_variants) AS variants(format, entries),
+             jsonb_array_elements(variants.entries) AS entry
+        UNION ALL
+        SELECT entry ->> 'url'
+        FROM stored_images,
+             jsonb_each(stored_images.variants) AS variants(format, entries),
+             jsonb_array_elements(variants.entries) AS entry
+    )
+    SELECT substr(url, :public_url_length + 1) COLLATE "C" AS key
+    FROM urls
+    WHERE starts_with(url, :url_prefix)
+    UNION
+    SELECT key COLLATE "C" FROM storage_deletions WHERE starts_with(key, :prefix)
+    ORDER BY 1
+    """
+)
+
+
+def iter_referenced_keys(
+    storage: StorageBackend, prefix: str, batch_size: int = 1000
+) -> Iterator[str]:
+    """
+    Stream the referenced storage keys in key order through a server-side cursor.
+    Args:
+        storage (StorageBackend): The backend whose URLs are mapped to keys.
+        prefix (str): Only return the keys starting with this prefix.
+        batch_size (int): Keys fetched per round trip.
+    Returns:
+        Iterator[str]: The distinct keys, sorted.
+    """
+    result = db.session.execute(
+        REFERENCED_KEYS.execution_options(yield_per=batch_size),
+        {
+            "public_url_length": len(storage.public_url),
+            "url_prefix": storage.public_url + prefix,
+            "prefix": prefix,
+        },
+    )
+    for (key,) in result:
+        yield key
+
+
+def diff_sorted(
+    stored: Iterable[tuple[str, datetime]], referenced: Iterable[str]
+) -> Iterator[tuple[str, str, datetime | None]]:
+    """
+    Merge two key-sorted streams, holding one item of each in memory.
+    Args:
+        stored (Iterable[tuple[str, datetime]]): Stored keys and modification times.
+        referenced (Iterable[str]): Referenced keys.
+    Returns:
+        Iterator[tuple[str, str, datetime | None]]: ("orphan", key, modified) for stored
+            keys that are not referenced and ("missing", key, None) for referenced keys
+            that are not stored.
+    """
+    stored, referenced = iter(stored), iter(referenced)
+    item = next(stored, None)
+    ref = next(referenced, None)
+    while item is not None or ref is not None:
+        if ref is None or (item is not None and item[0] < ref):
+            yield "orphan", item[0], item[1]
+            item = next(stored, None)
+        elif item is None or ref < item[0]:
+            yield "missing", ref, None
+            ref = next(referenced, None)
+        else:
+            item = next(stored, None)
+            ref = next(referenced, None)
+
+
+def collect_orphans(
+    storage: StorageBackend,
+    prefix: str,
+    grace_period: timedelta,
+    dry_run: bool = False,
+    report: TextIO | None = None,
+) -> Counter:
+    """
+    Delete the stored files under a prefix that no recipe references, once older than
+    the grace period, which spares the uploads whose recipe is not committed yet.
+    Args:
+        storage (StorageBackend): The backend to clean up.
+        prefix (str): Only consider the keys starting with this prefix.
+        grace_period (timedelta): Minimum age of a deleted file.
+        dry_run (bool): Only report the orphans.
+        report (TextIO, optional): File receiving one CSV row per orphan or missing file.
+    Returns:
+        Counter: The number of orphan, recent, deleted, failed and missing files.
+    """
+    cutoff = datetime.now(timezone.utc) - grace_period
+    writer = csv.writer(report) if report else None
+    if writer:
+        writer.writerow(["status", "key", "last_modified", "action"])
+
+    totals = Counter()
+    batch = []
+
+    def flush():
+        errors = storage.delete_many(batch)
+        totals["deleted"] += len(batch) - len(errors)
+        totals["failed"] += len(errors)
+        for key, error in errors.items():
+            logger.error(f"Failed to delete orphan {key}: {error}")
+        batch.clear()
+
+    for status, key, modified in diff_sorted(
+        storage.iter_objects(prefix), iter_referenced_keys(storage, prefix)
+    ):
+        totals[status] += 1
+        if status == "missing":
+            action = ""
+        elif modified > cutoff:
+            totals["recent"] += 1
+            action = "kept"
+        elif dry_run:
+            action = "would delete"
+        else:
+            action = "deleted"
+            batch.append(key)
+            if len(batch) >= S3_DELETE_BATCH_SIZE:
+                flush()
+
+        if writer:
+            modified_at = modified.isoformat() if modified else ""
+            writer.writerow([status, key, modified_at, action])
+
+    if batch:
+        flush()
+    db.session.commit()
+
+    logger.info(f"Orphaned image collection under '{prefix}': {dict(totals)}.")
+    return totals
@@ -0,0 +1,178 @@
+"""Keyset (cursor) pagination helpers for the recipe listings."""
+
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import and_, or_, tuple_
+from werkzeug.exceptions import abort
+
+from nutri_app.models import Favorite, RecipeCard
+
+logger = logging.getLogger(__name__)
+
+
+def get_sort_keys(
+    sort_order: str, search_rank: object = None, model: type = RecipeCard
+) -> list[tuple]:
+    """
+    Get the ordered keyset columns for a listing sort order.
+    Args:
+        sort_order (str): The sort order requested by the client ("asc", "desc", "recent" or "default").
+        search_rank (ColumnElement, optional): Rank expression ordering search results by default.
+        model (type, optional): The listed model, RecipeCard or Recipe.
+    Returns:
+        list[tuple]: List of (column, descending) pairs, always ending with a unique column.
+    """
+    if sort_order == "asc":
+        return [(model.title, False), (model.id, False)]
+    if sort_order == "desc":
+        return [(model.title, True), (model.id, True)]
+    if sort_order == "recent":
+        # Requires the query to be joined with the user's favorites
+        return [(Favorite.added_at, True), (Favorite.id, True)]
+    if search_rank is not None:
+        return [(search_rank, True), (model.id, False)]
+    return [(model.id, False)]
+
+
+def order_by_sort_keys(query: object, sort_keys: list[tuple]) -> object:
+    """
+    Apply the ORDER BY clause matching the keyset columns.
+    Args:
+        query (Query): The query to be ordered.
+        sort_keys (list[tuple]): List of (column, descending) pairs.
+    Returns:
+        Query: The ordered query.
+    """
+    return query.order_by(
+        *[column.desc() if descending else column.asc() for column, descending in sort_keys]
+    )
+
+
+def _to_cursor_value(value: object) -> object:
+    """Make a keyset value JSON serializable."""
+    if isinstance(value, datetime):
+        return {"t": value.isoformat()}
+    return value
+
+
+def _from_cursor_value(value: object) -> object:
+    """Restore a keyset value serialized by _to_cursor_value."""
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["t"])
+    return value
+
+
+def encode_cursor(sort_order: str, values: list) -> str:
+    """
+    Encode the keyset values of the last row into an opaque cursor.
+    Args:
+        sort_order (str): The sort order the cursor belongs to.
+        values (list): Keyset values of the last returned row.
+    Returns:
+        str: URL-safe cursor string.
+    """
+    payload = json.dumps(
+        {"s": sort_order, "k": [_to_cursor_value(v) for v in values]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_order: str) -> list | None:
+    """
+    Decode a cursor produced by encode_cursor.
+    Args:
+        cursor (str): The cursor received from the client, empty for the first page.
+        sort_order (str): The sort order of the current request.
+    Returns:
+        list | None: Keyset values to continue after, or None for the first page.
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_from_cursor_value(v) for v in payload["k"]]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        logger.warning(f"Invalid pagination cursor received: {cursor}")
+        abort(400, description="Invalid pagination cursor.")
+
+    if payload.get("s") != sort_order:
+        abort(400, description="Pagination cursor does not match the sort order.")
+
+    return values
+
+
+def keyset_condition(sort_keys: list[tuple], values: list) -> object:
+    """
+    Build the WHERE condition selecting rows after the given keyset values.
+    Args:
+        sort_keys (list[tuple]): List of (column, descending) pairs.
+        values (list): Keyset values of the last row of the previous page.
+    Returns:
+        ColumnElement: The SQL condition.
+    """
+    if len(values) != len(sort_keys):
+        abort(400, description="Pagination cursor does not match the sort order.")
+
+    columns = [column for column, _ in sort_keys]
+    directions = {descending for _, descending in sort_keys}
+
+    # Same direction on every column: a row-value comparison can use the index
+    if len(directions) == 1:
+        if directions.pop():
+            return tuple_(*columns) < tuple(values)
+        return tuple_(*columns) > tuple(values)
+
+    # Mixed directions need the expanded (a > x) OR (a = x AND b > y) form
+    conditions = []
+    for i, (column, descending) in enumerate(sort_keys):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        conditions.append(and_(*equal_prefix, step))
+    return or_(*conditions)
+
+
+def keyset_paginate(
+    query: object, sort_order: str, sort_keys: list[tuple], cursor: str, per_page: int
+) -> tuple[list, str | None]:
+    """
+    Fetch one page of a query using keyset pagination.
+    The cost of a page does not depend on how deep the client has scrolled:
+    no OFFSET scan and no COUNT(*) are issued.
+    Args:
+        query (Query): The filtered query, without ORDER BY, LIMIT or OFFSET.
+        sort_order (str): The sort order of the current request.
+        sort_keys (list[tuple]): List of (column, descending) pairs.
+        cursor (str): The cursor received from the client, empty for the first page.
+        per_page (int): Number of items per page.
+    Returns:
+        tuple[list, str | None]: The page items and the cursor of the next page, if any.
+    """
+    values = decode_cursor(cursor, sort_order)
+    if values is not None:
+        query = query.filter(keyset_condition(sort_keys, values))
+
+    key_columns = [
+        column.label(f"cursor_key_{i}") for i, (column, _) in enumerate(sort_keys)
+    ]
+    rows = (
+        order_by_sort_keys(query.add_columns(*key_columns), sort_keys)
+        .limit(per_page + 1)
+        .all()
+    )
+
+    # Entity queries yield the entity, column queries the whole row (with extra key columns)
+    single_entity = len(query.column_descriptions) == 1
+    items = [row[0] if single_entity else row for row in rows[:per_page]]
+    next_cursor = None
+    if len(rows) > per_page:
+        last_row = rows[per_page - 1]
+        next_cursor = encode_cursor(sort_order, list(last_row[-len(sort_keys) :]))
+
+    return items, next_cursor
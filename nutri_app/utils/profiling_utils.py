@@ -0,0 +1,45 @@
+"""Per-request SQL query counting."""
+
+import logging
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.query_count = g.get("query_count", 0) + 1
+
+
+def get_query_count() -> int:
+    """
+    Get the number of SQL statements executed so far in the current request.
+    Returns:
+        int: Number of statements, 0 outside of an application context.
+    """
+    if not has_app_context():
+        return 0
+    return g.get("query_count", 0)
+
+
+def init_query_counter(app: object) -> None:
+    """
+    Reset the counter for every request and, when QUERY_COUNT_HEADER is enabled,
+    report it in the X-Query-Count response header.
+    Args:
+        app (Flask): The Flask application instance.
+    """
+
+    @app.before_request
+    def reset_query_count():
+        g.query_count = 0
+
+    @app.after_request
+    def add_query_count_header(response):
+        if app.config.get("QUERY_COUNT_HEADER"):
+            response.headers["X-Query-Count"] = str(get_query_count())
+        return response
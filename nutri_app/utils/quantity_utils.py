@@ -0,0 +1,193 @@
+"""Parsing of the free-text ingredient quantities and units into numbers."""
+
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+
+from sqlalchemy import event, inspect, select, update
+
+from nutri_app import db
+from nutri_app.models import RecipeIngredient
+
+logger = logging.getLogger(__name__)
+
+# Distinct quantity and unit strings remembered by the parsers. Recipes reuse a
+# small vocabulary ("1", "200", "1/2", "g", "tbsp"), so most lookups are hits.
+QUANTITY_CACHE_SIZE = 4096
+
+# Unit spellings mapped to a canonical unit and the factor converting into it.
+# Mass is summed in grams and volume in millilitres.
+UNIT_ALIASES = {
+    "g": ("g", 1),
+    "gr": ("g", 1),
+    "gram": ("g", 1),
+    "grams": ("g", 1),
+    "kg": ("g", 1000),
+    "kilogram": ("g", 1000),
+    "kilograms": ("g", 1000),
+    "mg": ("g", 0.001),
+    "oz": ("g", 28.35),
+    "lb": ("g", 453.6),
+    "lbs": ("g", 453.6),
+    "ml": ("ml", 1),
+    "milliliter": ("ml", 1),
+    "milliliters": ("ml", 1),
+    "l": ("ml", 1000),
+    "liter": ("ml", 1000),
+    "liters": ("ml", 1000),
+    "litre": ("ml", 1000),
+    "litres": ("ml", 1000),
+    "tsp": ("ml", 5),
+    "teaspoon": ("ml", 5),
+    "teaspoons": ("ml", 5),
+    "tbsp": ("ml", 15),
+    "tablespoon": ("ml", 15),
+    "tablespoons": ("ml", 15),
+    "cup": ("ml", 240),
+    "cups": ("ml", 240),
+    "pc": ("pcs", 1),
+    "pcs": ("pcs", 1),
+    "piece": ("pcs", 1),
+    "pieces": ("pcs", 1),
+}
+
+# A number: "2", "1.5", "1,5", "1/2", "1 1/2" or "1½"
+_NUMBER = r"\d+(?:[.,]\d+)?(?:\s+\d+/\d+)?|\d+/\d+"
+_QUANTITY = re.compile(
+    rf"^\s*(?P<low>{_NUMBER})\s*(?:(?:-|–|—|to)\s*(?P<high>{_NUMBER}))?\s*$"
+)
+
+
+def _to_number(text: str) -> float:
+    whole, _, fraction = text.replace(",", ".").partition(" ")
+    if "/" in whole:
+        fraction, whole = whole, "0"
+    value = float(whole)
+    if fraction:
+        numerator, denominator = fraction.strip().split("/")
+        value += int(numerator) / int(denominator)
+    return value
+
+
+def _expand_vulgar_fractions(text: str) -> str:
+    # "1½" becomes "1 1/2" and "½" becomes "1/2"
+    expanded = []
+    for char in text:
+        if unicodedata.category(char) == "No" and "⁄" in unicodedata.normalize(
+            "NFKC", char
+        ):
+            numerator, denominator = unicodedata.normalize("NFKC", char).split("⁄")
+            if expanded and expanded[-1].isdigit():
+                expanded.append(" ")
+            expanded.append(f"{numerator}/{denominator}")
+        else:
+            expanded.append(char)
+    return "".join(expanded)
+
+
+@lru_cache(maxsize=QUANTITY_CACHE_SIZE)
+def parse_quantity(text: str | None) -> tuple[float, float] | None:
+    """
+    Parse a quantity such as "2", "1 1/2", "½" or "200-250" into a range.
+    Args:
+        text (str, optional): The quantity as entered with the recipe.
+    Returns:
+        tuple[float, float] | None: The lowest and highest amounts, equal for a single
+            amount, None when the text is not a number ("a pinch", "to taste").
+    """
+    if not text:
+        return None
+    match = _QUANTITY.match(_expand_vulgar_fractions(text.lower()))
+    if match is None:
+        return None
+    try:
+        low = _to_number(match["low"])
+        high = _to_number(match["high"]) if match["high"] else low
+    except (ValueError, ZeroDivisionError):
+        return None
+    return (low, high) if low <= high else (high, low)
+
+
+@lru_cache(maxsize=QUANTITY_CACHE_SIZE)
+def normalize_unit(unit: str | None) -> tuple[str, float]:
+    """
+    Map a unit to its canonical unit and conversion factor.
+    Args:
+        unit (str, optional): The unit as entered with the recipe.
+    Returns:
+        tuple[str, float]: The canonical unit and the factor converting into it,
+            the lowercased unit and 1 for unknown units, "" for no unit.
+    """
+    key = (unit or "").strip().lower().rstrip(".")
+    return UNIT_ALIASES.get(key, (key, 1))
+
+
+def quantity_columns(quantity: str | None, unit: str | None) -> dict:
+    """
+    Compute the parsed quantity columns of a recipe ingredient.
+    Args:
+        quantity (str, optional): The quantity as entered with the recipe.
+        unit (str, optional): The unit as entered with the recipe.
+    Returns:
+        dict: quantity_min and quantity_max, None when the quantity is not a number,
+            canonical_unit, None without a unit, and unit_factor.
+    """
+    parsed = parse_quantity(quantity)
+    canonical_unit, factor = normalize_unit(unit)
+    return {
+        "quantity_min": parsed[0] if parsed else None,
+        "quantity_max": parsed[1] if parsed else None,
+        "canonical_unit": canonical_unit or None,
+        "unit_factor": factor,
+    }
+
+
+@event.listens_for(RecipeIngredient, "before_insert")
+@event.listens_for(RecipeIngredient, "before_update")
+def update_quantity_columns(mapper, connection, target):
+    # Parse again only when the quantity or the unit changed
+    attrs = inspect(target).attrs
+    if target.unit_factor is None or any(
+        getattr(attrs, field).history.has_changes() for field in ("quantity", "unit")
+    ):
+        for column, value in quantity_columns(target.quantity, target.unit).items():
+            setattr(target, column, value)
+
+
+def backfill_quantity_columns(batch_size: int = 1000) -> int:
+    """
+    Parse the quantity and unit of every recipe ingredient into the numeric columns.
+    Rows are read in primary key order, one batch at a time, and each batch is
+    written with one executemany and committed.
+    Args:
+        batch_size (int): Rows per batch.
+    Returns:
+        int: The number of rows parsed.
+    """
+    last_id = 0
+    total = 0
+    while True:
+        rows = db.session.execute(
+            select(RecipeIngredient.id, RecipeIngredient.quantity, RecipeIngredient.unit)
+            .where(RecipeIngredient.id > last_id)
+            .order_by(RecipeIngredient.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        db.session.execute(
+            update(RecipeIngredient),
+            [{"id": row.id, **quantity_columns(row.quantity, row.unit)} for row in rows],
+        )
+        db.session.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+
+    logger.info(
+        f"Quantities parsed for {total} recipe ingredients, "
+        f"parser cache: {parse_quantity.cache_info()}."
+    )
+    return total
+
@@ -1,12 +1,7 @@
-import boto3
 import logging
-import mimetypes
-import os
-import uuid
 
-from botocore.exceptions import ClientError
-from werkzeug.exceptions import abort
-from werkzeug.utils import secure_filename
+from sqlalchemy import String, any_, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 
 from nutri_app import db
 from nutri_app.models import (
@@ -17,30 +12,25 @@ from nutri_app.models import (
     RecipeTag,
     UserRecipeNote,
 )
+from .quantity_utils import quantity_columns
 
 logger = logging.getLogger(__name__)
 
-# AWS S3 configuration
-AWS_REGION = os.getenv("AWS_REGION")
-S3_BUCKET_NAME = os.getenv("AWS_S3_BUCKET_NAME")
-S3_FOLDER = os.getenv("AWS_S3_FOLDER")
-# Image upload configuration
-MAX_FILE_SIZE = 4 * 1024 * 1024
-
-
-def get_tag_options(tag_types: list[tuple]) -> dict[str, list[str]]:
+def get_tag_options(tag_rows: list[tuple]) -> dict[str, list[str]]:
     """
-    Get unique tag types and their names
+    Group tag names by their type and sort them for display
     Args:
-        tag_types (list[tuple]): List of tuples containing tag types.
+        tag_rows (list[tuple]): List of (tag type, tag name) tuples.
     Returns:
         dict[str, list[str]]: Dictionary with tag type names as keys and lists of tag names as values.
     """
-    tag_types = [t[0] for t in tag_types]
+    names_by_type = {}
+    for tag_type, name in tag_rows:
+        names_by_type.setdefault(tag_type, set()).add(name)
+
     tag_options = {}
-    for t in tag_types:
-        options = db.session.query(Tag.name).filter(Tag.type == t).distinct().all()
-        options = [n[0] for n in options]
+    for t in sorted(names_by_type):
+        options = sorted(names_by_type[t])
         if "day" in t:
             week_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
             options = sorted(
@@ -86,6 +76,7 @@ def get_recipe_ingredients(recipe_id: int) -> list[str]:
         RecipeIngredient.query.filter_by(recipe_id=recipe_id)
         .join(Ingredient)
         .add_entity(Ingredient)
+        .order_by(RecipeIngredient.id)
         .all()
     )
 
@@ -103,11 +94,88 @@ def get_recipe_ingredients(recipe_id: int) -> list[str]:
     return ingredients
 
 
+def _parse_ingredient_rows(
+    ingredient_names: list, quantities: list, units: list, quantity_notes: list, ingredient_notes: list
+) -> list[dict]:
+    """Turn the ingredient form lists into one dictionary per non-blank row."""
+    rows = []
+    for i in range(len(ingredient_names)):
+        name = ingredient_names[i].strip()
+        if not name:
+            continue
+        rows.append(
+            {
+                "name": name,
+                "quantity": quantities[i].strip() if i < len(quantities) else None,
+                "unit": units[i].strip() if i < len(units) else None,
+                "quantity_notes": (
+                    quantity_notes[i].strip() if i < len(quantity_notes) else None
+                ),
+                "ingredient_notes": (
+                    ingredient_notes[i].strip() if i < len(ingredient_notes) else None
+                ),
+            }
+        )
+    return rows
+
+
+def _resolve_ingredient_ids(names: list[str]) -> dict[str, int]:
+    """
+    Map ingredient names to their IDs, creating the missing ingredients.
+    One SELECT resolves every name at once, then one INSERT ... ON CONFLICT DO NOTHING
+    RETURNING creates the missing ones.
+    Args:
+        names (list[str]): Ingredient names, duplicates allowed.
+    Returns:
+        dict[str, int]: The ID of every name.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    ingredient_ids = dict(
+        db.session.execute(
+            select(Ingredient.name, Ingredient.id).where(
+                Ingredient.name == any_(literal(names, ARRAY(String)))
+            )
+        ).all()
+    )
+    missing_names = [name for name in names if name not in ingredient_ids]
+    if missing_names:
+        ingredient_ids.update(
+            db.session.execute(
+                insert(Ingredient)
+                .values(
+                    [
+                        {"name": name, "name_search": func.to_tsvector("english", name)}
+                        for name in missing_names
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[Ingredient.name])
+                .returning(Ingredient.name, Ingredient.id)
+            ).all()
+        )
+        # Names inserted by a concurrent request since the SELECT are not returned
+        raced_names = [name for name in missing_names if name not in ingredient_ids]
+        if raced_names:
+            ingredient_ids.update(
+                db.session.execute(
+                    select(Ingredient.name, Ingredient.id).where(
+                        Ingredient.name.in_(raced_names)
+                    )
+                ).all()
+            )
+    return ingredient_ids
+
+
 def update_ingredients(
     ingredient_names: list, quantities: list, units: list, quantity_notes: list, ingredient_notes: list, recipe: object
 ) -> None:
     """
     Update the ingredients in the database.
+    Uses three statements whatever the number of rows: one SELECT resolving the names,
+    one INSERT ... ON CONFLICT DO NOTHING RETURNING creating the missing ingredients
+    and one executemany inserting the recipe links.
     Args:
         ingredient_names (list): List of ingredient names.
         quantities (list): List of quantities for each ingredient.
@@ -116,28 +184,21 @@ def update_ingredients(
         ingredient_notes (list): List of notes for each ingredient.
         recipe (object): The recipe object to which the ingredients belong.
     """
-    for i in range(len(ingredient_names)):
-        name = ingredient_names[i].strip()
-        if not name:
-            continue
-        ingredient = Ingredient.query.filter_by(name=name).first()
-        if not ingredient:
-            ingredient = Ingredient(name=name)
-            db.session.add(ingredient)
-
-        ri = RecipeIngredient(
-            recipe_id=recipe.id,
-            ingredient_id=ingredient.id,
-            quantity=quantities[i].strip() if i < len(quantities) else None,
-            unit=units[i].strip() if i < len(units) else None,
-            quantity_notes=(
-                quantity_notes[i].strip() if i < len(quantity_notes) else None
-            ),
-            ingredient_notes=(
-                ingredient_notes[i].strip() if i < len(ingredient_notes) else None
-            ),
-        )
-        db.session.add(ri)
+    link_rows = _parse_ingredient_rows(
+        ingredient_names, quantities, units, quantity_notes, ingredient_notes
+    )
+    if not link_rows:
+        return
+
+    ingredient_ids = _resolve_ingredient_ids([row["name"] for row in link_rows])
+
+    # Link rows are sent as one executemany, which skips the ORM listener parsing
+    # the quantities
+    for row in link_rows:
+        row["recipe_id"] = recipe.id
+        row["ingredient_id"] = ingredient_ids[row.pop("name")]
+        row.update(quantity_columns(row["quantity"], row["unit"]))
+    db.session.execute(insert(RecipeIngredient), link_rows)
 
     logger.info("Ingredients updated successfully.")
 
@@ -184,6 +245,156 @@ def update_tags(tag_list: list[str], recipe: object) -> None:
     logger.info("Tags updated successfully.")
 
 
+def _differs(stored: object, submitted: object) -> bool:
+    """Compare a stored value with a submitted one, treating NULL and blank as equal."""
+    return (stored if stored is not None else "") != (
+        submitted if submitted is not None else ""
+    )
+
+
+def _merge_rows(stored_rows: list, submitted_values: list[dict], model: type, recipe: object) -> dict:
+    """
+    Pair stored child rows with submitted values by position, keeping the display order.
+    Changed pairs are updated in place, extra submitted values are inserted and extra
+    stored rows are deleted; unchanged rows are left alone.
+    Args:
+        stored_rows (list): The recipe's current rows, in display order.
+        submitted_values (list[dict]): Column values of the submitted rows, in display order.
+        model (type): The mapped class of the rows.
+        recipe (object): The recipe the rows belong to.
+    Returns:
+        dict: Number of rows "inserted", "updated" and "deleted".
+    """
+    changes = {"inserted": 0, "updated": 0, "deleted": 0}
+
+    for row, values in zip(stored_rows, submitted_values):
+        changed = [
+            field
+            for field, value in values.items()
+            if _differs(getattr(row, field), value)
+        ]
+        for field in changed:
+            setattr(row, field, values[field])
+        changes["updated"] += bool(changed)
+
+    for values in submitted_values[len(stored_rows):]:
+        db.session.add(model(recipe_id=recipe.id, **values))
+        changes["inserted"] += 1
+
+    for row in stored_rows[len(submitted_values):]:
+        db.session.delete(row)
+        changes["deleted"] += 1
+
+    return changes
+
+
+def merge_ingredients(
+    ingredient_names: list, quantities: list, units: list, quantity_notes: list, ingredient_notes: list, recipe: object
+) -> dict:
+    """
+    Bring the recipe's ingredients in line with the submitted ones, writing only the
+    rows that differ instead of deleting and reinserting every link.
+    Args:
+        ingredient_names (list): List of ingredient names.
+        quantities (list): List of quantities for each ingredient.
+        units (list): List of units for each ingredient.
+        quantity_notes (list): List of notes for each quantity.
+        ingredient_notes (list): List of notes for each ingredient.
+        recipe (object): The recipe object to which the ingredients belong.
+    Returns:
+        dict: Number of links "inserted", "updated" and "deleted".
+    """
+    rows = _parse_ingredient_rows(
+        ingredient_names, quantities, units, quantity_notes, ingredient_notes
+    )
+    ingredient_ids = _resolve_ingredient_ids([row["name"] for row in rows])
+    submitted_values = [
+        {"ingredient_id": ingredient_ids[row.pop("name")], **row} for row in rows
+    ]
+
+    links = (
+        RecipeIngredient.query.filter_by(recipe_id=recipe.id)
+        .order_by(RecipeIngredient.id)
+        .all()
+    )
+    return _merge_rows(links, submitted_values, RecipeIngredient, recipe)
+
+
+def merge_instructions(instructions: list[str], steps: list[str], recipe: object) -> dict:
+    """
+    Bring the recipe's instructions in line with the submitted ones; only changed
+    instructions get their search vector recomputed.
+    Args:
+        instructions (list[str]): List of instruction strings.
+        steps (list[str]): List of step numbers corresponding to each instruction.
+        recipe (object): The recipe object to which the instructions belong.
+    Returns:
+        dict: Number of instructions "inserted", "updated" and "deleted".
+    """
+    submitted_values = []
+    for i in range(len(instructions)):
+        line = instructions[i].strip()
+        if not line:
+            continue
+        step = steps[i].strip() if i < len(steps) else ""
+        submitted_values.append(
+            {
+                "step_number": int(step) if step.isdigit() else len(submitted_values) + 1,
+                "instruction": line,
+            }
+        )
+
+    stored = (
+        Instruction.query.filter_by(recipe_id=recipe.id)
+        .order_by(Instruction.step_number, Instruction.id)
+        .all()
+    )
+    return _merge_rows(stored, submitted_values, Instruction, recipe)
+
+
+def merge_tags(tag_list: list[str], recipe: object) -> dict:
+    """
+    Link the recipe to exactly the submitted "my_recipe" tags, adding and removing
+    only the links that differ.
+    Args:
+        tag_list (list[str]): List of tag names.
+        recipe (object): The recipe object to which the tags belong.
+    Returns:
+        dict: Number of links "inserted", "updated" (always 0) and "deleted".
+    """
+    names = list(dict.fromkeys(name.strip() for name in tag_list if name.strip()))
+    tags = {
+        tag.name: tag
+        for tag in Tag.query.filter(Tag.name.in_(names), Tag.type == "my_recipe")
+    }
+    missing_names = [name for name in names if name not in tags]
+    if missing_names:
+        for name in missing_names:
+            tags[name] = Tag(name=name, type="my_recipe")
+            db.session.add(tags[name])
+        # New tags need their IDs before being linked
+        db.session.flush()
+
+    tag_ids = {tag.id for tag in tags.values()}
+    links = RecipeTag.query.filter_by(recipe_id=recipe.id).all()
+    linked_ids = {link.tag_id for link in links}
+
+    changes = {"inserted": 0, "updated": 0, "deleted": 0}
+    for link in links:
+        if link.tag_id not in tag_ids:
+            db.session.delete(link)
+            changes["deleted"] += 1
+    for tag_id in tag_ids - linked_ids:
+        db.session.add(RecipeTag(recipe_id=recipe.id, tag_id=tag_id))
+        changes["inserted"] += 1
+    return changes
+
+
+def format_changes(changes: dict) -> str:
+    """Format the counts returned by the merge functions for the logs."""
+    return f"+{changes['inserted']} ~{changes['updated']} -{changes['deleted']}"
+
+
 def update_notes(recipe, notes: str, user_id: int) -> None:
     """Update the notes for a recipe.
     Args:
@@ -202,84 +413,3 @@ def update_notes(recipe, notes: str, user_id: int) -> None:
                 UserRecipeNote(user_id=user_id, recipe_id=recipe.id, note=notes.strip())
             )
     logger.info("Notes updated successfully.")
-
-
-def upload_image(image: object, recipe: object) -> None:
-    """
-    Upload an image to S3 and update the recipe with the image URL.
-    Args:
-        image (object): The image file to be uploaded.
-        recipe (object): The recipe object to which the image belongs.
-    """
-    if image and image.filename:
-        image.seek(0, 2)  # Move cursor to end of file
-        file_size = image.tell()  # Get current position (== file size in bytes)
-        image.seek(0)  # Reset cursor back to beginning
-
-        if file_size > MAX_FILE_SIZE:
-            abort(400, description="File is too large. Maximum size is 4MB.")
-
-        if recipe.quality_img_URL and recipe.compressed_img_URL:
-            logger.info("Old images found, deleting them before uploading new ones.")
-            # Delete old images from S3
-            delete_s3_image(recipe.quality_img_URL)
-            delete_s3_image(recipe.compressed_img_URL)
-
-        filename = secure_filename(image.filename)
-
-        # Get original extension
-        original_name, ext = os.path.splitext(filename)
-        unique_filename = f"{uuid.uuid4().hex}_{original_name}{ext}"
-
-        # Get MIME type
-        content_type, _ = mimetypes.guess_type(filename)
-        content_type = content_type or "application/octet-stream"
-
-        # Initialize S3 client
-        s3 = boto3.client("s3", region_name=AWS_REGION)
-
-        # Upload directly from memory using file-like object
-        s3.upload_fileobj(
-            image,
-            S3_BUCKET_NAME,
-            f"{S3_FOLDER}/{unique_filename}",
-            ExtraArgs={"ContentType": content_type},
-        )
-
-        # Construct public URL
-        file_url = f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{S3_FOLDER}/{unique_filename}"
-        logger.info(f"✅ Upload successful! File URL: {file_url}")
-
-        # Save to database
-        recipe.quality_img_URL = file_url
-        recipe.compressed_img_URL = file_url
-
-
-def delete_s3_image(s3_url: str) -> None:
-    """
-    Delete an image from S3 given its public URL.
-    Args:
-        s3_url (str): The public URL of the image to be deleted.
-    """
-    s3 = boto3.client("s3")
-
-    try:
-        key = s3_url.split(f"{os.getenv("AWS_S3_BUCKET_LINK")}")[1]
-        if not key:
-            logger.error(f"Could not extract key from URL: {s3_url}")
-            return
-
-        logger.info(f"Attempting to delete key: {key} from bucket: {S3_BUCKET_NAME}")
-        s3.delete_object(Bucket=S3_BUCKET_NAME, Key=key)
-        logger.info(f"Successfully deleted {s3_url}!")
-
-        # Confirm deletion
-        s3.head_object(Bucket=S3_BUCKET_NAME, Key=key)
-        logger.warning("File still exists after delete attempt!")
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "404":
-            logger.info("File is confirmed deleted.")
-        else:
-            logger.error(f"Error checking for deleted file: {e}")
-    except Exception as e:
-        logger.error(f"Failed to delete from S3: {e}")
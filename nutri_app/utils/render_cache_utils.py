@@ -0,0 +1,304 @@
+"""Cache of fully rendered pages served to anonymous visitors."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+
+from .cache_utils import LRUCache
+from .http_cache_utils import conditional_response
+
+logger = logging.getLogger(__name__)
+
+# Dependency invalidated by any recipe change, for pages listing several recipes
+ALL_RECIPES = "recipes"
+
+# Stands in for the per-session CSRF token inside cached bodies
+CSRF_PLACEHOLDER = b"__render_cache_csrf_token__"
+
+
+def recipe_dependency(recipe_id: int) -> str:
+    """Name of the dependency invalidated when the given recipe changes."""
+    return f"recipe:{recipe_id}"
+
+
+class RenderCache:
+    """
+    Rendered responses kept in an in-process LRU, optionally backed by a directory
+    shared by every worker.
+    Each entry lists the dependencies it was rendered from; invalidating a dependency
+    records its time, in process and as a marker file in the shared directory, and
+    entries rendered before that time are treated as missing.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None, directory: str | None = None):
+        """
+        Create the cache.
+        Args:
+            maxsize (int): Maximum number of pages kept in process.
+            ttl (float, optional): Seconds after which a page expires, None to never expire.
+            directory (str, optional): Directory shared across workers, None to stay in process.
+        """
+        self.ttl = ttl
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._pages = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._invalidated_at = {}
+
+        if directory:
+            os.makedirs(os.path.join(directory, "invalidations"), exist_ok=True)
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters and the number of pages kept in process."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._pages)}
+
+    def get(self, key: tuple) -> dict | None:
+        """
+        Get a cached page that is still fresh.
+        Args:
+            key (tuple): The page key.
+        Returns:
+            dict | None: The page with its status, mimetype and body, or None on a miss.
+        """
+        page = self._pages.get(key, None)
+        if page is None and self.directory:
+            page = self._read_file(key)
+            if page is not None:
+                self._pages.set(key, page)
+
+        if page is not None and not self._is_fresh(page):
+            self._pages.delete(key)
+            self._delete_file(key)
+            page = None
+
+        if page is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return page
+
+    def set(self, key: tuple, page: dict) -> None:
+        """
+        Store a rendered page.
+        Args:
+            key (tuple): The page key.
+            page (dict): "rendered_at", "dependencies", "status", "mimetype", "etag",
+                         "last_modified" and "body" of the page.
+        """
+        self._pages.set(key, page)
+        if self.directory:
+            self._write_file(key, page)
+
+    def invalidate(self, dependencies: list[str]) -> None:
+        """
+        Invalidate every page rendered from any of the given dependencies.
+        Args:
+            dependencies (list[str]): The changed dependencies.
+        """
+        now = time.time()
+        for dependency in dependencies:
+            self._invalidated_at[dependency] = now
+            if self.directory:
+                marker = self._marker_path(dependency)
+                try:
+                    with open(marker, "a"):
+                        pass
+                    os.utime(marker, (now, now))
+                except OSError as e:
+                    logger.error(f"Failed to invalidate rendered pages of '{dependency}': {e}")
+
+    def clear(self) -> None:
+        """Remove every page kept in process."""
+        self._pages.clear()
+
+    def _last_invalidated(self, dependency: str) -> float:
+        invalidated_at = self._invalidated_at.get(dependency, 0.0)
+        if self.directory:
+            try:
+                invalidated_at = max(
+                    invalidated_at, os.path.getmtime(self._marker_path(dependency))
+                )
+            except OSError:
+                pass
+        return invalidated_at
+
+    def _is_fresh(self, page: dict) -> bool:
+        if self.ttl is not None and page["rendered_at"] + self.ttl <= time.time():
+            return False
+        return all(
+            self._last_invalidated(dependency) < page["rendered_at"]
+            for dependency in page["dependencies"]
+        )
+
+    def _page_path(self, key: tuple) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.page")
+
+    def _marker_path(self, dependency: str) -> str:
+        return os.path.join(self.directory, "invalidations", dependency.replace(":", "-"))
+
+    def _read_file(self, key: tuple) -> dict | None:
+        try:
+            with open(self._page_path(key), "rb") as f:
+                header = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return {**header, "body": body}
+
+    def _write_file(self, key: tuple, page: dict) -> None:
+        header = {name: value for name, value in page.items() if name != "body"}
+        try:
+            # Write to a temporary file first so other workers never read a partial page
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(header).encode() + b"\n")
+                f.write(page["body"])
+            os.replace(tmp_path, self._page_path(key))
+        except OSError as e:
+            logger.error(f"Failed to store rendered page {key}: {e}")
+
+    def _delete_file(self, key: tuple) -> None:
+        if self.directory:
+            try:
+                os.remove(self._page_path(key))
+            except OSError:
+                pass
+
+
+def init_render_cache(app: object) -> None:
+    """
+    Create the render cache of the application when RENDER_CACHE is enabled.
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    if not app.config.get("RENDER_CACHE"):
+        return
+
+    app.extensions["render_cache"] = RenderCache(
+        maxsize=app.config.get("RENDER_CACHE_SIZE", 500),
+        ttl=app.config.get("RENDER_CACHE_TTL"),
+        directory=app.config.get("RENDER_CACHE_DIR"),
+    )
+
+
+def get_render_cache() -> RenderCache | None:
+    """Return the render cache of the current application, None when disabled."""
+    return current_app.extensions.get("render_cache")
+
+
+def invalidate_rendered_pages(recipe_ids: list[int]) -> None:
+    """
+    Invalidate the cached pages showing any of the given recipes.
+    Call it once the change is committed.
+    Args:
+        recipe_ids (list[int]): IDs of the created, edited or deleted recipes.
+    """
+    render_cache = get_render_cache()
+    if render_cache is not None:
+        render_cache.invalidate(
+            [ALL_RECIPES, *(recipe_dependency(recipe_id) for recipe_id in recipe_ids)]
+        )
+
+
+def _add_stats_header(response: object, render_cache: RenderCache) -> None:
+    # Counters of this worker's cache, reported with X-Query-Count when profiling
+    if current_app.config.get("QUERY_COUNT_HEADER"):
+        response.headers["X-Render-Cache-Stats"] = "; ".join(
+            f"{name}={value}" for name, value in render_cache.stats().items()
+        )
+
+
+def cache_anonymous_page(dependencies=lambda **view_args: ()):
+    """
+    Serve a view from the render cache to anonymous visitors.
+    Pages are keyed on the endpoint with its view and query arguments. Pages carrying
+    flashed messages are never cached, and the CSRF token is swapped for the visitor's own.
+    Args:
+        dependencies (Callable): Returns the dependencies of a page from its view arguments.
+    Returns:
+        Callable: Decorator wrapping the view.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            render_cache = get_render_cache()
+            if (
+                render_cache is None
+                or request.method != "GET"
+                or current_user.is_authenticated
+                or "_flashes" in session
+            ):
+                return view(**view_args)
+
+            key = (
+                request.endpoint,
+                tuple(sorted(view_args.items())),
+                tuple(sorted(request.args.items(multi=True))),
+            )
+            page = render_cache.get(key)
+            if page is not None:
+
+                def render_page():
+                    response = make_response(
+                        page["body"].replace(CSRF_PLACEHOLDER, generate_csrf().encode()),
+                        page["status"],
+                    )
+                    response.mimetype = page["mimetype"]
+                    return response
+
+                # A fresh page still has the validators it was rendered with
+                validators = None
+                if page.get("etag"):
+                    last_modified = page.get("last_modified")
+                    validators = (
+                        page["etag"],
+                        datetime.fromisoformat(last_modified) if last_modified else None,
+                    )
+                response = conditional_response(validators, render_page)
+                response.headers["X-Render-Cache"] = "HIT"
+                _add_stats_header(response, render_cache)
+                return response
+
+            # Anything committed after this point invalidates the page being rendered
+            rendered_at = time.time()
+            response = make_response(view(**view_args))
+            response.headers["X-Render-Cache"] = "MISS"
+
+            if response.status_code == 200 and not response.direct_passthrough:
+                body = response.get_data()
+                if "csrf_token" in session:
+                    body = body.replace(generate_csrf().encode(), CSRF_PLACEHOLDER)
+                render_cache.set(
+                    key,
+                    {
+                        "rendered_at": rendered_at,
+                        "dependencies": list(dependencies(**view_args)),
+                        "status": response.status_code,
+                        "mimetype": response.mimetype,
+                        "etag": response.get_etag()[0],
+                        "last_modified": (
+                            response.last_modified.isoformat()
+                            if response.last_modified
+                            else None
+                        ),
+                        "body": body,
+                    },
+                )
+            _add_stats_header(response, render_cache)
+            return response
+
+        return wrapper
+
+    return decorator
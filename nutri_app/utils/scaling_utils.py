@@ -0,0 +1,140 @@
+"""Recipe ingredients rescaled to another number of servings."""
+
+import logging
+
+from sqlalchemy import select
+
+from nutri_app import db
+from nutri_app.models import Ingredient, Recipe, RecipeIngredient
+from .cache_utils import MISSING, LRUCache
+from .quantity_utils import normalize_unit
+
+logger = logging.getLogger(__name__)
+
+# Scaled ingredient lists cache configuration. Entries are keyed by the recipe's
+# updated_at, so an edited recipe is never served from an old entry.
+SCALED_CACHE_SIZE = 2048
+MAX_SERVINGS = 100
+
+_scaled_cache = LRUCache(maxsize=SCALED_CACHE_SIZE)
+
+
+def round_quantity(value: float, unit: str | None) -> float | int:
+    """
+    Round a scaled amount to a precision that makes sense in the kitchen.
+    Args:
+        value (float): The scaled amount, in the written unit.
+        unit (str, optional): The written unit.
+    Returns:
+        float | int: Grams and millilitres to 0.1, 1 or 5 depending on the amount,
+            kilograms and litres to 0.01, spoons, cups, pieces and other units to 1/4.
+    """
+    canonical_unit, factor = normalize_unit(unit)
+    if canonical_unit in ("g", "ml") and factor == 1:
+        step = 0.1 if value < 10 else 1 if value < 100 else 5
+    elif canonical_unit in ("g", "ml") and factor >= 1000:
+        step = 0.01
+    else:
+        step = 0.25
+    rounded = round(round(value / step) * step, 2)
+    # Never round a small amount away
+    if rounded == 0 and value > 0:
+        rounded = step
+    return int(rounded) if float(rounded).is_integer() else rounded
+
+
+def _format_amount(low: float | int, high: float | int) -> str:
+    return f"{low:g}" if low == high else f"{low:g}-{high:g}"
+
+
+def get_recipe_version(recipe_id: int) -> tuple[int, object] | None:
+    """
+    Return the servings and updated_at of a recipe, the key of its scaled lists.
+    Args:
+        recipe_id (int): The ID of the recipe.
+    Returns:
+        tuple[int, datetime] | None: Servings and updated_at, None for an unknown recipe.
+    """
+    return db.session.execute(
+        select(Recipe.servings, Recipe.updated_at).where(Recipe.id == recipe_id)
+    ).first()
+
+
+def scale_ingredients(
+    recipe_id: int, servings: int, version: tuple[int, object] | None = MISSING
+) -> dict | None:
+    """
+    Rescale the ingredients of a recipe from its servings to the requested servings,
+    from the parsed quantity columns in one pass. Results are cached per recipe,
+    servings and updated_at.
+    Args:
+        recipe_id (int): The ID of the recipe.
+        servings (int): The requested number of servings.
+        version (tuple, optional): The recipe's servings and updated_at as returned by
+            get_recipe_version, when the caller already read them.
+    Returns:
+        dict | None: The recipe ID, original and requested servings and the ingredients,
+            None for an unknown recipe. Quantities that are not numbers are kept as
+            written, with scaled set to False.
+    """
+    if version is MISSING:
+        version = get_recipe_version(recipe_id)
+    if version is None:
+        return None
+    original_servings, updated_at = version
+
+    key = (recipe_id, servings, updated_at)
+    scaled = _scaled_cache.get(key)
+    if scaled is not MISSING:
+        return scaled
+
+    rows = db.session.execute(
+        select(
+            Ingredient.name,
+            RecipeIngredient.quantity,
+            RecipeIngredient.unit,
+            RecipeIngredient.quantity_min,
+            RecipeIngredient.quantity_max,
+            RecipeIngredient.quantity_notes,
+            RecipeIngredient.ingredient_notes,
+        )
+        .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+        .where(RecipeIngredient.recipe_id == recipe_id)
+        .order_by(RecipeIngredient.id)
+    ).all()
+
+    ratio = servings / (original_servings or 1)
+    ingredients = []
+    for row in rows:
+        ingredient = {
+            "name": row.name,
+            "quantity": row.quantity,
+            "quantity_min": None,
+            "quantity_max": None,
+            "unit": row.unit,
+            "quantity_notes": row.quantity_notes,
+            "ingredient_notes": row.ingredient_notes,
+            "scaled": row.quantity_min is not None,
+        }
+        if row.quantity_min is not None:
+            low = round_quantity(row.quantity_min * ratio, row.unit)
+            high = round_quantity(row.quantity_max * ratio, row.unit)
+            ingredient.update(
+                quantity=_format_amount(low, high), quantity_min=low, quantity_max=high
+            )
+        ingredients.append(ingredient)
+
+    scaled = {
+        "recipe_id": recipe_id,
+        "original_servings": original_servings,
+        "servings": servings,
+        "ingredients": ingredients,
+    }
+    _scaled_cache.set(key, scaled)
+    logger.info(f"Recipe {recipe_id} scaled to {servings} servings.")
+    return scaled
+
+
+def clear_scaled_cache() -> None:
+    """Drop every cached scaled ingredient list."""
+    _scaled_cache.clear()
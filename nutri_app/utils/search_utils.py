@@ -0,0 +1,95 @@
+"""Full-text search document maintenance and querying for recipes."""
+
+import logging
+
+from sqlalchemy import Float, Text, cast, func, select, update
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from nutri_app import db
+from nutri_app.models import Ingredient, Instruction, Recipe, RecipeIngredient
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "english"
+
+
+def _merge_search_vectors(vectors: object) -> object:
+    """Merge stored tsvectors into one; duplicate lexemes are folded by the tsvector cast."""
+    return func.coalesce(
+        cast(func.string_agg(cast(vectors, Text), " "), TSVECTOR),
+        cast("", TSVECTOR),
+    )
+
+
+def search_document_expression() -> object:
+    """
+    Build the SQL expression of the weighted search document of a recipe.
+    The title gets weight A, ingredient names weight B and instruction text weight C.
+    Ingredient and instruction lexemes are taken from their stored tsvector columns.
+    Returns:
+        ColumnElement: Expression correlated to the recipes table.
+    """
+    ingredient_vector = (
+        select(_merge_search_vectors(Ingredient.name_search))
+        .join(RecipeIngredient, RecipeIngredient.ingredient_id == Ingredient.id)
+        .where(RecipeIngredient.recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+    instruction_vector = (
+        select(_merge_search_vectors(Instruction.instruction_search))
+        .where(Instruction.recipe_id == Recipe.id)
+        .scalar_subquery()
+    )
+
+    return (
+        func.setweight(func.to_tsvector(SEARCH_CONFIG, Recipe.title), "A")
+        .op("||")(func.setweight(ingredient_vector, "B"))
+        .op("||")(func.setweight(instruction_vector, "C"))
+    )
+
+
+def refresh_search_documents(recipe_ids: list[int]) -> None:
+    """
+    Rebuild the search document of the given recipes with one UPDATE statement.
+    Must be called after the recipe's ingredients and instructions are written.
+    Args:
+        recipe_ids (list[int]): IDs of the recipes to be refreshed.
+    """
+    if not recipe_ids:
+        return
+
+    db.session.flush()
+    db.session.execute(
+        update(Recipe)
+        .where(Recipe.id.in_(recipe_ids))
+        # Keep updated_at: re-indexing alone is not a content change
+        .values(
+            search_document=search_document_expression(),
+            updated_at=Recipe.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    logger.info(f"Search documents refreshed for {len(recipe_ids)} recipe(s).")
+
+
+def get_search_query(search_query: str) -> object:
+    """
+    Build the tsquery of a user search string.
+    Args:
+        search_query (str): The raw search string in web search syntax.
+    Returns:
+        ColumnElement: The tsquery expression.
+    """
+    return func.websearch_to_tsquery(SEARCH_CONFIG, search_query)
+
+
+def get_search_rank(search_query_ts: object) -> object:
+    """
+    Build the ranking expression used to order search results.
+    Args:
+        search_query_ts (ColumnElement): The tsquery expression.
+    Returns:
+        ColumnElement: The cover density rank of each recipe, as a double precision
+            so that the rank stored in a pagination cursor compares equal to it.
+    """
+    return cast(func.ts_rank_cd(Recipe.search_document, search_query_ts), Float(53))
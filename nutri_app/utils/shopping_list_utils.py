@@ -0,0 +1,64 @@
+"""Shopping lists aggregated from the ingredients of any selection of recipes."""
+
+import logging
+
+from sqlalchemy import and_, distinct, func, select
+
+from nutri_app import db
+from nutri_app.models import Ingredient, RecipeIngredient
+
+logger = logging.getLogger(__name__)
+
+# Largest selection of recipes accepted by the shopping list endpoint
+MAX_SHOPPING_LIST_RECIPES = 100
+
+
+def _round(value: float) -> float | int:
+    value = round(value, 2)
+    return int(value) if value.is_integer() else value
+
+
+def build_shopping_list(recipe_ids: list[int]) -> list[dict]:
+    """
+    Sum the ingredients of several recipes per ingredient and canonical unit.
+    The sums are computed by one grouped query over the parsed quantity columns.
+    Args:
+        recipe_ids (list[int]): IDs of the selected recipes.
+    Returns:
+        list[dict]: Per ingredient and unit, sorted by name: ingredient, unit,
+            quantity and max_quantity (None when no quantity could be parsed),
+            the unparsed quantities as notes and the number of recipes.
+    """
+    if not recipe_ids:
+        return []
+
+    unparsed = and_(
+        RecipeIngredient.quantity_min.is_(None), RecipeIngredient.quantity != ""
+    )
+    rows = db.session.execute(
+        select(
+            Ingredient.name,
+            RecipeIngredient.canonical_unit,
+            func.sum(RecipeIngredient.quantity_min * RecipeIngredient.unit_factor),
+            func.sum(RecipeIngredient.quantity_max * RecipeIngredient.unit_factor),
+            func.array_agg(distinct(RecipeIngredient.quantity)).filter(unparsed),
+            func.count(distinct(RecipeIngredient.recipe_id)),
+        )
+        .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+        .where(RecipeIngredient.recipe_id.in_(set(recipe_ids)))
+        .group_by(Ingredient.name, RecipeIngredient.canonical_unit)
+        .order_by(Ingredient.name, RecipeIngredient.canonical_unit.nulls_first())
+    ).all()
+
+    logger.info(f"Shopping list of {len(rows)} items built.")
+    return [
+        {
+            "ingredient": name,
+            "unit": unit,
+            "quantity": _round(low) if low is not None else None,
+            "max_quantity": _round(high) if high is not None else None,
+            "notes": sorted(notes or []),
+            "recipes": recipes,
+        }
+        for name, unit, low, high, notes, recipes in rows
+    ]
@@ -0,0 +1,275 @@
+"""Storage backends holding the uploaded files: a pooled S3 client or a local directory."""
+
+import logging
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from datetime import datetime, timezone
+
+import boto3
+from botocore.config import Config as BotoConfig
+from flask import current_app, redirect, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+# Path under which the local backend serves its files, see routes/media.py
+LOCAL_MEDIA_URL = "/media"
+
+# Maximum number of keys of one S3 DeleteObjects request
+S3_DELETE_BATCH_SIZE = 1000
+
+
+class StorageBackend(ABC):
+    """Interface of the file stores, addressing files by key and public URL."""
+
+    @abstractmethod
+    def save(
+        self, key: str, data: bytes, content_type: str, cache_control: str | None = None
+    ) -> str:
+        """
+        Store a file, replacing any file with the same key.
+        Args:
+            key (str): The key of the file, e.g. "recipe_images/<name>.webp".
+            data (bytes): The content of the file.
+            content_type (str): The MIME type served with the file.
+            cache_control (str, optional): The Cache-Control header served with the file.
+        Returns:
+            str: The public URL of the file.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete a file, ignoring missing ones."""
+
+    def delete_many(self, keys: list[str]) -> dict[str, str]:
+        """
+        Delete files, ignoring missing ones.
+        Args:
+            keys (list[str]): The keys of the files.
+        Returns:
+            dict[str, str]: The error of each key that could not be deleted.
+        """
+        errors = {}
+        for key in keys:
+            try:
+                self.delete(key)
+            except Exception as e:
+                errors[key] = str(e)
+        return errors
+
+    @abstractmethod
+    def iter_objects(self, prefix: str = "") -> Iterator[tuple[str, datetime]]:
+        """
+        List the stored files in key order, as S3 does.
+        Args:
+            prefix (str): Only list the keys starting with this prefix.
+        Returns:
+            Iterator[tuple[str, datetime]]: The key and modification time of each file.
+        """
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Return the public URL of a key."""
+
+    @abstractmethod
+    def key_from_url(self, url: str) -> str | None:
+        """Return the key of a public URL, or None when it is not stored here."""
+
+    @abstractmethod
+    def send(self, key: str):
+        """Return a response serving the file of a key."""
+
+
+class S3Storage(StorageBackend):
+    """S3 bucket accessed through one long-lived client whose connections are pooled."""
+
+    def __init__(
+        self,
+        bucket: str,
+        region: str | None = None,
+        public_url: str | None = None,
+        max_pool_connections: int = 10,
+    ):
+        """
+        Configure the backend, the client is created on first use.
+        Args:
+            bucket (str): The name of the bucket.
+            region (str, optional): The AWS region of the bucket.
+            public_url (str, optional): The URL prefix of the objects,
+                                        the virtual-hosted bucket URL by default.
+            max_pool_connections (int): HTTP connections kept open to S3.
+        """
+        self.bucket = bucket
+        self.region = region
+        self.public_url = (
+            public_url or f"https://{bucket}.s3.{region}.amazonaws.com/"
+        ).rstrip("/") + "/"
+        self._config = BotoConfig(
+            region_name=region,
+            max_pool_connections=max_pool_connections,
+            retries={"max_attempts": 3, "mode": "standard"},
+            tcp_keepalive=True,
+        )
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The shared S3 client, thread-safe once created."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = boto3.session.Session().client(
+                        "s3", config=self._config
+                    )
+        return self._client
+
+    def save(self, key, data, content_type, cache_control=None):
+        extra = {"CacheControl": cache_control} if cache_control else {}
+        self.client.put_object(
+            Bucket=self.bucket, Key=key, Body=data, ContentType=content_type, **extra
+        )
+        return self.url(key)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_many(self, keys):
+        errors = {}
+        for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            batch = keys[start : start + S3_DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except Exception as e:
+                errors.update((key, str(e)) for key in batch)
+                continue
+            # Quiet mode only reports the keys that failed
+            for error in response.get("Errors", []):
+                errors[error["Key"]] = f"{error.get('Code')}: {error.get('Message')}"
+        return errors
+
+    def iter_objects(self, prefix=""):
+        # Pages of up to 1000 keys, in UTF-8 binary order
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"], item["LastModified"]
+
+    def url(self, key):
+        return f"{self.public_url}{key}"
+
+    def key_from_url(self, url):
+        if not url.startswith(self.public_url):
+            return None
+        return url[len(self.public_url) :] or None
+
+    def send(self, key):
+        return redirect(self.url(key))
+
+
+class LocalStorage(StorageBackend):
+    """Directory on the local disk, served by the media route."""
+
+    def __init__(self, directory: str, public_url: str = LOCAL_MEDIA_URL):
+        """
+        Configure the backend.
+        Args:
+            directory (str): The directory holding the files, created if missing.
+            public_url (str): The URL prefix of the files.
+        """
+        self.directory = os.path.abspath(directory)
+        self.public_url = public_url.rstrip("/") + "/"
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.directory, key))
+        if os.path.commonpath([path, self.directory]) != self.directory:
+            raise ValueError(f"Storage key escapes the storage directory: {key}")
+        return path
+
+    def save(self, key, data, content_type, cache_control=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so that readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self.url(key)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_objects(self, prefix=""):
+        # A local directory is small enough to sort its keys in memory
+        keys = []
+        for directory, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, filename)
+                key = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append((key, path))
+
+        for key, path in sorted(keys):
+            try:
+                modified = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            yield key, datetime.fromtimestamp(modified, timezone.utc)
+
+    def url(self, key):
+        return f"{self.public_url}{key}"
+
+    def key_from_url(self, url):
+        if not url.startswith(self.public_url):
+            return None
+        return url[len(self.public_url) :] or None
+
+    def send(self, key):
+        # Keys are unique per upload, so the files never change
+        return send_from_directory(self.directory, key, max_age=31536000)
+
+
+def init_storage(app: object) -> None:
+    """
+    Create the storage backend selected by STORAGE_BACKEND ("s3" or "local").
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    backend = app.config.get("STORAGE_BACKEND", "s3")
+    if backend == "s3":
+        storage = S3Storage(
+            bucket=app.config.get("S3_BUCKET_NAME"),
+            region=app.config.get("S3_REGION"),
+            public_url=app.config.get("S3_PUBLIC_URL"),
+            max_pool_connections=app.config.get("S3_MAX_POOL_CONNECTIONS", 10),
+        )
+    elif backend == "local":
+        storage = LocalStorage(
+            app.config.get("LOCAL_STORAGE_DIR")
+            or os.path.join(app.instance_path, "media")
+        )
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+    app.extensions["storage"] = storage
+    app.logger.info(f"Using the {backend} storage backend.")
+
+
+def get_storage() -> StorageBackend:
+    """Return the storage backend of the current application."""
+    return current_app.extensions["storage"]
@@ -0,0 +1,40 @@
+"""Version counters of derived content, read by the HTTP validators and caches."""
+
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from nutri_app import db
+from nutri_app.models import ContentVersion
+
+logger = logging.getLogger(__name__)
+
+
+def bump_content_version(name: str) -> None:
+    """
+    Increment a content version in the current transaction, so that readers see
+    the new version together with the change once it is committed.
+    Args:
+        name (str): The name of the content, e.g. "recipe_cards".
+    """
+    stmt = insert(ContentVersion).values(name=name, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ContentVersion.name],
+        set_={"version": ContentVersion.version + 1},
+    )
+    db.session.execute(stmt)
+
+
+def get_content_version(name: str) -> int:
+    """
+    Read a content version with a primary key lookup.
+    Args:
+        name (str): The name of the content.
+    Returns:
+        int: The current version, 0 for content that was never bumped.
+    """
+    version = db.session.execute(
+        select(ContentVersion.version).where(ContentVersion.name == name)
+    ).scalar()
+    return version or 0
@@ -91,3 +91,43 @@ def test_get_categories_handles_less_than_3_categories(test_client, session):
     data = response.get_json()
     assert len(data) == 1
     assert "Solo" in data[0]["name"]
+
+def test_get_shopping_list_rejects_invalid_ids(test_client):
+    """
+    GIVEN a recipe ID list that is not made of integers
+    WHEN the '/shopping-list' endpoint is requested
+    THEN return 400
+    """
+    response = test_client.get("/shopping-list?ids=1,soup")
+    assert response.status_code == 400
+
+def test_get_menus_batch_rejects_unknown_fields(test_client):
+    """
+    GIVEN a field that is not a section of a menu
+    WHEN the '/menus/batch' endpoint is requested
+    THEN return 400
+    """
+    response = test_client.get("/menus/batch?names=Fast&fields=calories")
+    assert response.status_code == 400
+
+def test_get_weekly_menu_revalidation_reads_the_version_once(test_client, session):
+    """
+    GIVEN a menu whose snapshot was already served
+    WHEN it is requested again with the returned ETag
+    THEN a 304 should be returned from the single snapshot query
+    """
+    from tests.factories import RecipeFactory, TagFactory
+    menu = TagFactory(name="Revalidated-menu", type="menu_name")
+    monday = TagFactory(name="Revalidated-monday", type="day_of_week")
+    lunch = TagFactory(name="Revalidated-lunch", type="meal_type")
+    RecipeFactory(title="revalidated soup", tags=[menu, monday, lunch])
+    session.commit()
+
+    first = test_client.get("/menus/Revalidated-menu")
+    second = test_client.get(
+        "/menus/Revalidated-menu", headers={"If-None-Match": first.headers["ETag"]}
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert second.headers["X-Query-Count"] == "1"
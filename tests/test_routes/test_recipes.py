@@ -0,0 +1,190 @@
+from nutri_app.models import Instruction
+from nutri_app.utils import (
+    clear_scaled_cache,
+    refresh_recipe_cards,
+    refresh_search_documents,
+)
+from nutri_app.utils.render_cache_utils import RenderCache
+from tests.factories import RecipeFactory, TagFactory
+
+
+def test_recipe_detail_page_uses_at_most_two_queries(test_client, session):
+    """
+    GIVEN a recipe with tags and instructions
+    WHEN its detail page is requested anonymously
+    THEN it should render the recipe with at most two SQL queries
+    """
+    lunch = TagFactory(name="Lunch-detail", type="meal_type")
+    recipe = RecipeFactory(title="detail soup", tags=[lunch])
+    session.flush()
+    session.add_all(
+        [
+            Instruction(recipe_id=recipe.id, step_number=2, instruction="Serve hot."),
+            Instruction(recipe_id=recipe.id, step_number=1, instruction="Boil water."),
+        ]
+    )
+    session.commit()
+
+    response = test_client.get(f"/recipe/{recipe.id}")
+
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) <= 2
+    assert "Detail soup" in response.text
+    assert "Lunch-detail" in response.text
+    assert response.text.index("Boil water.") < response.text.index("Serve hot.")
+
+
+def test_recipe_detail_page_not_found(test_client):
+    """
+    GIVEN a recipe ID that does not exist
+    WHEN its detail page is requested
+    THEN a 404 should be returned
+    """
+    response = test_client.get("/recipe/999999999")
+
+    assert response.status_code == 404
+
+
+def test_recipe_detail_page_answers_conditional_get(test_client, session):
+    """
+    GIVEN a recipe whose detail page was already fetched
+    WHEN it is requested again with the returned ETag, the render cache disabled
+    THEN a 304 should be returned without a body, from a single query
+    """
+    recipe = RecipeFactory(title="conditional soup")
+    session.commit()
+
+    first = test_client.get(f"/recipe/{recipe.id}")
+    second = test_client.get(
+        f"/recipe/{recipe.id}", headers={"If-None-Match": first.headers["ETag"]}
+    )
+
+    assert first.status_code == 200
+    assert first.headers["Last-Modified"]
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["X-Query-Count"] == "1"
+
+
+def test_recipe_detail_page_renders_for_a_stale_etag(test_client, session):
+    """
+    GIVEN an ETag that does not match the recipe's current version
+    WHEN the detail page is requested with it
+    THEN the full page should be rendered with the current ETag
+    """
+    recipe = RecipeFactory(title="stale soup")
+    session.commit()
+
+    response = test_client.get(f"/recipe/{recipe.id}", headers={"If-None-Match": "stale"})
+
+    assert response.status_code == 200
+    assert "Stale soup" in response.text
+    assert response.headers["ETag"] != '"stale"'
+
+
+def test_scaled_recipe_requires_valid_servings(test_client):
+    """
+    GIVEN a servings value that is not a positive integer
+    WHEN the '/recipe/<id>/scaled' endpoint is requested
+    THEN return 400
+    """
+    response = test_client.get("/recipe/1/scaled?servings=0")
+    assert response.status_code == 400
+
+
+def test_cached_recipe_detail_page_answers_conditional_get(app, test_client, session):
+    """
+    GIVEN a recipe detail page kept in the render cache
+    WHEN it is requested again with the returned ETag
+    THEN a 304 should be served from the cache without any SQL query, and the
+         cache counters reported
+    """
+    recipe = RecipeFactory(title="cached conditional soup")
+    session.commit()
+    app.extensions["render_cache"] = RenderCache(maxsize=10)
+    try:
+        first = test_client.get(f"/recipe/{recipe.id}")
+        second = test_client.get(
+            f"/recipe/{recipe.id}", headers={"If-None-Match": first.headers["ETag"]}
+        )
+    finally:
+        del app.extensions["render_cache"]
+
+    assert first.headers["X-Render-Cache"] == "MISS"
+    assert second.status_code == 304
+    assert second.headers["X-Render-Cache"] == "HIT"
+    assert second.headers["X-Query-Count"] == "0"
+    assert second.headers["X-Render-Cache-Stats"] == "hits=1; misses=1; size=1"
+
+
+def test_recipe_list_is_revalidated_after_a_card_refresh(test_client, session):
+    """
+    GIVEN a recipe listing already fetched by XHR
+    WHEN a recipe card is refreshed and the listing is requested with the old ETag
+    THEN the full private response should be returned with a new ETag
+    """
+    recipe = RecipeFactory(title="listed soup")
+    session.flush()
+    refresh_recipe_cards([recipe.id])
+    session.commit()
+    headers = {"X-Requested-With": "XMLHttpRequest"}
+
+    first = test_client.get("/recipes", headers=headers)
+    unchanged = test_client.get(
+        "/recipes", headers={**headers, "If-None-Match": first.headers["ETag"]}
+    )
+    refresh_recipe_cards([recipe.id])
+    session.commit()
+    changed = test_client.get(
+        "/recipes", headers={**headers, "If-None-Match": first.headers["ETag"]}
+    )
+
+    assert first.cache_control.private
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_recent_sort_lists_every_recipe_for_anonymous_users(test_client, session):
+    """
+    GIVEN a recipe with a card and a search document
+    WHEN an anonymous user searches the recipes sorted by recently favorited
+    THEN the recipe should be listed in the default order instead of an empty page
+    """
+    recipe = RecipeFactory(title="recent soup")
+    session.flush()
+    refresh_recipe_cards([recipe.id])
+    refresh_search_documents([recipe.id])
+    session.commit()
+
+    response = test_client.get(
+        "/recipes?sort=recent&search=recent",
+        headers={"X-Requested-With": "XMLHttpRequest"},
+    )
+
+    assert response.status_code == 200
+    assert [card["id"] for card in response.json["recipes"]] == [recipe.id]
+
+
+def test_scaled_recipe_reads_the_recipe_version_once(test_client, session):
+    """
+    GIVEN a recipe whose scaled ingredients were already requested
+    WHEN they are requested again, then with the returned ETag
+    THEN the cached list should cost one query and the revalidation a 304
+    """
+    clear_scaled_cache()
+    recipe = RecipeFactory(title="scaled route soup", servings=2)
+    session.commit()
+
+    first = test_client.get(f"/recipe/{recipe.id}/scaled?servings=4")
+    cached = test_client.get(f"/recipe/{recipe.id}/scaled?servings=4")
+    revalidated = test_client.get(
+        f"/recipe/{recipe.id}/scaled?servings=4",
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+
+    assert first.status_code == 200
+    assert first.json["servings"] == 4
+    assert first.headers["X-Query-Count"] == "2"
+    assert cached.headers["X-Query-Count"] == "1"
+    assert revalidated.status_code == 304
@@ -0,0 +1,108 @@
+from sqlalchemy import insert
+
+from nutri_app.models import Recipe
+from nutri_app.utils.autocomplete_utils import (
+    PREFIX_INDEX_TTL,
+    TitlePrefixIndex,
+    get_prefix_index,
+    invalidate_prefix_index,
+    search_titles_in_db,
+)
+from tests.factories import RecipeFactory
+
+
+ROWS = [
+    (1, "Grilled chicken salad", "chicken.jpg"),
+    (2, "Chickpea curry", None),
+    (3, "Lemon tart", "tart.jpg"),
+]
+
+
+def test_prefix_index_matches_whole_title_first():
+    """
+    GIVEN a prefix index over recipe titles
+    WHEN looking up a prefix matching a whole title and a later word
+    THEN the whole-title match should come first
+    """
+    index = TitlePrefixIndex(ROWS)
+
+    assert [s["id"] for s in index.lookup("chick")] == [2, 1]
+
+
+def test_prefix_index_is_case_and_space_insensitive():
+    """
+    GIVEN a prefix index over recipe titles
+    WHEN looking up a prefix with different case and extra spaces
+    THEN the matching suggestion should be formatted like the /search endpoint
+    """
+    index = TitlePrefixIndex(ROWS)
+
+    assert index.lookup("  GRILLED   chi") == [
+        {"title": "Grilled chicken salad", "id": 1, "thumbnail": "chicken.jpg"}
+    ]
+
+
+def test_prefix_index_respects_limit_and_misses():
+    """
+    GIVEN a prefix index over recipe titles
+    WHEN looking up with a limit or an unknown prefix
+    THEN the limit should be applied and unknown prefixes should return nothing
+    """
+    index = TitlePrefixIndex(ROWS)
+
+    assert len(index.lookup("c", limit=1)) == 1
+    assert index.lookup("zucchini") == []
+    assert index.lookup("   ") == []
+
+
+def test_search_titles_in_db_finds_misspelled_title(session):
+    """
+    GIVEN a recipe title
+    WHEN searching the database with a misspelled query
+    THEN the trigram similarity should still find it
+    """
+    recipe = RecipeFactory(title="Autocomplete strawberry pavlova")
+    session.commit()
+
+    results = search_titles_in_db("strawbery pavlova")
+
+    assert recipe.id in [s["id"] for s in results]
+
+
+def test_prefix_index_is_rebuilt_after_its_ttl(session, mocker):
+    """
+    GIVEN a built prefix index
+    WHEN a recipe is inserted without an invalidation, as by another worker
+    THEN the index should find its title once PREFIX_INDEX_TTL has elapsed
+    """
+    clock = mocker.patch("nutri_app.utils.cache_utils.time.monotonic", return_value=100.0)
+    invalidate_prefix_index()
+    get_prefix_index()
+    session.execute(insert(Recipe).values(title="Autocomplete ttl quiche"))
+
+    assert get_prefix_index().lookup("autocomplete ttl") == []
+    clock.return_value = 100.0 + PREFIX_INDEX_TTL
+    assert get_prefix_index().lookup("autocomplete ttl")
+
+
+def test_prefix_index_built_before_an_invalidation_is_not_kept(session, mocker):
+    """
+    GIVEN an index build that read the titles before a commit invalidated the index
+    WHEN the build completes
+    THEN its stale index should not be kept, and the next lookup should rebuild
+    """
+
+    def invalidated_during_build(rows):
+        invalidate_prefix_index()
+        return TitlePrefixIndex(rows)
+
+    invalidate_prefix_index()
+    mocker.patch(
+        "nutri_app.utils.autocomplete_utils.TitlePrefixIndex",
+        side_effect=invalidated_during_build,
+    )
+    get_prefix_index()
+    mocker.stopall()
+    session.execute(insert(Recipe).values(title="Autocomplete race quiche"))
+
+    assert get_prefix_index().lookup("autocomplete race")
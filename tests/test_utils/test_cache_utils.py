@@ -0,0 +1,52 @@
+from nutri_app.utils.cache_utils import MISSING, LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """
+    GIVEN a full LRU cache
+    WHEN a new key is stored after reading the oldest one
+    THEN the least recently used key should be evicted
+    """
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is MISSING
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries(mocker):
+    """
+    GIVEN an LRU cache with a TTL
+    WHEN an entry is read after the TTL has passed
+    THEN it should be reported as missing
+    """
+    clock = mocker.patch("nutri_app.utils.cache_utils.time.monotonic", return_value=100.0)
+    cache = LRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+
+    clock.return_value = 105.0
+    assert cache.get("a") == 1
+
+    clock.return_value = 111.0
+    assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+
+def test_lru_cache_update_only_touches_cached_keys():
+    """
+    GIVEN an LRU cache
+    WHEN update is called for a cached and an uncached key
+    THEN only the cached value should be replaced
+    """
+    cache = LRUCache(maxsize=2)
+    cache.set("a", frozenset({1}))
+
+    cache.update("a", lambda ids: ids | {2})
+    cache.update("b", lambda ids: ids | {2})
+
+    assert cache.get("a") == frozenset({1, 2})
+    assert cache.get("b") is MISSING
@@ -0,0 +1,49 @@
+from nutri_app.models import RecipeCard
+from nutri_app.utils import refresh_recipe_cards
+from tests.factories import RecipeFactory, TagFactory
+
+
+def test_refresh_recipe_cards_denormalizes_recipe(session):
+    """
+    GIVEN a tagged recipe without a compressed image
+    WHEN its card is refreshed
+    THEN the card should hold the fallback image, total time and tag names
+    """
+    lunch = TagFactory(name="Lunch-card", type="meal_type")
+    recipe = RecipeFactory(
+        title="Card soup",
+        prep_time=10,
+        cook_time=25,
+        compressed_img_URL=None,
+        quality_img_URL="https://example.com/soup.jpg",
+        tags=[lunch],
+    )
+    session.flush()
+
+    refresh_recipe_cards([recipe.id])
+    session.commit()
+
+    card = session.get(RecipeCard, recipe.id)
+    assert card.title == "Card soup"
+    assert card.image_url == "https://example.com/soup.jpg"
+    assert card.total_time == 35
+    assert card.tag_names == ["Lunch-card"]
+    assert card.tag_types == ["meal_type"]
+
+
+def test_refresh_recipe_cards_updates_existing_card(session):
+    """
+    GIVEN a recipe with a card
+    WHEN the recipe is renamed and its card refreshed again
+    THEN the existing card should be updated in place
+    """
+    recipe = RecipeFactory(title="Card stew")
+    session.flush()
+    refresh_recipe_cards([recipe.id])
+
+    recipe.title = "Card ragout"
+    refresh_recipe_cards([recipe.id])
+    session.commit()
+    session.expire_all()
+
+    assert session.get(RecipeCard, recipe.id).title == "Card ragout"
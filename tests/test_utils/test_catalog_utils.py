@@ -0,0 +1,84 @@
+from sqlalchemy import insert
+
+from nutri_app.models import Tag
+from nutri_app.utils import get_tag_catalog, get_tag_options, invalidate_tag_catalog
+from nutri_app.utils.catalog_utils import TAG_CATALOG_TTL
+from tests.factories import TagFactory
+
+
+def test_get_tag_options_sorts_days_and_meals():
+    """
+    GIVEN (type, name) rows in random order
+    WHEN get_tag_options is called
+    THEN days and meals should follow the week and meal order, other types alphabetical
+    """
+    rows = [
+        ("meal_type", "Dinner"),
+        ("day_of_week", "Friday"),
+        ("meal_type", "Breakfast"),
+        ("day_of_week", "Monday"),
+        ("menu_name", "Summer"),
+        ("menu_name", "Fast"),
+        ("menu_name", "Fast"),
+    ]
+
+    assert get_tag_options(rows) == {
+        "Day of the week": ["Monday", "Friday"],
+        "Meals": ["Breakfast", "Dinner"],
+        "Menu": ["Fast", "Summer"],
+    }
+
+
+def test_tag_catalog_is_invalidated_on_tag_write(session):
+    """
+    GIVEN a loaded tag catalog
+    WHEN a new tag is committed
+    THEN the next catalog read should include it
+    """
+    invalidate_tag_catalog()
+    catalog = get_tag_catalog()
+    assert get_tag_catalog() is catalog
+
+    TagFactory(name="Catalog-test", type="menu_name")
+    session.commit()
+
+    assert "Catalog-test" in get_tag_catalog()["Menu"]
+
+
+def test_tag_catalog_is_reloaded_after_its_ttl(session, mocker):
+    """
+    GIVEN a loaded tag catalog
+    WHEN a tag is inserted without an invalidation, as by another worker
+    THEN the catalog should include the tag once TAG_CATALOG_TTL has elapsed
+    """
+    clock = mocker.patch("nutri_app.utils.cache_utils.time.monotonic", return_value=100.0)
+    invalidate_tag_catalog()
+    get_tag_catalog()
+    session.execute(insert(Tag).values(name="Catalog-ttl", type="menu_name"))
+
+    assert "Catalog-ttl" not in get_tag_catalog().get("Menu", [])
+    clock.return_value = 100.0 + TAG_CATALOG_TTL
+    assert "Catalog-ttl" in get_tag_catalog()["Menu"]
+
+
+def test_tag_catalog_loaded_before_an_invalidation_is_not_kept(session, mocker):
+    """
+    GIVEN a catalog load that read the tags before a commit invalidated the catalog
+    WHEN the load completes
+    THEN its stale catalog should not be kept, and the next read should reload
+    """
+
+    def invalidated_during_load(tag_rows):
+        invalidate_tag_catalog()
+        return get_tag_options(tag_rows)
+
+    invalidate_tag_catalog()
+    mocker.patch(
+        "nutri_app.utils.catalog_utils.get_tag_options",
+        side_effect=invalidated_during_load,
+    )
+    get_tag_catalog()
+    mocker.stopall()
+    session.execute(insert(Tag).values(name="Catalog-race", type="menu_name"))
+
+    assert "Catalog-race" in get_tag_catalog()["Menu"]
@@ -0,0 +1,70 @@
+import os
+import threading
+
+from nutri_app.models import StorageDeletion
+from nutri_app.utils import (
+    get_storage,
+    process_storage_deletions,
+    queue_storage_deletions,
+)
+from nutri_app.utils.deletion_utils import DeletionWorker, retry_delay
+
+
+def test_queued_files_are_deleted_in_a_batch(session):
+    """
+    GIVEN two stored files queued for deletion with a foreign URL
+    WHEN the outbox is processed
+    THEN both files should be deleted and their rows removed
+    """
+    storage = get_storage()
+    urls = [
+        storage.save(f"test_outbox/{name}.webp", b"x", "image/webp")
+        for name in ("card", "detail")
+    ]
+
+    queued = queue_storage_deletions(urls + ["https://elsewhere.example/a.jpg"])
+    session.commit()
+
+    assert queued == 2
+    assert process_storage_deletions() == (2, 0)
+    assert session.query(StorageDeletion).count() == 0
+    for url in urls:
+        assert not os.path.exists(
+            os.path.join(storage.directory, storage.key_from_url(url))
+        )
+
+
+def test_retry_delay_backs_off_up_to_an_hour():
+    """
+    GIVEN failed deletion attempts
+    WHEN the delay before the next attempt is computed
+    THEN it should double from 30 seconds and stop at one hour
+    """
+    assert [retry_delay(n).total_seconds() for n in (1, 2, 3, 10)] == [
+        30,
+        60,
+        120,
+        3600,
+    ]
+
+
+def test_deletion_worker_drains_the_outbox_once_started(app, mocker):
+    """
+    GIVEN a deletion worker and rows left in the outbox by a previous run
+    WHEN the worker is started, without any new deletion being queued
+    THEN it should drain the outbox right away instead of waiting for a wake-up
+    """
+    drained = threading.Event()
+
+    def process(batch_size):
+        drained.set()
+        return 0, 0
+
+    mocker.patch(
+        "nutri_app.utils.deletion_utils.process_storage_deletions", side_effect=process
+    )
+    worker = DeletionWorker(app, poll_interval=3600, batch_size=10)
+
+    worker.start()
+
+    assert drained.wait(5)
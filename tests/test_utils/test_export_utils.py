@@ -0,0 +1,44 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+from nutri_app.utils import iter_catalog, iter_ndjson
+from tests.factories import RecipeFactory, TagFactory
+
+
+def test_iter_ndjson_gzip_round_trip():
+    """
+    GIVEN records with a timestamp
+    WHEN they are encoded as gzipped NDJSON
+    THEN decompressing the chunks should give one JSON line per record
+    """
+    records = [
+        {"id": 1, "updated_at": datetime(2026, 1, 1, tzinfo=timezone.utc)},
+        {"id": 2},
+    ]
+
+    data = gzip.decompress(b"".join(iter_ndjson(records, compress=True)))
+
+    assert [json.loads(line) for line in data.splitlines()] == [
+        {"id": 1, "updated_at": "2026-01-01T00:00:00+00:00"},
+        {"id": 2},
+    ]
+
+
+def test_iter_catalog_exports_nested_recipe(session):
+    """
+    GIVEN a tagged recipe
+    WHEN the catalog is exported, fully and incrementally from the future
+    THEN the full export should nest its tags and the incremental one skip it
+    """
+    recipe = RecipeFactory(
+        title="Export soup", tags=[TagFactory(name="Export-tag", type="meal_type")]
+    )
+    session.commit()
+
+    exported = [record for record in iter_catalog() if record.get("id") == recipe.id]
+    future = datetime.now(timezone.utc) + timedelta(days=1)
+
+    assert exported[0]["title"] == "Export soup"
+    assert exported[0]["tags"] == [{"name": "Export-tag", "type": "meal_type"}]
+    assert all(record.get("id") != recipe.id for record in iter_catalog(since=future))
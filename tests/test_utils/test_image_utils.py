@@ -0,0 +1,136 @@
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import BadRequest
+
+from nutri_app.models import StorageDeletion, StoredImage
+from nutri_app.utils import image_srcset, release_recipe_image, upload_image
+from nutri_app.utils.image_utils import process_recipe_image, render_variants
+from tests.factories import RecipeFactory
+
+
+def make_upload(size, mode="RGB", **save_options):
+    body = io.BytesIO()
+    image_format = "PNG" if mode == "RGBA" else "JPEG"
+    Image.new(mode, size, "red").save(body, image_format, **save_options)
+    return body.getvalue()
+
+
+def test_render_variants_resizes_and_strips_metadata():
+    """
+    GIVEN a large JPEG upload carrying EXIF metadata
+    WHEN its variants are rendered
+    THEN each size should exist in WebP and JPEG, without the EXIF block
+    """
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    variants = render_variants(make_upload((2000, 1000), exif=exif.tobytes()))
+
+    assert [(v["name"], v["width"], v["height"], v["format"]) for v in variants] == [
+        ("card", 480, 240, "webp"),
+        ("card", 480, 240, "jpeg"),
+        ("detail", 1200, 600, "webp"),
+        ("detail", 1200, 600, "jpeg"),
+        ("original", 2000, 1000, "webp"),
+        ("original", 2000, 1000, "jpeg"),
+    ]
+    for variant in variants:
+        with Image.open(io.BytesIO(variant["body"])) as image:
+            assert image.size == (variant["width"], variant["height"])
+            assert not image.getexif()
+
+
+def test_render_variants_skips_sizes_larger_than_the_upload():
+    """
+    GIVEN a small transparent PNG upload
+    WHEN its variants are rendered
+    THEN only the original size should be encoded, as an opaque JPEG
+    """
+    variants = render_variants(make_upload((300, 200), mode="RGBA"))
+
+    assert [(v["name"], v["width"]) for v in variants] == [("card", 300), ("card", 300)]
+    with Image.open(io.BytesIO(variants[1]["body"])) as jpeg:
+        assert jpeg.mode == "RGB"
+
+
+def test_image_srcset_lists_variants_by_width():
+    """
+    GIVEN the stored variants of a recipe image
+    WHEN the srcset of a format is built
+    THEN it should list each URL with its width, and be empty without variants
+    """
+    variants = {
+        "jpeg": [
+            {"name": "card", "width": 480, "url": "https://img/card.jpeg"},
+            {"name": "detail", "width": 1200, "url": "https://img/detail.jpeg"},
+        ]
+    }
+
+    assert image_srcset(variants) == (
+        "https://img/card.jpeg 480w, https://img/detail.jpeg 1200w"
+    )
+    assert image_srcset(variants, "webp") == ""
+    assert image_srcset(None) == ""
+
+
+def test_same_image_is_stored_once_and_released_with_its_last_recipe(session):
+    """
+    GIVEN two recipes given the same uploaded image
+    WHEN their images are released one after the other
+    THEN the variants should be shared, and queued for deletion only with the last one
+    """
+    first, second = RecipeFactory(), RecipeFactory()
+    session.commit()
+    data = make_upload((600, 300))
+    digest = hashlib.sha256(data).hexdigest()
+
+    process_recipe_image(first.id, data, digest)
+    process_recipe_image(second.id, data, digest)
+
+    assert session.get(StoredImage, digest).refcount == 2
+    assert first.image_variants == second.image_variants
+    assert digest in first.compressed_img_URL
+
+    release_recipe_image(first)
+    session.commit()
+    assert session.get(StoredImage, digest).refcount == 1
+
+    release_recipe_image(second)
+    session.commit()
+    assert session.get(StoredImage, digest) is None
+    queued = session.query(StorageDeletion).filter(StorageDeletion.key.contains(digest))
+    assert queued.count() == 4
+
+
+@pytest.mark.filterwarnings("ignore::PIL.Image.DecompressionBombWarning")
+@pytest.mark.parametrize("size", [(12, 12), (20, 20)])
+def test_upload_image_rejects_decompression_bombs(session, mocker, size):
+    """
+    GIVEN an upload with more pixels than Image.MAX_IMAGE_PIXELS, below and above
+          the size at which Pillow raises rather than warns
+    WHEN it is uploaded
+    THEN a 400 should be raised before anything is queued
+    """
+    mocker.patch.object(Image, "MAX_IMAGE_PIXELS", 100)
+    recipe = RecipeFactory(title="Bomb soup")
+    upload = FileStorage(io.BytesIO(make_upload(size)), filename="bomb.jpg")
+
+    with pytest.raises(BadRequest, match="too large"):
+        upload_image(upload, recipe)
+
+
+def test_upload_image_rejects_truncated_files(session):
+    """
+    GIVEN a PNG whose header is valid but whose data is cut off
+    WHEN it is uploaded
+    THEN a 400 should be raised instead of failing in the worker
+    """
+    recipe = RecipeFactory(title="Truncated soup")
+    data = make_upload((64, 64), mode="RGBA")
+    upload = FileStorage(io.BytesIO(data[: len(data) // 2]), filename="cut.png")
+
+    with pytest.raises(BadRequest, match="not a supported image"):
+        upload_image(upload, recipe)
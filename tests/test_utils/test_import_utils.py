@@ -0,0 +1,73 @@
+from nutri_app.models import MenuShoppingInfo, Recipe, RecipeIngredient, Tag
+from nutri_app.utils import import_batch, validate_record
+
+SOUP = {
+    "title": "Imported soup",
+    "servings": 2,
+    "prep_time": 10,
+    "cook_time": 20,
+    "ingredients": [{"name": "import-tomato", "quantity": "4", "unit": "pcs"}],
+    "instructions": ["Chop.", "Boil."],
+    "tags": [{"name": "Import-menu", "type": "menu_name"}],
+}
+
+
+def test_validate_record_reports_every_error():
+    """
+    GIVEN a recipe record with a blank title, a bad servings value and a nameless ingredient
+    WHEN it is validated
+    THEN one error per problem should be returned
+    """
+    errors = validate_record(
+        {"title": " ", "servings": "many", "ingredients": [{"quantity": "1"}]}
+    )
+
+    assert errors == [
+        "'title' must be a non-empty string",
+        "'servings' must be an integer",
+        "'name' is required",
+    ]
+
+
+def test_import_batch_loads_recipes_and_shopping_info(session):
+    """
+    GIVEN a recipe record and a menu record
+    WHEN they are imported as one batch
+    THEN the recipe, its children, its menu tag and the shopping info should exist
+    """
+    menu = {"menu": "Import-menu", "shopping_list_text": "SHOPPING LIST\nVEGETABLES\ntomato"}
+    recipe_ids, counts = import_batch([SOUP, menu])
+    session.commit()
+
+    recipe = session.get(Recipe, recipe_ids[0])
+    assert recipe.title == "Imported soup"
+    steps = sorted(recipe.instructions, key=lambda instruction: instruction.step_number)
+    assert [step.instruction for step in steps] == ["Chop.", "Boil."]
+    menu_tag = session.query(Tag).filter_by(name="Import-menu", type="menu_name").one()
+    assert menu_tag in recipe.tags
+    shopping_info = (
+        session.query(MenuShoppingInfo).filter_by(menu_tag_id=menu_tag.id).one()
+    )
+    assert shopping_info.shopping_list_text == "SHOPPING LIST\nVEGETABLES\ntomato"
+    assert shopping_info.parsed_info["shopping_list"] == [
+        {"category": "VEGETABLES", "items": ["tomato"]}
+    ]
+    assert counts["import_recipes"] == 1
+
+
+def test_import_batch_replaces_children_of_existing_recipe(session):
+    """
+    GIVEN an already imported recipe
+    WHEN it is imported again with other ingredients
+    THEN its ingredients should be replaced rather than appended
+    """
+    import_batch([SOUP])
+    session.commit()
+
+    recipe_ids, _ = import_batch(
+        [{**SOUP, "ingredients": [{"name": "import-basil", "quantity": "1"}]}]
+    )
+    session.commit()
+
+    links = session.query(RecipeIngredient).filter_by(recipe_id=recipe_ids[0]).all()
+    assert [link.quantity for link in links] == ["1"]
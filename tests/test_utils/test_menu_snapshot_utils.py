@@ -0,0 +1,84 @@
+import json
+from datetime import datetime, timezone
+
+from nutri_app.models import MenuSnapshot
+from nutri_app.utils import get_menu_snapshot
+from tests.factories import RecipeFactory, TagFactory
+
+
+def test_menu_snapshot_is_reused_until_a_recipe_changes(session):
+    """
+    GIVEN a menu with one recipe
+    WHEN its snapshot is read twice, then again after the recipe is renamed with
+         an older updated_at
+    THEN the stored bytes should be served until the rename rebuilds them
+    """
+    menu = TagFactory(name="Snapshot-menu", type="menu_name")
+    monday = TagFactory(name="Snapshot-monday", type="day_of_week")
+    lunch = TagFactory(name="Snapshot-lunch", type="meal_type")
+    recipe = RecipeFactory(title="snapshot soup", tags=[menu, monday, lunch])
+    session.commit()
+
+    menu_tag_id, _, body = get_menu_snapshot("Snapshot-menu")
+    built_at = session.get(MenuSnapshot, menu_tag_id).built_at
+    _, _, cached_body = get_menu_snapshot("Snapshot-menu")
+    session.expire_all()
+
+    assert cached_body == body
+    assert session.get(MenuSnapshot, menu_tag_id).built_at == built_at
+    lunches = json.loads(body)["recipes_by_day"]["Snapshot-monday"]["Snapshot-lunch"]
+    assert lunches == [{"id": recipe.id, "title": "Snapshot soup"}]
+
+    recipe.title = "renamed soup"
+    recipe.updated_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    session.commit()
+    _, _, rebuilt_body = get_menu_snapshot("Snapshot-menu")
+
+    assert "Renamed soup" in rebuilt_body.decode()
+
+
+def test_menu_snapshot_is_rebuilt_when_a_recipe_moves_to_another_day(session):
+    """
+    GIVEN a menu snapshot with one recipe on Monday
+    WHEN the recipe is relinked to Tuesday without any other change
+    THEN the snapshot should be rebuilt with the recipe on Tuesday
+    """
+    menu = TagFactory(name="Move-menu", type="menu_name")
+    monday = TagFactory(name="Move-monday", type="day_of_week")
+    tuesday = TagFactory(name="Move-tuesday", type="day_of_week")
+    lunch = TagFactory(name="Move-lunch", type="meal_type")
+    recipe = RecipeFactory(title="moved soup", tags=[menu, monday, lunch])
+    session.commit()
+    get_menu_snapshot("Move-menu")
+
+    recipe.tags = [menu, tuesday, lunch]
+    session.commit()
+    _, _, body = get_menu_snapshot("Move-menu")
+
+    recipes_by_day = json.loads(body)["recipes_by_day"]
+    assert recipes_by_day["Move-monday"]["Move-lunch"] == []
+    assert recipes_by_day["Move-tuesday"]["Move-lunch"] == [
+        {"id": recipe.id, "title": "Moved soup"}
+    ]
+
+
+def test_menu_snapshot_is_rebuilt_when_a_day_tag_is_renamed(session):
+    """
+    GIVEN a menu snapshot with one recipe on Monday
+    WHEN the Monday tag is renamed
+    THEN the snapshot should be rebuilt under the new day name
+    """
+    menu = TagFactory(name="Rename-menu", type="menu_name")
+    monday = TagFactory(name="Rename-monday", type="day_of_week")
+    lunch = TagFactory(name="Rename-lunch", type="meal_type")
+    RecipeFactory(title="renamed day soup", tags=[menu, monday, lunch])
+    session.commit()
+    get_menu_snapshot("Rename-menu")
+
+    monday.name = "Rename-lundi"
+    session.commit()
+    _, _, body = get_menu_snapshot("Rename-menu")
+
+    recipes_by_day = json.loads(body)["recipes_by_day"]
+    assert "Rename-monday" not in recipes_by_day
+    assert recipes_by_day["Rename-lundi"]["Rename-lunch"]
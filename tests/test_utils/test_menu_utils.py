@@ -1,5 +1,11 @@
 
-from nutri_app.utils import organize_recipes_by_day, to_structured_list, build_shopping_info
+from nutri_app.models import MenuShoppingInfo
+from nutri_app.utils import (
+    organize_recipes_by_day,
+    to_structured_list,
+    build_shopping_info,
+    build_menus_batch,
+)
 from tests.factories import RecipeFactory, TagFactory
 
 def test_organize_recipes_empty_inputs():
@@ -149,6 +155,7 @@ def test_build_shopping_info_full_structure():
         shopping_list_text = "SHOPPING LIST\nVEGETABLES AND FRUITS:\nCabbage – 500 g\nCarrot – 500 g"
         meat_marinades_text = "MEAT MARINADES\nFRENCH MARINADE:\nLemon juice – 2 tbsp"
         dressings_text = "DRESSINGS:\nFRENCH:\nOlive oil – 3 tbsp"
+        parsed_info = None
 
     result = build_shopping_info(MockInfo())
 
@@ -177,6 +184,7 @@ def test_build_shopping_info_empty_fields():
         shopping_list_text = ""
         meat_marinades_text = ""
         dressings_text = ""
+        parsed_info = None
 
     result = build_shopping_info(EmptyMockInfo())
     assert result["rules_and_tips"] == ""
@@ -193,3 +201,60 @@ def test_build_shopping_info_none_input():
     """
     result = build_shopping_info(None)
     assert result == {}
+
+
+def test_shopping_info_is_parsed_on_write(session):
+    """
+    GIVEN a menu shopping info saved with a shopping list
+    WHEN its shopping list is changed and saved again
+    THEN parsed_info should hold the parsed texts after each write
+    """
+    menu = TagFactory(name="Parsed-menu", type="menu_name")
+    info = MenuShoppingInfo(
+        menu_tag=menu, shopping_list_text="SHOPPING LIST\nFRUITS\nApple"
+    )
+    session.add(info)
+    session.commit()
+
+    assert info.parsed_info["shopping_list"] == [
+        {"category": "FRUITS", "items": ["Apple"]}
+    ]
+    assert info.parsed_info["dressings"] == ""
+
+    info.shopping_list_text = "SHOPPING LIST\nVEGETABLES\nCarrot"
+    session.commit()
+    session.expire(info)
+
+    assert build_shopping_info(info)["shopping_list"] == [
+        {"category": "VEGETABLES", "items": ["Carrot"]}
+    ]
+
+
+def test_build_menus_batch_groups_recipes_by_menu(session):
+    """
+    GIVEN two menus with recipes and a menu name that does not exist
+    WHEN the batch is built without shopping info
+    THEN each menu should hold its own recipes and the unknown name be reported
+    """
+    first = TagFactory(name="Batch-menu-one", type="menu_name")
+    second = TagFactory(name="Batch-menu-two", type="menu_name")
+    monday = TagFactory(name="Batch-Monday", type="day_of_week")
+    lunch = TagFactory(name="Batch-Lunch", type="meal_type")
+    r1 = RecipeFactory(title="batch soup", tags=[first, monday, lunch])
+    r2 = RecipeFactory(title="batch stew", tags=[second, monday, lunch])
+    session.commit()
+
+    result = build_menus_batch(
+        ["Batch-menu-one", "Batch-menu-two", "Batch-missing"], ("recipes_by_day",)
+    )
+
+    menus = {menu["menu"]: menu for menu in result["menus"]}
+    assert menus["Batch-menu-one"]["recipes_by_day"]["Batch-Monday"]["Batch-Lunch"] == [
+        {"id": r1.id, "title": "Batch soup"}
+    ]
+    assert menus["Batch-menu-two"]["recipes_by_day"]["Batch-Monday"]["Batch-Lunch"] == [
+        {"id": r2.id, "title": "Batch stew"}
+    ]
+    assert "shopping_info" not in menus["Batch-menu-one"]
+    assert result["not_found"] == ["Batch-missing"]
+
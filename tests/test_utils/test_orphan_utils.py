@@ -0,0 +1,49 @@
+import io
+import os
+from datetime import datetime, timedelta, timezone
+
+from nutri_app.utils import collect_orphans, diff_sorted, get_storage
+from tests.factories import RecipeFactory
+
+MODIFIED = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_diff_sorted_reports_orphans_and_missing_files():
+    """
+    GIVEN sorted stored and referenced keys that partly overlap
+    WHEN they are merged
+    THEN unreferenced stored keys should be orphans and unstored references missing
+    """
+    stored = [("a.jpeg", MODIFIED), ("b.jpeg", MODIFIED), ("d.jpeg", MODIFIED)]
+    referenced = ["b.jpeg", "c.jpeg"]
+
+    assert list(diff_sorted(stored, referenced)) == [
+        ("orphan", "a.jpeg", MODIFIED),
+        ("missing", "c.jpeg", None),
+        ("orphan", "d.jpeg", MODIFIED),
+    ]
+
+
+def test_collect_orphans_deletes_unreferenced_files(session):
+    """
+    GIVEN a referenced and an unreferenced file in the local storage
+    WHEN orphans are collected without grace period, first as a dry run
+    THEN only the unreferenced file should be reported, then deleted
+    """
+    storage = get_storage()
+    kept_url = storage.save("test_orphans/kept.jpeg", b"x", "image/jpeg")
+    storage.save("test_orphans/orphan.jpeg", b"x", "image/jpeg")
+    RecipeFactory(quality_img_URL=kept_url, compressed_img_URL=kept_url)
+    session.commit()
+
+    report = io.StringIO()
+    dry_run = collect_orphans(
+        storage, "test_orphans/", timedelta(0), dry_run=True, report=report
+    )
+    totals = collect_orphans(storage, "test_orphans/", timedelta(0))
+
+    assert dry_run["orphan"] == 1
+    assert "orphan,test_orphans/orphan.jpeg" in report.getvalue()
+    assert totals["deleted"] == 1
+    assert not os.path.exists(os.path.join(storage.directory, "test_orphans/orphan.jpeg"))
+    assert os.path.exists(os.path.join(storage.directory, "test_orphans/kept.jpeg"))
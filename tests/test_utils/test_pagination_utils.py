@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from nutri_app.utils.pagination_utils import (
+    decode_cursor,
+    encode_cursor,
+    get_sort_keys,
+    keyset_paginate,
+)
+from nutri_app.models import Instruction, Recipe
+from nutri_app.utils import get_search_query, get_search_rank, refresh_search_documents
+from tests.factories import RecipeFactory
+
+
+def test_cursor_round_trip():
+    """
+    GIVEN keyset values of the last row of a page
+    WHEN they are encoded and decoded with the same sort order
+    THEN the original values are returned
+    """
+    cursor = encode_cursor("asc", ["pancakes", 42])
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "asc") == ["pancakes", 42]
+
+
+def test_empty_cursor_means_first_page():
+    """
+    GIVEN an empty cursor
+    WHEN decode_cursor is called
+    THEN it should return None
+    """
+    assert decode_cursor("", "default") is None
+
+
+def test_cursor_with_other_sort_order_is_rejected():
+    """
+    GIVEN a cursor produced for the "asc" sort order
+    WHEN it is decoded for the "desc" sort order
+    THEN a 400 error should be raised
+    """
+    cursor = encode_cursor("asc", ["pancakes", 42])
+
+    with pytest.raises(BadRequest):
+        decode_cursor(cursor, "desc")
+
+
+def test_garbage_cursor_is_rejected():
+    """
+    GIVEN a cursor that was not produced by encode_cursor
+    WHEN decode_cursor is called
+    THEN a 400 error should be raised
+    """
+    with pytest.raises(BadRequest):
+        decode_cursor("not-a-cursor!", "default")
+
+
+def test_keyset_paginate_walks_all_rows(session):
+    """
+    GIVEN a set of recipes
+    WHEN keyset_paginate is followed from cursor to cursor
+    THEN every recipe should be returned exactly once, in title order
+    """
+    titles = ["keyset-a", "keyset-b", "keyset-c", "keyset-d", "keyset-e"]
+    for title in titles:
+        RecipeFactory(title=title)
+    session.commit()
+
+    query = Recipe.query.filter(Recipe.title.like("keyset-%"))
+    sort_keys = get_sort_keys("asc", model=Recipe)
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        items, cursor = keyset_paginate(query, "asc", sort_keys, cursor, 2)
+        seen.extend(recipe.title for recipe in items)
+
+    assert seen == titles
+
+
+def test_cursor_round_trip_with_datetime():
+    """
+    GIVEN keyset values of the "recent" sort order, which contain a timestamp
+    WHEN they are encoded and decoded
+    THEN the timestamp should be restored with its timezone
+    """
+    added_at = datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor("recent", [added_at, 7])
+
+    assert decode_cursor(cursor, "recent") == [added_at, 7]
+
+
+def test_keyset_paginate_walks_recipes_tied_on_search_rank(session):
+    """
+    GIVEN several recipes with the same search rank, 0.2 for a match in the
+          instructions, which a double does not hold exactly as a real
+    WHEN keyset_paginate is followed from cursor to cursor by rank
+    THEN no recipe tied with the last row of a page should be skipped
+    """
+    recipes = [RecipeFactory(title=f"Tied rank {i}") for i in range(5)]
+    session.flush()
+    session.add_all(
+        Instruction(recipe_id=recipe.id, step_number=1, instruction="Add the sorrel.")
+        for recipe in recipes
+    )
+    refresh_search_documents([recipe.id for recipe in recipes])
+    session.commit()
+
+    search_query_ts = get_search_query("sorrel")
+    query = Recipe.query.filter(Recipe.search_document.op("@@")(search_query_ts))
+    sort_keys = get_sort_keys("default", get_search_rank(search_query_ts), Recipe)
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        items, cursor = keyset_paginate(query, "default", sort_keys, cursor, 2)
+        seen.extend(recipe.id for recipe in items)
+
+    assert seen == [recipe.id for recipe in recipes]
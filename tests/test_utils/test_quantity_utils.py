@@ -0,0 +1,73 @@
+import pytest
+
+from nutri_app.models import Ingredient, RecipeIngredient
+from nutri_app.utils import normalize_unit, parse_quantity
+from tests.factories import RecipeFactory
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2", (2.0, 2.0)),
+        ("1,5", (1.5, 1.5)),
+        ("1 1/2", (1.5, 1.5)),
+        ("½", (0.5, 0.5)),
+        ("200-250", (200.0, 250.0)),
+        ("2 to 3", (2.0, 3.0)),
+    ],
+)
+def test_parse_quantity_numbers_and_ranges(text, expected):
+    """
+    GIVEN a quantity written as a number, a fraction or a range
+    WHEN parse_quantity is called
+    THEN it should return its lowest and highest amounts
+    """
+    assert parse_quantity(text) == expected
+
+
+def test_parse_quantity_rejects_text():
+    """
+    GIVEN quantities that are not numbers
+    WHEN parse_quantity is called
+    THEN it should return None
+    """
+    assert parse_quantity("a pinch") is None
+    assert parse_quantity("") is None
+    assert parse_quantity(None) is None
+
+
+def test_normalize_unit_converts_to_canonical_units():
+    """
+    GIVEN known, unknown and missing units
+    WHEN normalize_unit is called
+    THEN known units should map to grams, millilitres or pieces
+    """
+    assert normalize_unit("kg") == ("g", 1000)
+    assert normalize_unit("Tbsp.") == ("ml", 15)
+    assert normalize_unit("Clove") == ("clove", 1)
+    assert normalize_unit(None) == ("", 1)
+
+
+def test_recipe_ingredient_quantity_columns_are_filled_on_write(session):
+    """
+    GIVEN a recipe ingredient saved with a quantity range in kilograms
+    WHEN its quantity is changed and saved again
+    THEN the numeric columns should follow the quantity
+    """
+    recipe = RecipeFactory(title="Quantity columns stew")
+    ingredient = Ingredient(name="quantity-potato")
+    session.add(ingredient)
+    session.flush()
+    link = RecipeIngredient(
+        recipe_id=recipe.id, ingredient_id=ingredient.id, quantity="1-2", unit="kg"
+    )
+    session.add(link)
+    session.commit()
+
+    assert (link.quantity_min, link.quantity_max) == (1, 2)
+    assert (link.canonical_unit, link.unit_factor) == ("g", 1000)
+
+    link.quantity = "a handful"
+    session.commit()
+
+    assert link.quantity_min is None and link.quantity_max is None
@@ -0,0 +1,119 @@
+from nutri_app.models import Ingredient, Instruction, RecipeIngredient
+from nutri_app.utils import merge_ingredients, merge_instructions, update_ingredients
+from tests.factories import RecipeFactory
+
+
+def test_update_ingredients_creates_missing_ingredients(session):
+    """
+    GIVEN a recipe and one existing ingredient
+    WHEN ingredients are saved with an existing, a new and a blank name
+    THEN the new ingredient should be created and both linked in order
+    """
+    session.add(Ingredient(name="bulk-salt"))
+    recipe = RecipeFactory(title="Bulk soup")
+    session.flush()
+
+    update_ingredients(
+        ["bulk-salt", " ", "bulk-kale"],
+        ["1", "", "200"],
+        ["tsp", "", "g"],
+        ["", "", ""],
+        ["", "", "chopped"],
+        recipe,
+    )
+    session.commit()
+
+    links = (
+        session.query(Ingredient.name, RecipeIngredient.quantity, RecipeIngredient.unit)
+        .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+        .filter(RecipeIngredient.recipe_id == recipe.id)
+        .order_by(RecipeIngredient.id)
+        .all()
+    )
+    assert links == [("bulk-salt", "1", "tsp"), ("bulk-kale", "200", "g")]
+    assert session.query(Ingredient).filter_by(name="bulk-salt").count() == 1
+
+
+def test_merge_ingredients_writes_only_changed_rows(session):
+    """
+    GIVEN a recipe with two ingredients
+    WHEN the second quantity is changed and a third ingredient is added
+    THEN one link should be updated, one inserted and none deleted
+    """
+    recipe = RecipeFactory(title="Merge soup")
+    session.flush()
+    update_ingredients(
+        ["merge-rice", "merge-peas"], ["100", "50"], ["g", "g"], [], [], recipe
+    )
+    session.flush()
+    first_link_id = (
+        session.query(RecipeIngredient.id)
+        .filter_by(recipe_id=recipe.id)
+        .order_by(RecipeIngredient.id)
+        .first()
+        .id
+    )
+
+    changes = merge_ingredients(
+        ["merge-rice", "merge-peas", "merge-corn"],
+        ["100", "80", "30"],
+        ["g", "g", "g"],
+        [],
+        [],
+        recipe,
+    )
+    session.commit()
+
+    assert changes == {"inserted": 1, "updated": 1, "deleted": 0}
+    quantities = [
+        quantity
+        for quantity, in session.query(RecipeIngredient.quantity)
+        .filter_by(recipe_id=recipe.id)
+        .order_by(RecipeIngredient.id)
+    ]
+    assert quantities == ["100", "80", "30"]
+    assert session.get(RecipeIngredient, first_link_id).quantity == "100"
+
+
+def test_merge_ingredients_leaves_an_unchanged_form_alone(session):
+    """
+    GIVEN a recipe whose ingredients were not entered in alphabetical order
+    WHEN the same ingredients are submitted in display order
+    THEN no link should be written
+    """
+    recipe = RecipeFactory(title="Unchanged soup")
+    session.flush()
+    update_ingredients(
+        ["unchanged-rice", "unchanged-basil"], ["100", "5"], ["g", "g"], [], [], recipe
+    )
+    session.flush()
+
+    changes = merge_ingredients(
+        ["unchanged-rice", "unchanged-basil"], ["100", "5"], ["g", "g"], [], [], recipe
+    )
+
+    assert changes == {"inserted": 0, "updated": 0, "deleted": 0}
+    assert not session.dirty
+
+
+def test_merge_instructions_deletes_removed_steps(session):
+    """
+    GIVEN a recipe with two instructions
+    WHEN only the first one is submitted again, unchanged
+    THEN the second one should be deleted and nothing else written
+    """
+    recipe = RecipeFactory(title="Merge stew")
+    session.flush()
+    merge_instructions(["Chop.", "Simmer."], ["1", "2"], recipe)
+    session.flush()
+
+    changes = merge_instructions(["Chop."], ["1"], recipe)
+    session.commit()
+
+    assert changes == {"inserted": 0, "updated": 0, "deleted": 1}
+    assert [
+        instruction
+        for instruction, in session.query(Instruction.instruction).filter_by(
+            recipe_id=recipe.id
+        )
+    ] == ["Chop."]
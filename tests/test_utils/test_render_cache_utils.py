@@ -0,0 +1,64 @@
+import time
+
+from nutri_app.utils.render_cache_utils import RenderCache, recipe_dependency
+
+
+def make_page(body, *dependencies):
+    return {
+        "rendered_at": time.time(),
+        "dependencies": list(dependencies),
+        "status": 200,
+        "mimetype": "text/html",
+        "body": body,
+    }
+
+
+def test_render_cache_counts_hits_and_misses():
+    """
+    GIVEN an empty render cache
+    WHEN a page is looked up, stored and looked up again
+    THEN the first lookup should miss and the second should hit
+    """
+    render_cache = RenderCache(maxsize=10)
+    key = ("recipe_id.recipe_id", (("recipe_id", 1),), ())
+
+    assert render_cache.get(key) is None
+    render_cache.set(key, make_page(b"<p>soup</p>", recipe_dependency(1)))
+
+    assert render_cache.get(key)["body"] == b"<p>soup</p>"
+    assert render_cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_render_cache_invalidates_by_recipe_id():
+    """
+    GIVEN cached pages of two recipes
+    WHEN one recipe is invalidated
+    THEN only the page of that recipe should be dropped
+    """
+    render_cache = RenderCache(maxsize=10)
+    render_cache.set("soup", make_page(b"soup", recipe_dependency(1)))
+    render_cache.set("stew", make_page(b"stew", recipe_dependency(2)))
+
+    render_cache.invalidate([recipe_dependency(1)])
+
+    assert render_cache.get("soup") is None
+    assert render_cache.get("stew")["body"] == b"stew"
+
+
+def test_render_cache_is_shared_through_directory(tmp_path):
+    """
+    GIVEN two workers' render caches backed by the same directory
+    WHEN one stores a page and the other invalidates its recipe
+    THEN the page should be served by both, then by neither
+    """
+    first_worker = RenderCache(maxsize=10, directory=str(tmp_path))
+    second_worker = RenderCache(maxsize=10, directory=str(tmp_path))
+    first_worker.set("soup", make_page(b"soup", recipe_dependency(1)))
+
+    assert second_worker.get("soup")["body"] == b"soup"
+
+    time.sleep(0.01)
+    second_worker.invalidate([recipe_dependency(1)])
+
+    assert first_worker.get("soup") is None
+    assert second_worker.get("soup") is None
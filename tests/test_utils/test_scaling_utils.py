@@ -0,0 +1,61 @@
+from nutri_app.models import Ingredient, RecipeIngredient
+from nutri_app.utils import clear_scaled_cache, round_quantity, scale_ingredients
+from tests.factories import RecipeFactory
+
+
+def test_round_quantity_depends_on_unit():
+    """
+    GIVEN scaled amounts in grams, kilograms, spoons and pieces
+    WHEN round_quantity is called
+    THEN each should be rounded to a precision suited to its unit
+    """
+    assert round_quantity(333.33, "g") == 335
+    assert round_quantity(12.4, "g") == 12
+    assert round_quantity(1.3333, "kg") == 1.33
+    assert round_quantity(0.6667, "tbsp") == 0.75
+    assert round_quantity(0.01, "pcs") == 0.25
+
+
+def test_scale_ingredients_rescales_parsed_quantities(session):
+    """
+    GIVEN a recipe for 2 servings with a numeric and a textual quantity
+    WHEN its ingredients are scaled to 6 servings
+    THEN the numeric quantity should be tripled and the textual one kept as written
+    """
+    clear_scaled_cache()
+    recipe = RecipeFactory(title="Scaled pancakes", servings=2)
+    flour = Ingredient(name="scaled-flour")
+    salt = Ingredient(name="scaled-salt")
+    session.add_all([flour, salt])
+    session.flush()
+    session.add_all(
+        [
+            RecipeIngredient(
+                recipe_id=recipe.id, ingredient_id=flour.id, quantity="100-150", unit="g"
+            ),
+            RecipeIngredient(
+                recipe_id=recipe.id, ingredient_id=salt.id, quantity="a pinch"
+            ),
+        ]
+    )
+    session.commit()
+
+    scaled = scale_ingredients(recipe.id, 6)
+
+    assert scaled["original_servings"] == 2
+    flour_row, salt_row = scaled["ingredients"]
+    assert flour_row["quantity"] == "300-450"
+    assert (flour_row["quantity_min"], flour_row["quantity_max"]) == (300, 450)
+    assert flour_row["scaled"] is True
+    assert salt_row["quantity"] == "a pinch"
+    assert salt_row["scaled"] is False
+    assert scale_ingredients(recipe.id, 6) is scaled
+
+
+def test_scale_ingredients_unknown_recipe(session):
+    """
+    GIVEN a recipe ID that does not exist
+    WHEN its ingredients are scaled
+    THEN None should be returned
+    """
+    assert scale_ingredients(999999, 4) is None
@@ -0,0 +1,53 @@
+from nutri_app.models import Ingredient, Instruction, Recipe, RecipeIngredient
+from nutri_app.utils import get_search_query, get_search_rank, refresh_search_documents
+from tests.factories import RecipeFactory
+
+
+def _search(session, text):
+    search_query_ts = get_search_query(text)
+    return (
+        session.query(Recipe)
+        .filter(Recipe.search_document.op("@@")(search_query_ts))
+        .order_by(get_search_rank(search_query_ts).desc(), Recipe.id)
+        .all()
+    )
+
+
+def test_search_document_matches_ingredients_and_instructions(session):
+    """
+    GIVEN a recipe with an ingredient and an instruction
+    WHEN its search document is refreshed
+    THEN it should be found by its title, ingredient and instruction words
+    """
+    recipe = RecipeFactory(title="Search document soup")
+    ingredient = Ingredient(name="kohlrabi")
+    session.add(ingredient)
+    session.flush()
+    session.add(RecipeIngredient(recipe_id=recipe.id, ingredient_id=ingredient.id))
+    session.add(
+        Instruction(recipe_id=recipe.id, step_number=1, instruction="Simmer gently.")
+    )
+    refresh_search_documents([recipe.id])
+    session.commit()
+
+    assert recipe in _search(session, "soup")
+    assert recipe in _search(session, "kohlrabi")
+    assert recipe in _search(session, "simmer")
+
+
+def test_title_match_ranks_above_instruction_match(session):
+    """
+    GIVEN one recipe mentioning a word in its title and another only in its instructions
+    WHEN searching for that word
+    THEN the title match should be ranked first
+    """
+    in_title = RecipeFactory(title="Quince tart")
+    in_steps = RecipeFactory(title="Plain tart")
+    session.flush()
+    session.add(
+        Instruction(recipe_id=in_steps.id, step_number=1, instruction="Add a quince.")
+    )
+    refresh_search_documents([in_title.id, in_steps.id])
+    session.commit()
+
+    assert _search(session, "quince")[:2] == [in_title, in_steps]
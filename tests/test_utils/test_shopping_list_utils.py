@@ -0,0 +1,64 @@
+from nutri_app.models import Ingredient, RecipeIngredient
+from nutri_app.utils import build_shopping_list
+from tests.factories import RecipeFactory
+
+
+def test_build_shopping_list_sums_across_recipes(session):
+    """
+    GIVEN two recipes using the same ingredients in different units
+    WHEN their shopping list is built
+    THEN quantities should be summed per ingredient in canonical units
+    """
+    first = RecipeFactory(title="Shopping soup")
+    second = RecipeFactory(title="Shopping stew")
+    flour = Ingredient(name="shopping-flour")
+    salt = Ingredient(name="shopping-salt")
+    session.add_all([flour, salt])
+    session.flush()
+    session.add_all(
+        [
+            RecipeIngredient(
+                recipe_id=first.id, ingredient_id=flour.id, quantity="1", unit="kg"
+            ),
+            RecipeIngredient(
+                recipe_id=second.id,
+                ingredient_id=flour.id,
+                quantity="200-250",
+                unit="g",
+            ),
+            RecipeIngredient(
+                recipe_id=second.id, ingredient_id=salt.id, quantity="a pinch"
+            ),
+        ]
+    )
+    session.commit()
+
+    items = build_shopping_list([first.id, second.id])
+
+    assert items == [
+        {
+            "ingredient": "shopping-flour",
+            "unit": "g",
+            "quantity": 1200,
+            "max_quantity": 1250,
+            "notes": [],
+            "recipes": 2,
+        },
+        {
+            "ingredient": "shopping-salt",
+            "unit": None,
+            "quantity": None,
+            "max_quantity": None,
+            "notes": ["a pinch"],
+            "recipes": 1,
+        },
+    ]
+
+
+def test_build_shopping_list_empty_selection():
+    """
+    GIVEN no recipe IDs
+    WHEN the shopping list is built
+    THEN it should be empty
+    """
+    assert build_shopping_list([]) == []
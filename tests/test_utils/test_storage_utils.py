@@ -0,0 +1,63 @@
+import pytest
+
+from nutri_app.utils import LocalStorage, S3Storage, StorageBackend
+
+
+def test_local_storage_round_trip(tmp_path):
+    """
+    GIVEN a local storage backend
+    WHEN a file is saved, then deleted by the key of its URL
+    THEN the URL should map back to the key and the file should be gone
+    """
+    storage = LocalStorage(str(tmp_path))
+
+    url = storage.save("recipe_images/soup_card.webp", b"webp", "image/webp")
+
+    assert url == "/media/recipe_images/soup_card.webp"
+    assert storage.key_from_url(url) == "recipe_images/soup_card.webp"
+    assert (tmp_path / "recipe_images" / "soup_card.webp").read_bytes() == b"webp"
+    assert storage.delete_many([storage.key_from_url(url)]) == {}
+    assert not (tmp_path / "recipe_images" / "soup_card.webp").exists()
+
+
+def test_local_storage_rejects_keys_outside_its_directory(tmp_path):
+    """
+    GIVEN a local storage backend
+    WHEN a key climbs out of the storage directory
+    THEN saving it should raise a ValueError
+    """
+    storage = LocalStorage(str(tmp_path / "media"))
+
+    with pytest.raises(ValueError):
+        storage.save("../escape.txt", b"x", "text/plain")
+
+
+def test_s3_storage_maps_urls_without_a_client():
+    """
+    GIVEN an S3 storage backend
+    WHEN URLs are built and parsed
+    THEN only URLs of its bucket should map to keys, without creating a client
+    """
+    storage = S3Storage("bucket", "eu-central-1")
+
+    url = storage.url("recipe_images/soup.jpeg")
+
+    assert url == "https://bucket.s3.eu-central-1.amazonaws.com/recipe_images/soup.jpeg"
+    assert storage.key_from_url(url) == "recipe_images/soup.jpeg"
+    assert storage.key_from_url("https://elsewhere.example/soup.jpeg") is None
+    assert storage._client is None
+
+
+def test_storage_backend_requires_every_operation():
+    """
+    GIVEN a backend implementing only some of the StorageBackend operations
+    WHEN it is instantiated
+    THEN a TypeError should name the missing ones
+    """
+
+    class SaveOnlyStorage(StorageBackend):
+        def save(self, key, data, content_type, cache_control=None):
+            return key
+
+    with pytest.raises(TypeError, match="delete"):
+        SaveOnlyStorage()